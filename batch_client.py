@@ -0,0 +1,180 @@
+# ============= OPENAI BATCH API CLIENT =============
+# Runs many chat completion requests through the Batch API instead of one
+# synchronous call each: the requests are written to a JSONL file, uploaded,
+# submitted as a batch, polled until done and the output file is streamed back
+# line by line. Batches cost half as much, have their own rate limits and
+# finish within the completion window (usually minutes), so they suit the
+# holiday analyzer and store-hours backfills rather than the daily run.
+#
+# Usage:
+#   results = run_chat_batch({"row-1": {"model": ..., "messages": [...]}, ...})
+#   results["row-1"]  # response text, or an Exception for that request
+import json
+import os
+import tempfile
+import time
+
+import openai
+
+from rate_limiter import get_shared_limiter
+
+CHAT_COMPLETIONS_ENDPOINT = '/v1/chat/completions'
+DEFAULT_COMPLETION_WINDOW = '24h'
+
+# API limits per batch input file (kept just under 200 MB)
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+
+# Polling: start fast, back off exponentially, give up after max_wait
+DEFAULT_POLL_INITIAL = 5.0
+DEFAULT_POLL_MAX = 60.0
+DEFAULT_POLL_BACKOFF = 1.5
+DEFAULT_MAX_WAIT = 24 * 3600
+
+FINISHED_STATUSES = ['completed', 'failed', 'expired', 'cancelled']
+
+
+def batch_line(custom_id, request):
+    """One JSONL line: a chat completions request body tagged with custom_id"""
+    return json.dumps({"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_ENDPOINT, "body": request})
+
+
+def write_batch_files(requests, directory, max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    """
+    Write {custom_id: request kwargs} as JSONL files under directory, starting a new
+    file whenever the per-batch request or size limit would be exceeded.
+    Returns the file paths.
+    """
+    paths = []
+    handle = None
+    count = size = 0
+    try:
+        for custom_id, request in requests.items():
+            line = (batch_line(custom_id, request) + "\n").encode("utf-8")
+            if handle is None or count >= max_requests or size + len(line) > max_bytes:
+                if handle is not None:
+                    handle.close()
+                paths.append(os.path.join(directory, f"batch_{len(paths) + 1:03d}.jsonl"))
+                handle = open(paths[-1], "wb")
+                count = size = 0
+            handle.write(line)
+            count += 1
+            size += len(line)
+    finally:
+        if handle is not None:
+            handle.close()
+    return paths
+
+
+def submit_batch(path, metadata=None, completion_window=DEFAULT_COMPLETION_WINDOW):
+    """Upload one JSONL file and start a batch over it; returns the batch id"""
+    limiter = get_shared_limiter()
+    with open(path, "rb") as f:
+        content = f.read()
+    # Bytes rather than the open file, so a retried upload sends the whole file again
+    uploaded = limiter.call(lambda: openai.files.create(file=(os.path.basename(path), content), purpose="batch"))
+    batch = limiter.call(lambda: openai.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=CHAT_COMPLETIONS_ENDPOINT,
+        completion_window=completion_window,
+        metadata=metadata
+    ))
+    return batch.id
+
+
+def wait_for_batch(batch_id, max_wait=DEFAULT_MAX_WAIT, initial_interval=DEFAULT_POLL_INITIAL,
+                   max_interval=DEFAULT_POLL_MAX, backoff=DEFAULT_POLL_BACKOFF):
+    """
+    Poll a batch with exponential backoff until it finishes and return it.
+    Raises if the batch failed outright, or TimeoutError once max_wait seconds have passed.
+    Expired and cancelled batches are returned: the requests that did finish are in their output file.
+    """
+    limiter = get_shared_limiter()
+    deadline = time.monotonic() + max_wait
+    interval = initial_interval
+
+    while True:
+        batch = limiter.call(lambda: openai.batches.retrieve(batch_id))
+        if batch.status == 'failed':
+            errors = getattr(batch.errors, 'data', None) or []
+            raise Exception(f"Batch {batch_id} failed: {'; '.join(str(error.message) for error in errors)[:300]}")
+        elif batch.status in FINISHED_STATUSES:
+            return batch
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {max_wait:.0f}s")
+
+        counts = batch.request_counts
+        progress = f", {counts.completed + counts.failed}/{counts.total} done" if counts and counts.total else ""
+        print(f"   Waiting... ({batch.status}{progress})")
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def iter_file_lines(file_id):
+    """Stream a result file's JSONL lines without loading the whole file"""
+    with openai.files.with_streaming_response.content(file_id) as response:
+        for line in response.iter_lines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_batch_results(batch):
+    """
+    Yield (custom_id, response text or Exception) for every request in a finished
+    batch, successes from the output file first, then failures from the error file.
+    """
+    if batch.output_file_id:
+        for record in iter_file_lines(batch.output_file_id):
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                message = response["body"]["choices"][0]["message"]
+                # A refusal has content=None; its text is read like any other response
+                yield record["custom_id"], (message.get("content") or message.get("refusal") or "").strip()
+            else:
+                error = (response.get("body") or {}).get("error") or record.get("error") or {}
+                yield record["custom_id"], Exception(f"HTTP {response.get('status_code')}: {error.get('message', error)}")
+    if batch.error_file_id:
+        for record in iter_file_lines(batch.error_file_id):
+            error = record.get("error") or ((record.get("response") or {}).get("body") or {}).get("error") or {}
+            yield record["custom_id"], Exception(str(error.get("message", error)))
+
+
+def run_chat_batch(requests, metadata=None, max_wait=DEFAULT_MAX_WAIT, poll_interval=DEFAULT_POLL_INITIAL):
+    """
+    Send {custom_id: chat completion kwargs} through the Batch API and wait for the answers.
+
+    Args:
+        requests: Request bodies as passed to chat.completions.create, keyed by a unique string id.
+        metadata: Optional dict attached to each batch (e.g. {"script": "holiday_hours"}).
+        max_wait: Seconds to wait for all the batches before raising TimeoutError.
+        poll_interval: First polling interval in seconds (backs off up to DEFAULT_POLL_MAX).
+
+    Returns:
+        dict: {custom_id: response text or Exception}. Requests the batch never
+              answered (expired/cancelled) get an Exception too.
+    """
+    results = {}
+    if not requests:
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_batch_files(requests, directory)
+        # Submit every file up front so the batches run side by side
+        batch_ids = [submit_batch(path, metadata) for path in paths]
+    print(f"   📦 Submitted {len(requests)} requests as {len(batch_ids)} batch(es): {', '.join(batch_ids)}")
+
+    # One deadline for every batch; a batch that already finished is still collected after it passes
+    deadline = time.monotonic() + max_wait
+    for batch_id in batch_ids:
+        remaining = max(0, deadline - time.monotonic())
+        batch = wait_for_batch(batch_id, max_wait=remaining, initial_interval=poll_interval)
+        for custom_id, result in iter_batch_results(batch):
+            results[custom_id] = result
+        print(f"   ✅ Batch {batch_id} {batch.status}")
+
+    for custom_id in requests:
+        if custom_id not in results:
+            results[custom_id] = Exception("No result in batch output (expired or cancelled)")
+    return results
@@ -0,0 +1,59 @@
+# ============= BENCHMARK: HOURS PARSER VS STRPTIME =============
+# Times hours_parser against the strptime-based functions it replaced on
+# realistic GPT responses. The equivalence checks are in test_hours_parser.py.
+#
+#   python benchmarks/bench_hours_parser.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hours_parser  # noqa: E402
+from test_hours_parser import (DAYS, strptime_extract_hours, strptime_normalize_time,  # noqa: E402
+                               strptime_time_diff_min)
+
+
+def realistic_response(rng):
+    lines = ["**Posted Hours:**"]
+    for day in DAYS:
+        start = f"{rng.randint(5, 11)}:{rng.choice(['00', '30'])}{rng.choice(['', ' AM', 'am', ' a.m.'])}"
+        end = f"{rng.randint(1, 11)}:{rng.choice(['00', '30'])}{rng.choice(['', ' PM', 'pm'])}"
+        lines.append(f"- {day}: {start} - {end}")
+    lines.append("Clarity score: 0.85")
+    return "\n".join(lines)
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(0)
+    responses = [realistic_response(rng) for _ in range(5000)]
+    times = [f"{rng.randint(0, 23):02d}:{rng.choice(['00', '15', '30', '45'])}:00" for _ in range(50000)]
+
+    rows = [
+        ("extract_hours (5k responses)",
+         lambda: [strptime_extract_hours(r) for r in responses],
+         lambda: [hours_parser.extract_hours(r) for r in responses]),
+        ("normalize_time (50k times)",
+         lambda: [strptime_normalize_time(t) for t in times],
+         lambda: [hours_parser.normalize_time(t) for t in times]),
+        ("time_diff_min (50k pairs)",
+         lambda: [strptime_time_diff_min(t, "12:00:00") for t in times],
+         lambda: [hours_parser.time_diff_min(t, "12:00:00") for t in times]),
+    ]
+    print(f"\n{'':32} {'strptime (s)':>13} {'regex (s)':>10} {'speedup':>8}")
+    for label, old, new in rows:
+        old_time, new_time = best_of(old), best_of(new)
+        print(f"{label:32} {old_time:>13.3f} {new_time:>10.3f} {old_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
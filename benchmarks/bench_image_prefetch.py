@@ -0,0 +1,108 @@
+# ============= BENCHMARK: IMAGE PREFETCH AND DOWNSCALE =============
+# Serves generated fixture photos (phone-camera sizes, plus a byte-identical
+# copy under a second URL) from a local HTTP server, runs them through
+# ImagePrefetcher and reports, per photo: bytes fetched vs bytes sent, the
+# vision tokens gpt-4o charges at the original size, after downscaling, and
+# at detail=low, and the fetch + prepare time.
+#
+# Token counts follow OpenAI's published tiling rules (image_prefetch.vision_tokens).
+#
+#   python benchmarks/bench_image_prefetch.py [max_dimension]
+import functools
+import http.server
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_prefetch import ImagePrefetcher, vision_tokens  # noqa: E402
+
+FIXTURES = [
+    ("phone_4032x3024.jpg", (4032, 3024)),
+    ("phone_3024x4032.jpg", (3024, 4032)),
+    ("hd_1920x1080.jpg", (1920, 1080)),
+    ("small_800x600.jpg", (800, 600)),
+]
+
+
+def storefront(size, seed):
+    """A noisy photo-like JPEG with a light hours sign in the middle"""
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.effect_noise((width // 4, height // 4), 60).convert('RGB').resize(size)
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + width // 10, y + height // 12],
+                       fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw.rectangle([width // 3, height // 3, 2 * width // 3, 2 * height // 3], fill=(245, 245, 235))
+    for line in range(7):
+        y = height // 3 + (line + 1) * height // 27
+        draw.line([width // 3 + 20, y, 2 * width // 3 - 20, y], fill=(20, 20, 20), width=max(2, height // 300))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    max_dimension = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    directory = tempfile.mkdtemp()
+    for seed, (name, size) in enumerate(FIXTURES):
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(storefront(size, seed))
+    # Same photo uploaded twice under different URLs
+    with open(os.path.join(directory, FIXTURES[0][0]), 'rb') as f:
+        duplicate = f.read()
+    with open(os.path.join(directory, "reupload.jpg"), 'wb') as f:
+        f.write(duplicate)
+
+    server = serve(directory)
+    base = f"http://127.0.0.1:{server.server_port}"
+    names = [name for name, _ in FIXTURES] + ["reupload.jpg"]
+    prefetcher = ImagePrefetcher(max_dimension=max_dimension)
+
+    print(f"max_dimension={max_dimension}\n")
+    print(f"{'photo':22} {'KB in':>7} {'KB sent':>8} {'sent as':>10} {'tok orig':>9} {'tok sent':>9} {'tok low':>8} {'ms':>6}")
+    totals = [0, 0, 0, 0, 0]
+    cache_keys = set()
+    for name in names:
+        with Image.open(os.path.join(directory, name)) as original:
+            original_size = original.size
+        started = time.perf_counter()
+        image = prefetcher.prepare(f"{base}/{name}")
+        elapsed = time.perf_counter() - started
+        cache_keys.add(prefetcher.cache_key(image))
+
+        original_tokens = vision_tokens(*original_size, 'high')
+        low_tokens = vision_tokens(image.width, image.height, 'low')
+        for index, value in enumerate([image.original_bytes, image.sent_bytes, original_tokens, image.tokens, low_tokens]):
+            totals[index] += value
+        print(f"{name:22} {image.original_bytes / 1024:>7.0f} {image.sent_bytes / 1024:>8.0f} "
+              f"{f'{image.width}x{image.height}':>10} {original_tokens:>9} {image.tokens:>9} {low_tokens:>8} {elapsed * 1000:>6.0f}")
+
+    print(f"{'total':22} {totals[0] / 1024:>7.0f} {totals[1] / 1024:>8.0f} {'':>10} {totals[2]:>9} {totals[3]:>9} {totals[4]:>8}")
+    print(f"\n{len(names)} URLs -> {len(cache_keys)} distinct response-cache keys (byte-identical photos share one)")
+    print(f"Prefetcher: {prefetcher.stats_line()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
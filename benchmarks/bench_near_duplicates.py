@@ -0,0 +1,93 @@
+# ============= BENCHMARK: NEAR-DUPLICATE PHOTO MATCHING =============
+# dHash distances between a generated storefront photo and the variants a
+# repeat Dasher photo tends to be (re-encoded, resized, slightly brighter,
+# framed a little differently) versus photos that should NOT reuse its verdict
+# (a closure notice taped up, a different store, DoorDash hours updated since
+# the earlier verdict - reuse needs the same STORE_HOURS, as in the pipeline).
+# Use it to sanity check NEAR_DUPLICATE_MAX_DISTANCE, and to time hashing.
+#
+# The "look-alike notice" case is the known blind spot: a hash can't read text,
+# so a new sign that looks like the old one matches at any threshold (distance
+# 0 here). It is only caught once the DoorDash hours change.
+#
+#   python benchmarks/bench_near_duplicates.py [max_distance]
+import io
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_prefetch import dhash, hamming_distance  # noqa: E402
+from bench_image_prefetch import storefront  # noqa: E402
+
+SIZE = (2016, 1512)
+
+
+def reencode(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def shifted(image, fraction):
+    width, height = image.size
+    dx, dy = int(width * fraction), int(height * fraction)
+    return image.crop((dx, dy, width - dx, height - dy)).resize(image.size)
+
+
+def with_notice(image, box, fill=(250, 250, 250)):
+    """The same photo with a notice covering a fraction box of the frame"""
+    width, height = image.size
+    image = image.copy()
+    left, top, right, bottom = box
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([width * left, height * top, width * right, height * bottom], fill=fill)
+    for line in range(4):
+        y = height * (top + (bottom - top) * (line + 1) / 5)
+        draw.line([width * left + 10, y, width * right - 10, y], fill=(0, 0, 0), width=6)
+    return image
+
+
+def main():
+    max_distance = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    base = Image.open(io.BytesIO(storefront(SIZE, 0)))
+    base_hash = dhash(base)
+
+    # (label, should reuse, photo, DoorDash hours changed since the earlier verdict)
+    variants = [
+        ("same photo, JPEG q60", True, reencode(base, 60), False),
+        ("same photo, half size", True, base.resize((SIZE[0] // 2, SIZE[1] // 2)), False),
+        ("same photo, 10% brighter", True, ImageEnhance.Brightness(base).enhance(1.1), False),
+        ("reframed 1%", True, shifted(base, 0.01), False),
+        ("reframed 2%", True, shifted(base, 0.02), False),
+        ("same photo, DoorDash hours fixed since", False, base, True),
+        ("red notice on the sign (1/9 of frame)", False, with_notice(base, (1 / 3, 1 / 3, 2 / 3, 2 / 3), (200, 30, 30)),
+         False),
+        ("white notice on the door (1/4 of frame)", False, with_notice(base, (0.1, 0.2, 0.6, 0.7)), False),
+        ("look-alike notice over the sign", False, with_notice(base, (1 / 3, 1 / 3, 2 / 3, 2 / 3)), False),
+        ("different store", False, Image.open(io.BytesIO(storefront(SIZE, 1))), False),
+    ]
+
+    print(f"NEAR_DUPLICATE_MAX_DISTANCE={max_distance} (of 64 bits)\n")
+    print(f"{'variant':40} {'distance':>9} {'reused':>7} {'should':>7}")
+    repeats_reused = false_reuses = 0
+    for label, should_match, image, hours_changed in variants:
+        distance = hamming_distance(base_hash, dhash(image))
+        matched = distance <= max_distance and not hours_changed
+        repeats_reused += matched and should_match
+        false_reuses += matched and not should_match
+        print(f"{label:40} {distance:>9} {'yes' if matched else 'no':>7} {'yes' if should_match else 'no':>7}")
+
+    started = time.perf_counter()
+    for _ in range(20):
+        dhash(base)
+    print(f"\ndHash of a {SIZE[0]}x{SIZE[1]} photo: {(time.perf_counter() - started) / 20 * 1000:.1f} ms")
+    repeats = sum(should_match for _, should_match, _, _ in variants)
+    print(f"Repeat photos reused: {repeats_reused}/{repeats}, changed photos wrongly reused: "
+          f"{false_reuses}/{len(variants) - repeats}")
+
+
+if __name__ == "__main__":
+    main()
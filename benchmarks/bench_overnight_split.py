@@ -0,0 +1,118 @@
+# ============= BENCHMARK: OVERNIGHT SPLIT FOR THE CHANGE-HOURS SHEET =============
+# Compares the vectorized split_overnight_shifts against the per-row loop it
+# replaced, checks both produce the same Bulk_Upload_Change_Hours sheet, and
+# times them on growing synthetic inputs to show the scaling.
+#
+#   python benchmarks/bench_overnight_split.py [max_rows]
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fixed_drsc_code_v2 as drsc  # noqa: E402
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def loop_split(start_times, end_times):
+    """The original per-row implementation"""
+    processed_start_times = []
+    processed_end_times = []
+    processed_start_times_2 = []
+    processed_end_times_2 = []
+    for start, end in zip(start_times, end_times):
+        if start and end:
+            try:
+                start_hour = int(start.split(':')[0])
+                end_hour = int(end.split(':')[0])
+                if start_hour > end_hour:
+                    processed_start_times.append(start)
+                    processed_end_times.append('23:59:59')
+                    processed_start_times_2.append('00:00:00')
+                    processed_end_times_2.append(end)
+                else:
+                    processed_start_times.append(start)
+                    processed_end_times.append(end)
+                    processed_start_times_2.append('')
+                    processed_end_times_2.append('')
+            except:
+                processed_start_times.append(start)
+                processed_end_times.append(end)
+                processed_start_times_2.append('')
+                processed_end_times_2.append('')
+        else:
+            processed_start_times.append('')
+            processed_end_times.append('')
+            processed_start_times_2.append('')
+            processed_end_times_2.append('')
+    return processed_start_times, processed_end_times, processed_start_times_2, processed_end_times_2
+
+
+def loop_change_hours_sheet(df):
+    sheet = pd.DataFrame({'store_id': df['STORE_ID'].values})
+    for day in DAYS:
+        start, end, start_2, end_2 = loop_split(df[f'start_time_{day}'].values, df[f'end_time_{day}'].values)
+        sheet[f'{day}_start_time'] = start
+        sheet[f'{day}_end_time'] = end
+        sheet[f'{day}_start_time_2'] = start_2
+        sheet[f'{day}_end_time_2'] = end_2
+    return sheet
+
+
+def random_time(rng):
+    roll = rng.random()
+    if roll < 0.05:
+        return ''
+    if roll < 0.07:
+        return np.nan
+    if roll < 0.08:
+        return rng.choice(['closed', '9am', ':30:00', ' 7:00:00'])
+    return f"{rng.randrange(24):02d}:{rng.choice(['00', '15', '30', '45'])}:00"
+
+
+def synthetic_rows(n, seed=0):
+    rng = random.Random(seed)
+    data = {'STORE_ID': [str(1000000 + i) for i in range(n)],
+            'RECOMMENDATION': ['Change Store Hours'] * n,
+            'SPECIAL_HOURS_RAW': [[] for _ in range(n)]}
+    for day in DAYS:
+        data[f'start_time_{day}'] = [random_time(rng) for _ in range(n)]
+        data[f'end_time_{day}'] = [random_time(rng) for _ in range(n)]
+    return pd.DataFrame(data)
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    # Same sheet, cell for cell, through the real create_bulk_upload_sheets
+    check = synthetic_rows(20000, seed=1)
+    expected = loop_change_hours_sheet(check)
+    actual = drsc.create_bulk_upload_sheets(check)[3]
+    pd.testing.assert_frame_equal(actual, expected)
+    print("\n✅ Vectorized sheet matches the loop implementation")
+
+    print(f"\n{'rows':>8} {'loop (s)':>10} {'vectorized (s)':>15} {'µs/row':>8} {'speedup':>8}")
+    for n in [max_rows // 4, max_rows // 2, max_rows]:
+        df = synthetic_rows(n)
+        starts = [df[f'start_time_{day}'].values for day in DAYS]
+        ends = [df[f'end_time_{day}'].values for day in DAYS]
+        loop_time = best_of(lambda: [loop_split(s, e) for s, e in zip(starts, ends)])
+        vector_time = best_of(lambda: [drsc.split_overnight_shifts(s, e) for s, e in zip(starts, ends)])
+        print(f"{n:>8} {loop_time:>10.3f} {vector_time:>15.3f} {vector_time / n * 1e6:>8.2f} {loop_time / vector_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
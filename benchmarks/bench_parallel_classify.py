@@ -0,0 +1,83 @@
+# ============= BENCHMARK: PARALLEL CLASSIFICATION =============
+# Classifies a synthetic batch of GPT responses serially and with
+# classify_batch on 2/4/... worker processes, checks every worker count
+# returns the same verdicts in the same order, and times each.
+#
+#   python benchmarks/bench_parallel_classify.py [responses] [max_workers]
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_cache_dir = tempfile.mkdtemp()
+os.environ.setdefault('RESPONSE_CACHE_PATH', os.path.join(_cache_dir, 'responses.sqlite3'))
+os.environ.setdefault('CHECKPOINT_PATH', os.path.join(_cache_dir, 'checkpoints.sqlite3'))
+with contextlib.redirect_stdout(io.StringIO()):
+    import fixed_drsc_code_v2 as drsc  # noqa: E402
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+OPENINGS = [
+    "The sign on the glass door clearly shows the store hours.",
+    "A paper sign taped to the window reads: \"Closed until further notice\".",
+    "This location is now permanently closed.",
+    "We are moving to 123 Main Street, Springfield.",
+    "Closed today due to staff shortage.",
+    "The sign is blurry and hard to read.",
+    "Hours visible through glass with some glare: 7:00am - 11:00pm everyday.",
+]
+RECOMMENDATIONS = [
+    "Recommendation: **Change Store Hours**", "Recommendation: **Temporarily Close For Day**",
+    "Recommendation: No Change", "Recommendation: **Permanently Close Store**",
+    "Recommendation: **Address Change**", "",
+]
+
+
+def synthetic_response(rng):
+    lines = [rng.choice(OPENINGS), "**Posted Hours:**"]
+    for day in DAYS:
+        if rng.random() < 0.9:
+            lines.append(f"- {day}: {rng.randint(6, 10)}:{rng.choice(['00', '30'])} AM - "
+                         f"{rng.randint(5, 11)}:{rng.choice(['00', '30'])} PM")
+    if rng.random() < 0.1:
+        lines.append("Special hours: Christmas Day closed")
+    lines.append(f"Clarity score: {rng.choice(['0.95', '0.92', '0.85', '0.70', '0.50'])}")
+    lines.append(rng.choice(RECOMMENDATIONS))
+    return "\n".join(lines)
+
+
+def store_hours(rng):
+    return ", ".join(f"{day}: {rng.randint(6, 10):02d}:00 - {rng.randint(17, 23):02d}:00" for day in DAYS)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count() or 1)
+    rng = random.Random(0)
+    jobs = [(synthetic_response(rng), store_hours(rng), str(i)) for i in range(count)]
+    drsc.CLASSIFY_MIN_PARALLEL = 0
+
+    timings = {}
+    expected = None
+    workers = 1
+    while workers <= max_workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            verdicts = [verdict.values() for verdict in drsc.classify_batch(jobs, 5, workers=workers)]
+            timings[workers] = time.perf_counter() - started
+        if expected is None:
+            expected = verdicts
+        assert verdicts == expected, f"{workers} workers changed the verdicts"
+        workers *= 2
+
+    print(f"✅ {count:,} responses, identical verdicts for every worker count ({os.cpu_count()} CPUs available)")
+    print(f"\n{'workers':>8} {'seconds':>9} {'us/response':>12} {'speedup':>8}")
+    for workers, seconds in timings.items():
+        print(f"{workers:>8} {seconds:>9.2f} {seconds / count * 1e6:>12.0f} {timings[1] / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# ============= BENCHMARK: PRECOMPILED RESPONSE PATTERNS =============
+# Runs every pattern in response_patterns both ways over a corpus of GPT
+# responses: the old way (pattern strings passed to re.search/re.findall on
+# every call, one search per pattern in a list) and through the precompiled
+# registry. Checks both give the same answers and times them.
+#
+# Uses recorded responses when given store_hours_analysis_*.csv backups
+# (RAW_RESPONSE column, or REASON for older backups), synthetic ones otherwise:
+#
+#   python benchmarks/bench_response_patterns.py [backup.csv ...]
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import response_patterns as rp  # noqa: E402
+
+HOLIDAYS = ['Christmas Eve', 'Christmas Day', "New Year's Eve", "New Year's Day"]
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SNIPPETS = [
+    "The sign on the glass door clearly shows the store hours.",
+    "Store hours sign: Mon-Sat 8am - 10pm, Sun 10am-6pm. Open every day.",
+    "Hours: 7 - 11 everyday",
+    "We are moving! New address: 4500 Oak Avenue Suite 2, Springfield.",
+    "Find us at: 77 Pine Road",
+    "SPECIAL HOLIDAY HOURS:\nThanksgiving: CLOSED\nChristmas: closed\n\n",
+    "Christmas Eve: 8AM-6PM\nChristmas Day: CLOSED\nNew Year's Eve: 9:00am to 5:00pm",
+    "The image is blurry; hours might be 9 to 5.",
+    "Recommendation: **Change Store Hours**",
+    "**Temporarily Close For Day**",
+    "I recommend: no change",
+]
+
+
+def synthetic_response(rng):
+    lines = rng.sample(SNIPPETS, rng.randint(1, 4))
+    for day in DAYS:
+        if rng.random() < 0.8:
+            lines.append(f"- {day}: {rng.randint(5, 11)}:{rng.choice(['00', '30'])}{rng.choice(['', ' AM', 'am'])} - "
+                         f"{rng.randint(1, 11)}:{rng.choice(['00', '30'])}{rng.choice(['', ' PM', 'pm'])}")
+    lines.append(f"Clarity score: {rng.choice(['0.95', '0.88', '.7', '1.0', '0.5'])}")
+    return "\n".join(lines)
+
+
+def load_corpus(paths):
+    responses = []
+    for path in sorted({match for path in paths for match in (glob.glob(path) or [path])}):
+        backup = pd.read_csv(path, dtype=str, keep_default_na=False)
+        column = 'RAW_RESPONSE' if 'RAW_RESPONSE' in backup.columns else 'REASON'
+        responses += [text for text in backup[column] if text]
+    return responses
+
+
+def first_group(match):
+    return match.group(1) if match else None
+
+
+def checks(texts, lowers):
+    """(label, old, new) pairs; each callable returns its answers for the whole corpus"""
+    def inline_any(compiled):
+        patterns = [pattern.pattern for pattern in compiled]
+        return lambda: [any(re.search(pattern, lower) for pattern in patterns) for lower in lowers]
+
+    def registry_any(compiled):
+        return lambda: [any(pattern.search(lower) for pattern in compiled) for lower in lowers]
+
+    return [
+        ("glass clear-hours (9 patterns)", inline_any(rp.GLASS_HOUR_RES), registry_any(rp.GLASS_HOUR_RES)),
+        ("stated hours (6 patterns)", inline_any(rp.STATED_HOUR_RES), registry_any(rp.STATED_HOUR_RES)),
+        ("specific time (3 patterns)", inline_any(rp.SPECIFIC_TIME_RES), registry_any(rp.SPECIFIC_TIME_RES)),
+        ("recommendation findall (5 patterns)",
+         lambda: [[re.findall(pattern.pattern, lower) for pattern in rp.RECOMMENDATION_RES] for lower in lowers],
+         lambda: [[pattern.findall(lower) for pattern in rp.RECOMMENDATION_RES] for lower in lowers]),
+        ("clarity score",
+         lambda: [first_group(re.search(rp.CLARITY_SCORE_RE.pattern, text, re.IGNORECASE)) for text in texts],
+         lambda: [first_group(rp.CLARITY_SCORE_RE.search(text)) for text in texts]),
+        ("new address",
+         lambda: [first_group(re.search(rp.ADDRESS_RE.pattern, text, re.IGNORECASE)) for text in texts],
+         lambda: [first_group(rp.ADDRESS_RE.search(text)) for text in texts]),
+        ("special holiday section",
+         lambda: [first_group(re.search(rp.SPECIAL_HOLIDAY_SECTION_RE.pattern, text, re.IGNORECASE | re.DOTALL)) for text in texts],
+         lambda: [first_group(rp.SPECIAL_HOLIDAY_SECTION_RE.search(text)) for text in texts]),
+        ("holiday lines (f-string patterns)",
+         lambda: [[first_group(re.search(rf"{holiday}[:\s]*([^\n]+)", text, re.IGNORECASE)) for holiday in HOLIDAYS] for text in texts],
+         lambda: [[first_group(rp.holiday_line_pattern(holiday).search(text)) for holiday in HOLIDAYS] for text in texts]),
+        ("day hours findall",
+         lambda: [re.findall(rp.DAY_HOURS_RE.pattern, text, re.IGNORECASE) for text in texts],
+         lambda: [rp.DAY_HOURS_RE.findall(text) for text in texts]),
+    ]
+
+
+def best_of(fn, repeat=9):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    texts = load_corpus(sys.argv[1:]) if len(sys.argv) > 1 else []
+    source = "recorded"
+    if not texts:
+        rng = random.Random(0)
+        texts = [synthetic_response(rng) for _ in range(5000)]
+        source = "synthetic"
+    lowers = [text.lower() for text in texts]
+
+    print(f"{len(texts):,} {source} responses")
+    print(f"\n{'':38} {'inline (ms)':>12} {'registry (ms)':>14} {'speedup':>8}")
+    total_old = total_new = 0.0
+    for label, old, new in checks(texts, lowers):
+        assert old() == new(), f"{label}: registry disagrees with the inline patterns"
+        old_time, new_time = best_of(old), best_of(new)
+        total_old += old_time
+        total_new += new_time
+        print(f"{label:38} {old_time * 1000:>12.1f} {new_time * 1000:>14.1f} {old_time / new_time:>7.1f}x")
+    print(f"{'total':38} {total_old * 1000:>12.1f} {total_new * 1000:>14.1f} {total_old / total_new:>7.1f}x")
+    print("\n✅ Registry answers match the inline patterns on every response")
+
+
+if __name__ == "__main__":
+    main()
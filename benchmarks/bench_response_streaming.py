@@ -0,0 +1,137 @@
+# ============= BENCHMARK: RESPONSE CONTRACT AND STREAMING =============
+# Per-row vision call latency against the local stub server, which "generates"
+# answers at --token-delay seconds per output token after --delay seconds to
+# the first one, for:
+#   full    - the original open-ended answer (max_tokens 1000)
+#   compact - VISION_RESPONSE_CONTRACT=compact's line-per-fact answer (max_tokens 300)
+# each sent as one blocking call and streamed with VISION_STREAM, which hangs
+# up as soon as the clarity score is in. Each streamed row's verdict is checked
+# against the blocking one for the same answer, i.e. that stopping early loses
+# nothing the classifier reads.
+#
+# The stub sends the canned answer whatever the prompt asks for, so the
+# contracts here are two hand-written answers for the same sign: this measures
+# what a shorter answer costs to generate, not whether gpt-4o gives the same
+# verdicts under the compact contract. The stub counts one word as one token,
+# a little under what gpt-4o uses.
+#
+# Latency is the stub's, not gpt-4o's: pass the time to first token and the
+# per-token rate you see in production for realistic numbers.
+#
+#   python benchmarks/bench_response_streaming.py [rows] [--delay S] [--token-delay S]
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_openai_server import start_stub_server  # noqa: E402
+
+# What gpt-4o tends to write for the full prompt: description, reasoning, the
+# clarity line and then a closing remark nothing reads
+FULL_RESPONSE = """The image shows the entrance of the store with a large printed sign posted on the glass door to the right of the handle. The sign is well lit and takes up a good part of the door, and although there is a little reflection from the parking lot it is readable.
+
+The sign reads "STORE HOURS - Open 7 days a week" followed by the hours for each day:
+- Monday: 7:00 AM - 10:00 PM
+- Tuesday: 7:00 AM - 10:00 PM
+- Wednesday: 7:00 AM - 10:00 PM
+- Thursday: 7:00 AM - 10:00 PM
+- Friday: 7:00 AM - 10:00 PM
+- Saturday: 7:00 AM - 10:00 PM
+- Sunday: 7:00 AM - 10:00 PM
+
+Comparing with the current DoorDash hours (08:00 - 22:00 every day), the store opens one hour earlier than DoorDash shows on every day. There is no relocation, closure or payment notice anywhere in the photo, so the only update needed is to the opening time.
+
+Recommendation: **Change Store Hours**
+
+The posted hours are clearly printed and legible on the glass door sign.
+
+Clarity score: 0.92
+
+Note: the closing time matches DoorDash, so only the opening time needs to change. If the store posts separate holiday hours later, those should be reviewed separately."""
+
+COMPACT_RESPONSE = """Sign: large printed sign on glass door
+Sign shows: "STORE HOURS - Open 7 days a week 7:00 AM - 10:00 PM"
+- Monday: 7:00 AM - 10:00 PM
+- Tuesday: 7:00 AM - 10:00 PM
+- Wednesday: 7:00 AM - 10:00 PM
+- Thursday: 7:00 AM - 10:00 PM
+- Friday: 7:00 AM - 10:00 PM
+- Saturday: 7:00 AM - 10:00 PM
+- Sunday: 7:00 AM - 10:00 PM
+Recommendation: **Change Store Hours**
+Clarity score: 0.92"""
+
+STORE_HOURS = ", ".join(f"{day}: 08:00 - 22:00" for day in
+                        ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+
+SCENARIOS = [
+    # label, canned answer, max_tokens, stream
+    ("full / blocking", FULL_RESPONSE, 1000, False),
+    ("full / streamed", FULL_RESPONSE, 1000, True),
+    ("compact / blocking", COMPACT_RESPONSE, 300, False),
+    ("compact / streamed", COMPACT_RESPONSE, 300, True),
+]
+
+
+def verdict_key(verdict):
+    return verdict.recommendation, verdict.confidence, verdict.day_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row latency of the response contracts, blocking vs streamed")
+    parser.add_argument("rows", nargs="?", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.3, help="stub seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="stub seconds per output token")
+    args = parser.parse_args()
+
+    server, state = start_stub_server(delay=args.delay, token_delay=args.token_delay)
+    cache_dir = tempfile.mkdtemp()
+    os.environ.update(OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_port}/v1", OPENAI_API_KEY="stub",
+                      RESPONSE_CACHE_PATH=os.path.join(cache_dir, "responses.sqlite3"),
+                      CHECKPOINT_PATH=os.path.join(cache_dir, "checkpoints.sqlite3"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fixed_drsc_code_v2 as drsc
+    prompt = drsc.build_store_hours_prompt(STORE_HOURS)
+
+    print(f"{args.rows} rows per scenario, stub: {args.delay * 1000:.0f} ms to first token, "
+          f"{args.token_delay * 1000:.0f} ms per token\n")
+    print(f"{'':20} {'ms/row':>8} {'speedup':>8} {'tokens/row':>11} {'chars kept':>15} {'vs blocking':>12}")
+    baseline_ms = None
+    blocking_verdicts = {}  # canned answer -> verdicts of its blocking scenario
+    for label, response, max_tokens, stream in SCENARIOS:
+        state.response_template = response
+        drsc.VISION_MAX_TOKENS = max_tokens
+        drsc.VISION_STREAM = stream
+        tokens_before = state.tokens_generated
+
+        started = time.perf_counter()
+        results = [drsc.request_vision_response(prompt, {"url": f"http://img/{row}.jpg"}) for row in range(args.rows)]
+        elapsed_ms = (time.perf_counter() - started) / args.rows * 1000
+        # Let the server finish counting tokens for streams it noticed closing late
+        time.sleep(0.05)
+
+        verdicts = {verdict_key(drsc.classify(result, STORE_HOURS, 12)) for result in results}
+        if baseline_ms is None:
+            baseline_ms = elapsed_ms
+        if stream:
+            agreement = "same" if verdicts == blocking_verdicts[response] else "DIFFERS"
+        else:
+            blocking_verdicts[response], agreement = verdicts, "-"
+        tokens = (state.tokens_generated - tokens_before) / args.rows
+        kept = f"{len(results[0])}/{len(response)}"
+        print(f"{label:20} {elapsed_ms:>8.0f} {baseline_ms / elapsed_ms:>7.2f}x {tokens:>11.0f} {kept:>15} {agreement:>12}")
+
+    print(f"\n{state.streams_closed_early} streams hung up before the model finished "
+          f"(the stub only notices once a write fails, so tokens/row is an upper bound when streamed)")
+    for response, verdicts in blocking_verdicts.items():
+        recommendation, confidence, _ = next(iter(verdicts))
+        print(f"{'Full' if response is FULL_RESPONSE else 'Compact'} answer: {recommendation}, clarity {confidence:.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# ============= BENCHMARK: STRUCTURED JSON VS FREE-TEXT RESPONSES =============
+# Renders the same synthetic store reviews both ways the vision model can
+# answer - free text (VISION_RESPONSE_FORMAT=text) and the structured_review
+# JSON schema (VISION_RESPONSE_FORMAT=json) - then compares parse time, full
+# classify() time, output tokens and how often the two verdicts agree.
+#
+# Token counts use tiktoken (gpt-4o's o200k_base) when it is installed and the
+# rate limiter's 4-characters-per-token estimate otherwise.
+#
+#   python benchmarks/bench_structured_output.py [reviews]
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_cache_dir = tempfile.mkdtemp()
+os.environ.setdefault('RESPONSE_CACHE_PATH', os.path.join(_cache_dir, 'responses.sqlite3'))
+os.environ.setdefault('CHECKPOINT_PATH', os.path.join(_cache_dir, 'checkpoints.sqlite3'))
+with contextlib.redirect_stdout(io.StringIO()):
+    import fixed_drsc_code_v2 as drsc  # noqa: E402
+from structured_review import parse_store_review  # noqa: E402
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+    TOKENIZER = "tiktoken o200k_base"
+
+    def count_tokens(text):
+        return len(_ENCODING.encode(text))
+except ImportError:
+    TOKENIZER = "~4 chars/token estimate (pip install tiktoken for exact counts)"
+
+    def count_tokens(text):
+        return len(text) // 4
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DOORDASH_HOURS = ", ".join(f"{day.capitalize()}: 08:00 - 22:00" for day in DAYS)
+SCENARIOS = [
+    ("Change Store Hours", "large sign", "Store hours"),
+    ("No Change", "sign on glass", "Store hours"),
+    ("Temporarily Close For Day", "paper sign", "Closed today due to power outage. Sorry for the inconvenience"),
+    ("Permanently Close Store", "paper sign", "This location is permanently closed"),
+    ("Address Change", "large sign", "We are moving to 123 Main Street"),
+]
+
+
+def synthetic_review(rng):
+    recommendation, sign_type, evidence = rng.choice(SCENARIOS)
+    clarity = rng.choice([0.95, 0.92, 0.85, 0.75])
+    if recommendation in ("Change Store Hours", "No Change"):
+        opens, closes = (rng.randint(6, 9), rng.randint(20, 23)) if recommendation == "Change Store Hours" else (8, 22)
+        hours = {day: {"start": f"{opens:02d}:00", "end": f"{closes:02d}:00"} for day in DAYS}
+    else:
+        hours = {day: None for day in DAYS}
+    return {
+        "recommendation": recommendation, "hours": hours, "clarity": clarity, "sign_type": sign_type,
+        "evidence": evidence, "new_address": "123 Main Street" if recommendation == "Address Change" else None,
+        "special_hours": []
+    }
+
+
+def twelve_hour(clock):
+    hour, minute = map(int, clock.split(":"))
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def as_text(review):
+    """The same review written the way text-mode responses read"""
+    lines = [f"The image shows a {review['sign_type']} on the door. The sign reads: \"{review['evidence']}\"."]
+    if any(review["hours"].values()):
+        lines.append("**Posted Hours:**")
+        for day, hours in review["hours"].items():
+            if hours:
+                lines.append(f"- {day.capitalize()}: {twelve_hour(hours['start'])} - {twelve_hour(hours['end'])}")
+    lines.append("The posted hours are readable and were compared against the current DoorDash hours.")
+    lines.append(f"Recommendation: **{review['recommendation']}**")
+    lines.append(f"Clarity score: {review['clarity']:.2f}")
+    return "\n".join(lines)
+
+
+def as_json(review):
+    """The same review as the compact JSON the API returns for the schema"""
+    return json.dumps(review, separators=(",", ":"))
+
+
+def regex_parse(text):
+    """The scraping the text path does before any rules run"""
+    clarity = drsc.extract_clarity_score(text)
+    return (drsc.extract_hours(text), clarity, drsc.get_gpt_recommendation(text),
+            drsc.extract_special_hours(text, clarity), drsc.extract_new_address(text))
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    reviews = [synthetic_review(rng) for _ in range(count)]
+    texts = [as_text(review) for review in reviews]
+    jsons = [as_json(review) for review in reviews]
+    assert all(parse_store_review(text) is None for text in texts)
+    assert all(parse_store_review(text) is not None for text in jsons)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        text_verdicts = [drsc.classify(text, DOORDASH_HOURS, 5) for text in texts]
+        json_verdicts = [drsc.classify(text, DOORDASH_HOURS, 5) for text in jsons]
+        timings = [
+            ("parse (regex scrape vs json.loads)",
+             best_of(lambda: [regex_parse(text) for text in texts]),
+             best_of(lambda: [parse_store_review(text) for text in jsons])),
+            ("classify() end to end",
+             best_of(lambda: [drsc.classify(text, DOORDASH_HOURS, 5) for text in texts]),
+             best_of(lambda: [drsc.classify(text, DOORDASH_HOURS, 5) for text in jsons])),
+        ]
+
+    print(f"{count:,} synthetic reviews\n")
+    print(f"{'':36} {'text (us/resp)':>15} {'json (us/resp)':>15} {'speedup':>8}")
+    for label, text_time, json_time in timings:
+        print(f"{label:36} {text_time / count * 1e6:>15.1f} {json_time / count * 1e6:>15.1f} {text_time / json_time:>7.1f}x")
+
+    text_tokens = sum(count_tokens(text) for text in texts) / count
+    json_tokens = sum(count_tokens(text) for text in jsons) / count
+    print(f"\nOutput tokens per response ({TOKENIZER}): text {text_tokens:.0f}, json {json_tokens:.0f}")
+
+    agree = sum(a.recommendation == b.recommendation for a, b in zip(text_verdicts, json_verdicts))
+    print(f"Same recommendation from both paths: {agree}/{count} ({agree / count:.1%})")
+    for scenario, _, _ in SCENARIOS:
+        rows = [(a, b) for review, a, b in zip(reviews, text_verdicts, json_verdicts) if review["recommendation"] == scenario]
+        if rows:
+            same = sum(a.recommendation == b.recommendation for a, b in rows)
+            print(f"   {scenario:28} {same}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
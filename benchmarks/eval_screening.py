@@ -0,0 +1,87 @@
+# ============= EVALUATION: TWO-TIER SCREENING VS SINGLE-TIER =============
+# Measures what SCREENING_MODE would have changed on a run that was made
+# without it. Reads single-tier store_hours_analysis_*.csv backups, screens
+# each row's photo with SCREENING_MODEL (answers go through the response
+# cache, so a second evaluation of the same backups makes no API calls) and
+# compares the cascade's routing with the verdicts saved in the backups.
+#
+# Escalated rows get the same full prompt as before, so they are assumed to
+# keep their saved verdict. Screened-out rows become "No change", which agrees
+# only where the single-tier verdict was "No change" too. The missed-action
+# count (changes, closures and address updates screened out) is what to
+# watch when trying another SCREENING_MODEL / SCREENING_DETAIL.
+#
+#   python benchmarks/eval_screening.py backup.csv [backup.csv ...] [--limit N] [--workers N]
+import argparse
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+with contextlib.redirect_stdout(io.StringIO()):
+    import fixed_drsc_code_v2 as drsc  # noqa: E402
+
+
+def screen(image_url):
+    """(escalate, error) for one photo; failed screening calls escalate, as in the cascade"""
+    try:
+        return drsc.screen_positive(drsc.screen_image(image_url)), None
+    except Exception as e:
+        return True, e
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SCREENING_MODE routing with single-tier backups")
+    parser.add_argument("backups", nargs="+", metavar="CSV")
+    parser.add_argument("--limit", type=int, default=None, help="only evaluate the first N rows")
+    parser.add_argument("--workers", type=int, default=drsc.VISION_MAX_WORKERS)
+    args = parser.parse_args()
+
+    df = drsc.load_backups(args.backups)
+    judged = df[
+        df["IMAGE_URL"].astype(bool)
+        & ~df["RECOMMENDATION"].isin(["Error", ""])
+        & (df["SUMMARY_REASON"] != "Processing error or skipped")
+        # Rows a cascade run already screened out have no single-tier verdict to compare with
+        & ~df["REASON"].str.startswith("Screening:")
+    ]
+    if args.limit:
+        judged = judged.head(args.limit)
+    if judged.empty:
+        print("No single-tier rows with an IMAGE_URL to evaluate")
+        return
+
+    cache_hits = drsc.RESPONSE_CACHE.hits
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        routing = list(executor.map(screen, judged["IMAGE_URL"]))
+    judged = judged.assign(ESCALATED=[escalate for escalate, _ in routing])
+    errors = sum(error is not None for _, error in routing)
+    api_calls = len(routing) - (drsc.RESPONSE_CACHE.hits - cache_hits)
+
+    total = len(judged)
+    escalated = int(judged["ESCALATED"].sum())
+    actions = judged["RECOMMENDATION"] != "No change"
+    missed = judged[actions & ~judged["ESCALATED"]]
+    agree = int((judged["ESCALATED"] | ~actions).sum())
+
+    print(f"\n{total} single-tier rows, screened with {drsc.SCREENING_MODEL} (detail={drsc.SCREENING_DETAIL}); "
+          f"{api_calls} screening calls, {total - api_calls} from cache, {errors} errors (escalated)")
+    print(f"Escalated to {drsc.VISION_MODEL}: {escalated}/{total} ({escalated / total:.1%}), "
+          f"so {total - escalated} full calls saved")
+    print(f"Same recommendation as single-tier: {agree}/{total} ({agree / total:.1%})")
+    print(f"Missed actions (non-'No change' screened out): {len(missed)}/{int(actions.sum())}\n")
+
+    print(f"{'single-tier recommendation':28} {'rows':>6} {'escalated':>10} {'screened out':>13}")
+    for recommendation, rows in judged.groupby("RECOMMENDATION"):
+        print(f"{recommendation:28} {len(rows):>6} {int(rows['ESCALATED'].sum()):>10} {int((~rows['ESCALATED']).sum()):>13}")
+
+    if len(missed):
+        print("\nMissed actions:")
+        for _, row in missed.head(20).iterrows():
+            print(f"   {row.get('STORE_ID')}: {row['RECOMMENDATION']} - {row['IMAGE_URL'][:80]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# ============= INCREMENTAL RUN CHECKPOINTS =============
+# Records which (STORE_ID, IMAGE_URL, timestamp, STORE_HOURS hash) tuples a
+# successful run has already judged, together with the verdict, so the next run
+# only sends unseen rows to the vision model and carries prior verdicts forward
+# for the rest. New DoorDash hours make a new key, so the photo is judged again.
+# A per-store index of photo dHashes lets a new, near-identical photo of the
+# same sign reuse the verdict of the one already judged against the same
+# DoorDash hours.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CHECKPOINT_PATH = os.path.join('.cache', 'checkpoints.sqlite3')
+DEFAULT_RETENTION_DAYS = 30
+
+
+def _json_default(value):
+    # numpy scalars (np.float64, np.bool_, ...) coming out of the DataFrame
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class CheckpointStore:
+    """SQLite watermark of processed DRSC rows and their verdicts"""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(processed_rows)")]
+        if columns and "store_hours" not in columns:
+            # Rows recorded before STORE_HOURS was part of the key can't be matched any more
+            self._conn.execute("DROP TABLE processed_rows")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(image_hashes)")]
+        if columns and "store_hours" not in columns:
+            # Hashes indexed without their STORE_HOURS could be reused against new hours
+            self._conn.execute("DROP TABLE image_hashes")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_rows (
+                store_id TEXT NOT NULL,
+                image_url TEXT NOT NULL,
+                image_ts TEXT NOT NULL,
+                store_hours TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                run_id TEXT,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (store_id, image_url, image_ts, store_hours)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                store_id TEXT NOT NULL,
+                store_hours TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                image_url TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                run_id TEXT,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (store_id, store_hours, image_hash)
+            )
+        """)
+        cutoff = time.time() - self.retention_seconds
+        self._conn.execute("DELETE FROM processed_rows WHERE processed_at < ?", (cutoff,))
+        self._conn.execute("DELETE FROM image_hashes WHERE processed_at < ?", (cutoff,))
+        self._conn.commit()
+
+    def lookup(self, keys):
+        """
+        Return {key: verdict_dict} for the keys that were processed by a previous run.
+        Keys are (store_id, image_url, image_ts, store_hours) tuples of strings.
+        """
+        found = {}
+        with self._lock:
+            for key in set(keys):
+                row = self._conn.execute(
+                    "SELECT verdict FROM processed_rows "
+                    "WHERE store_id = ? AND image_url = ? AND image_ts = ? AND store_hours = ?", key
+                ).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row[0])
+        return found
+
+    def record(self, entries, run_id=None):
+        """Persist (key, verdict_dict) pairs once a run has completed successfully"""
+        now = time.time()
+        rows = [
+            (*key, json.dumps(verdict, default=_json_default), run_id, now)
+            for key, verdict in entries
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO processed_rows VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def nearest_image(self, store_id, store_hours, image_hash, max_distance, max_age_days=None):
+        """
+        (distance, image_url, verdict_dict) for the store's previously judged photo whose
+        dHash is closest to image_hash, or None if none is within max_distance bits
+        (and judged within max_age_days, when given). Only photos judged against the
+        same store_hours (as in checkpoint keys) count.
+        """
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT image_hash, image_url, verdict FROM image_hashes "
+                "WHERE store_id = ? AND store_hours = ? AND processed_at >= ?",
+                (store_id, store_hours, cutoff)
+            ).fetchall()
+        best = None
+        for stored_hash, image_url, verdict in rows:
+            distance = bin(int(stored_hash, 16) ^ image_hash).count("1")
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, image_url, verdict)
+        if best is None:
+            return None
+        return best[0], best[1], json.loads(best[2])
+
+    def record_image_hashes(self, entries, run_id=None):
+        """Persist ((store_id, store_hours, image_hash, image_url), verdict_dict) pairs for judged photos"""
+        now = time.time()
+        rows = [
+            (store_id, store_hours, f"{image_hash:016x}", image_url, json.dumps(verdict, default=_json_default),
+             run_id, now)
+            for (store_id, store_hours, image_hash, image_url), verdict in entries
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO image_hashes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
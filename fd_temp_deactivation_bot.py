@@ -1,12 +1,10 @@
 # ============= IMPORTS =============
-import requests
 import pandas as pd
-import time
-from io import StringIO
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import os
 from datetime import datetime
+from mode_client import ModeClient
 
 # ============= CREDENTIALS (from environment variables) =============
 MODE_TOKEN = os.environ.get('MODE_TOKEN')
@@ -14,6 +12,8 @@ MODE_SECRET = os.environ.get('MODE_SECRET')
 MODE_ACCOUNT = 'doordash'
 REPORT_ID = 'e908b96aa50a'
 
+MODE_CLIENT = ModeClient(MODE_ACCOUNT, MODE_TOKEN, MODE_SECRET)
+
 SLACK_BOT_TOKEN = os.environ.get('SLACK_BOT_TOKEN')
 SLACK_CHANNEL_ID = 'C098G9URHEV'  # #daily-ai-drsc-experiment - update if different
 
@@ -27,56 +27,30 @@ FABIENNE_USER_ID = 'U02NGA5G1GV'  # Fabienne
 # ============= MODE API FUNCTIONS =============
 def run_mode_report():
     """Trigger a Mode report run and return the run token."""
-    url = f"https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs"
-    response = requests.post(url, auth=(MODE_TOKEN, MODE_SECRET))
-    response.raise_for_status()
-    return response.json()['token']
+    return MODE_CLIENT.start_run(REPORT_ID)
 
 
 def wait_for_report(run_token, max_wait=300):
     """Wait for the Mode report to complete."""
-    url = f"https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}"
-    start_time = time.time()
-    
-    while time.time() - start_time < max_wait:
-        response = requests.get(url, auth=(MODE_TOKEN, MODE_SECRET))
-        response.raise_for_status()
-        state = response.json()['state']
-        
-        if state == 'succeeded':
-            return True
-        elif state in ['failed', 'cancelled']:
-            print(f"Report run failed with state: {state}")
-            return False
-        
-        print(f"Report state: {state}. Waiting...")
-        time.sleep(10)
-    
-    print("Timeout waiting for report")
-    return False
+    try:
+        MODE_CLIENT.wait_for_run(REPORT_ID, run_token, max_wait=max_wait)
+        return True
+    except TimeoutError:
+        print("Timeout waiting for report")
+        return False
+    except Exception as e:
+        print(f"Report run failed: {e}")
+        return False
 
 
 def get_query_results(run_token):
-    """Fetch CSV results from the completed Mode query."""
-    # First, get the list of query runs to find the correct query token
-    queries_url = f"https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs"
-    response = requests.get(queries_url, auth=(MODE_TOKEN, MODE_SECRET))
-    response.raise_for_status()
-    
-    query_runs = response.json()['_embedded']['query_runs']
-    
-    if not query_runs:
-        raise Exception("No query runs found in report")
-    
-    # Get the first query's token (since this report has one query)
-    query_run_token = query_runs[0]['token']
+    """Stream the CSV results from the completed Mode query into a DataFrame."""
+    # This report has one query, so take the first query run
+    query_run_token = MODE_CLIENT.get_query_run_token(REPORT_ID, run_token)
     print(f"   Found query run token: {query_run_token}")
     
-    # Now fetch the results using the query run token
-    results_url = f"https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs/{query_run_token}/results/content.csv"
-    response = requests.get(results_url, auth=(MODE_TOKEN, MODE_SECRET))
-    response.raise_for_status()
-    return response.text
+    chunks = list(MODE_CLIENT.iter_results_chunks(REPORT_ID, run_token, query_run_token, dtype={'STORE_ID': str}))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
 
 
 # ============= SLACK FUNCTIONS =============
@@ -140,8 +114,7 @@ def main():
     # Step 3: Get results
     print("\n📥 Fetching query results...")
     try:
-        csv_data = get_query_results(run_token)
-        df = pd.read_csv(StringIO(csv_data))
+        df = get_query_results(run_token)
         print(f"   Retrieved {len(df)} rows")
     except Exception as e:
         print(f"❌ Failed to fetch results: {e}")
@@ -1,16 +1,37 @@
 # ============= IMPORTS =============
-import requests
 import pandas as pd
-import time
-from io import StringIO
+import numpy as np
 import openai
 from tqdm import tqdm
-import re
 import datetime
 from zoneinfo import ZoneInfo
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import os
+import ast
+import hashlib
+import glob
+import argparse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable
+from rate_limiter import create_chat_completion, completion_text, get_shared_limiter, stream_chat_completion
+from batch_client import run_chat_batch
+from response_cache import ResponseCache
+from image_prefetch import ImagePrefetcher
+from checkpoint_store import CheckpointStore
+from mode_client import ModeClient, looks_like_timestamp_column, parse_timestamp_columns
+from phrase_matcher import PhraseMatcher
+from structured_review import STORE_REVIEW_RESPONSE_FORMAT, parse_store_review
+from response_patterns import (GLASS_HOUR_RES, STATED_HOUR_RES, SPECIFIC_TIME_RES, RECOMMENDATION_RES,
+                               CLARITY_SCORE_RE, ADDRESS_RE, SPECIAL_HOLIDAY_SECTION_RE, CANONICAL_TIME_RE,
+                               clarity_score_end)
+import holiday_calendar
+from hours_parser import (extract_hours, normalize_time, parse_store_hours, store_hours_matrix,
+                          posted_hours_array)
+from hours_diff import hours_identical
 
 print("=" * 60)
 print("SCRIPT STARTED - Testing output")
@@ -23,12 +44,18 @@ MODE_SECRET = os.environ.get('MODE_SECRET')
 MODE_ACCOUNT = 'doordash'
 REPORT_ID = '8b50b0629b6b'
 QUERY_ID = '036132875b62'
+MODE_MAX_WAIT = int(os.environ.get('MODE_MAX_WAIT', '1800'))  # Give up on the report run after 30 min
+# Explicit dtypes for the streamed report CSV (timestamp columns are parsed with parse_dates=True)
+DRSC_CSV_DTYPES = {'STORE_ID': str, 'IMAGE_URL': str, 'STORE_HOURS': str}
 
 openai.api_key = os.environ.get('OPENAI_API_KEY')
+openai.max_retries = 0  # Retries and backoff are handled by rate_limiter
 
 SLACK_BOT_TOKEN = os.environ.get('SLACK_BOT_TOKEN')
 SLACK_CHANNEL_ID = 'C098G9URHEV'
 
+MODE_CLIENT = ModeClient(MODE_ACCOUNT, MODE_TOKEN, MODE_SECRET)
+
 print(f"✅ Loaded environment variables")
 print(f"   MODE_TOKEN: {'Set' if MODE_TOKEN else 'MISSING'}")
 print(f"   MODE_SECRET: {'Set' if MODE_SECRET else 'MISSING'}")
@@ -37,6 +64,65 @@ print(f"   SLACK_BOT_TOKEN: {'Set' if SLACK_BOT_TOKEN else 'MISSING'}")
 
 # ============= CONFIGURATION =============
 
+# Vision model settings
+# Number of image requests kept in flight at once during process_store_hours
+VISION_MODEL = "gpt-4o"
+VISION_MAX_WORKERS = int(os.environ.get('VISION_MAX_WORKERS', '8'))
+# "text" (free text + regex chain) or "json" (structured_review schema; the regex chain stays as fallback)
+VISION_RESPONSE_FORMAT = os.environ.get('VISION_RESPONSE_FORMAT', 'text').lower()
+# "compact": text responses in a fixed line-per-fact format (sign, evidence, per-day hours,
+# recommendation, clarity last) instead of free prose; "full": the original open-ended answer.
+# JSON responses already follow the schema, so only the token cap applies to them
+VISION_RESPONSE_CONTRACT = os.environ.get('VISION_RESPONSE_CONTRACT', 'full').lower()
+VISION_MAX_TOKENS = int(os.environ.get('VISION_MAX_TOKENS', '300' if VISION_RESPONSE_CONTRACT == 'compact' else '1000'))
+# Stream text responses and hang up once the clarity score (the last thing the
+# classifier needs) has arrived, instead of waiting for whatever the model adds after it
+VISION_STREAM = os.environ.get('VISION_STREAM', 'false').lower() == 'true'
+
+# Streaming pipeline: overlap the Mode download, vision calls and classification
+# Rows buffered between pipeline stages (bounds memory while stages overlap)
+USE_PIPELINE = os.environ.get('USE_PIPELINE', 'true').lower() == 'true'
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '64'))
+
+# Batch mode (or --batch): send the vision calls through the OpenAI Batch API for backfills.
+# Half price, but answers take minutes to hours, so the streaming pipeline is skipped
+BATCH_MODE = os.environ.get('BATCH_MODE', 'false').lower() == 'true'
+BATCH_MAX_WAIT = int(os.environ.get('BATCH_MAX_WAIT', str(24 * 3600)))
+
+# Two-tier mode: a cheap low-detail pass asks whether any hours/closure sign is visible,
+# and only those images get the full VISION_MODEL prompt (not applied in batch mode)
+SCREENING_MODE = os.environ.get('SCREENING_MODE', 'false').lower() == 'true'
+SCREENING_MODEL = os.environ.get('SCREENING_MODEL', 'gpt-4o-mini')
+SCREENING_DETAIL = os.environ.get('SCREENING_DETAIL', 'low')
+
+# On-disk cache of raw vision responses so repeat images skip the API
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', os.path.join('.cache', 'vision_responses.sqlite3'))
+RESPONSE_CACHE_TTL_HOURS = float(os.environ.get('RESPONSE_CACHE_TTL_HOURS', str(7 * 24)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '50000'))
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL_HOURS, RESPONSE_CACHE_MAX_ENTRIES)
+
+# Image prefetch: download, downscale and dedup photos here and send them as base64
+# data URLs, instead of having OpenAI fetch the full-resolution originals
+IMAGE_PREFETCH = os.environ.get('IMAGE_PREFETCH', 'false').lower() == 'true'
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', '1024'))
+IMAGE_DETAIL = os.environ.get('IMAGE_DETAIL', 'high')  # low / high / auto
+IMAGE_PREFETCHER = ImagePrefetcher(IMAGE_MAX_DIMENSION, IMAGE_DETAIL, pool_size=VISION_MAX_WORKERS)
+
+# Incremental mode: only send (STORE_ID, IMAGE_URL, timestamp, STORE_HOURS) rows not judged
+# by a previous successful run to the vision model; earlier verdicts are carried forward
+INCREMENTAL_MODE = os.environ.get('INCREMENTAL_MODE', 'false').lower() == 'true'
+CHECKPOINT_PATH = os.environ.get('CHECKPOINT_PATH', os.path.join('.cache', 'checkpoints.sqlite3'))
+CHECKPOINTS = CheckpointStore(CHECKPOINT_PATH)
+
+# Near-duplicate reuse: a photo whose dHash is within NEAR_DUPLICATE_MAX_DISTANCE bits (of 64)
+# of one judged for the same store and STORE_HOURS in the last NEAR_DUPLICATE_MAX_AGE_DAYS gets
+# that verdict instead of a vision call. A hash can't read text - a new notice that looks like
+# the old sign still matches, at any distance - so the age limit is kept small. Every unjudged
+# photo is downloaded to hash it (with IMAGE_PREFETCH, that download is the one sent to the model).
+NEAR_DUPLICATE_REUSE = os.environ.get('NEAR_DUPLICATE_REUSE', 'false').lower() == 'true'
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', '4'))
+NEAR_DUPLICATE_MAX_AGE_DAYS = float(os.environ.get('NEAR_DUPLICATE_MAX_AGE_DAYS', '7'))
+
 # Default timezone for determining temp closure duration
 # Change this to match your operational timezone
 DEFAULT_TIMEZONE = 'America/Los_Angeles'  # Pacific Time
@@ -133,85 +219,68 @@ holiday_keywords = {
 }
 
 # ============= NEGATIVE CONTEXT DETECTION =============
+negative_indicators = [
+    "no ", "not ", "n't ", "there is no", "there are no", 
+    "does not", "doesn't", "did not", "didn't", "without",
+    "absence of", "lacking", "missing", "none", "neither",
+    "there's no", "there isn't", "there aren't", "no sign",
+    "no indication", "no evidence"
+]
+
+# Strong permanent closure wording (stricter than permanent_closure_phrases - no "store closing")
+permanent_closure_strong_phrases = [
+    "permanently closing", "closed permanently", "permanent closure",
+    "permanently closed", "closing permanently", "will be permanently closing",
+    "this location is now permanently closed"
+]
+
+# Payment issues must be quoted or explicitly attributed to the sign
+explicit_payment_issue_phrases = [
+    '"cash only"', "'cash only'", "sign says cash only",
+    '"no credit"', "'no credit'", "credit cards not accepted",
+    '"registers down"', "'registers down'", "register is down",
+    '"no ebt"', "'no ebt'", "ebt down", "ebt not working",
+    '"ebt down"', "'ebt down'", "sign says no ebt"
+]
+
+# All phrase lists compiled once; each response is scanned a single time
+PHRASE_MATCHER = PhraseMatcher(
+    {
+        "permanent_closure": permanent_closure_strong_phrases,
+        "long_term_closure": long_term_closure_phrases,
+        "address_change": address_change_phrases,
+        "payment_issue": explicit_payment_issue_phrases,
+        "negative": negative_indicators,
+        **{f"category:{category}": terms for category, terms in closure_categories.items()}
+    },
+    negative_group="negative",
+    negative_window=50
+)
+
 def has_negative_context(text, phrase_position):
     """
     Check if a phrase at a given position has negative context before it.
     Returns True if the phrase is preceded by negative words.
     """
-    context_start = max(0, phrase_position - 50)
-    context_before = text[context_start:phrase_position].lower()
-    
-    negative_indicators = [
-        "no ", "not ", "n't ", "there is no", "there are no", 
-        "does not", "doesn't", "did not", "didn't", "without",
-        "absence of", "lacking", "missing", "none", "neither",
-        "there's no", "there isn't", "there aren't", "no sign",
-        "no indication", "no evidence"
-    ]
-    
-    return any(neg in context_before for neg in negative_indicators)
+    return PHRASE_MATCHER.scan(text).is_negated(phrase_position)
 
-# ============= HOUR NORMALIZATION FUNCTIONS =============
-def time_to_minutes(time_str):
-    """Convert HH:MM or H:MM to minutes since midnight"""
-    if not time_str or pd.isna(time_str):
-        return None
-    try:
-        time_str = str(time_str).strip()
-        if ':' in time_str:
-            parts = time_str.split(':')
-            hours = int(parts[0])
-            minutes = int(parts[1][:2])
-            return hours * 60 + minutes
-    except:
-        return None
-    return None
+def has_unnegated_phrase(text, group):
+    """True if any occurrence of a phrase from the group is free of negative context"""
+    hits = PHRASE_MATCHER.scan(text)
+    return any(not hits.is_negated(position) for position, _ in hits.group_hits(group))
 
-def hours_are_identical(posted_hours_dict, doordash_hours_str):
+# ============= HOUR NORMALIZATION FUNCTIONS =============
+def hours_are_identical(posted_hours_dict, doordash_hours):
     """
-    Check if posted hours match DoorDash hours exactly
+    Check if posted hours match DoorDash hours (within 5 minutes on every comparable day, 4+ days)
     Handles format conversions (8 a.m.-10 p.m. = 08:00-22:00)
+    
+    doordash_hours is the STORE_HOURS string or its parse_store_hours(exact_day_names=True)
+    array: DoorDash days only compare when named in lowercase, as they always have here.
     """
-    try:
-        # Parse DoorDash hours
-        dd_hours = {}
-        for day_entry in doordash_hours_str.split(', '):
-            if ':' in day_entry:
-                day, hours = day_entry.split(': ', 1)
-                if ' - ' in hours:
-                    start, end = hours.split(' - ')
-                    dd_hours[day] = {'start': start, 'end': end}
-        
-        # Compare each day
-        days_matched = 0
-        days_different = 0
-        
-        for day, times in posted_hours_dict.items():
-            if day in dd_hours:
-                dd_times = dd_hours[day]
-                
-                # Convert to minutes for comparison
-                posted_start_min = time_to_minutes(times.get('start', ''))
-                posted_end_min = time_to_minutes(times.get('end', ''))
-                dd_start_min = time_to_minutes(dd_times['start'])
-                dd_end_min = time_to_minutes(dd_times['end'])
-                
-                if None in [posted_start_min, posted_end_min, dd_start_min, dd_end_min]:
-                    continue
-                
-                # Check if they match (within 5 minute tolerance)
-                if (abs(posted_start_min - dd_start_min) <= 5 and 
-                    abs(posted_end_min - dd_end_min) <= 5):
-                    days_matched += 1
-                else:
-                    days_different += 1
-        
-        # If all parsed days match, hours are identical
-        return days_different == 0 and days_matched >= 4
-        
-    except Exception as e:
-        print(f"Error comparing hours: {e}")
-        return False
+    if isinstance(doordash_hours, str):
+        doordash_hours = parse_store_hours(doordash_hours, exact_day_names=True)
+    return bool(hours_identical(posted_hours_array(posted_hours_dict), doordash_hours))
 
 def detect_glass_reflection_cases(text, clarity_score):
     """
@@ -229,19 +298,7 @@ def detect_glass_reflection_cases(text, clarity_score):
     has_glass = any(ind in lower for ind in glass_indicators)
     
     # Check if specific hours are clearly stated - ENHANCED PATTERNS
-    hour_patterns = [
-        r'\d{1,2}\s*am\s*[-–]\s*\d{1,2}\s*pm',  # 6am - 10pm, 8 am - 9 pm
-        r'\d{1,2}am[-–]\d{1,2}pm',  # 6am-10pm, 8am-9pm
-        r'open\s+every\s+day',  # "open every day"
-        r'everyday',  # "everyday"
-        r'\d{1,2}:\d{2}\s*[-–]\s*\d{1,2}:\d{2}',  # 06:00 - 22:00
-        r'mon[.\s-]*sat[.\s:]*\d{1,2}',  # Mon.-Sat.: 8
-        r'sun[.\s:]*\d{1,2}',  # Sun.: 8
-        r'hours:\s*\d{1,2}',  # hours: 8
-        r'hours\s*mon',  # hours monday
-    ]
-    
-    has_clear_hours = any(re.search(pattern, lower) for pattern in hour_patterns)
+    has_clear_hours = any(pattern.search(lower) for pattern in GLASS_HOUR_RES)
     
     # Additional check: if GPT explicitly states the hours in the response
     explicit_hour_statements = [
@@ -306,19 +363,7 @@ def detect_sign_size_issues(text, clarity_score):
     has_location = any(desc in lower for desc in location_descriptors)
     
     # Check if hours are clearly stated in the response
-    hours_clearly_stated = False
-    hour_patterns = [
-        r'\d{1,2}:\d{2}\s*[ap]m\s*-\s*\d{1,2}:\d{2}\s*[ap]m',  # 8:00am - 9:00pm
-        r'\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}',  # 08:00 - 21:00
-        r'\d{1,2}\s*am\s*[-–]\s*\d{1,2}\s*pm',  # 8am - 10pm
-        r'open\s+\d{1,2}',  # open 8
-        r'everyday', r'every day'  # everyday/every day
-    ]
-    
-    for pattern in hour_patterns:
-        if re.search(pattern, lower):
-            hours_clearly_stated = True
-            break
+    hours_clearly_stated = any(pattern.search(lower) for pattern in STATED_HOUR_RES)
     
     # If hours are clearly stated with good clarity, don't require strict location
     if hours_clearly_stated and clarity_score >= 0.85:
@@ -365,9 +410,7 @@ def validate_gpt_extraction(result, clarity_score, recommendation):
     
     # Check if specific hours are mentioned
     specific_hours_mentioned = any([
-        re.search(r'\d{1,2}:\d{2}', lower),  # Any time format
-        re.search(r'\d{1,2}\s*am', lower),  # 8am, 8 am
-        re.search(r'\d{1,2}\s*pm', lower),  # 9pm, 9 pm
+        any(pattern.search(lower) for pattern in SPECIFIC_TIME_RES),  # 8:00, 8am, 9 pm
         "am" in lower or "pm" in lower,
         "everyday" in lower or "every day" in lower
     ])
@@ -410,128 +453,57 @@ def validate_gpt_extraction(result, clarity_score, recommendation):
 
 # ============= UPDATED HELPER FUNCTIONS =============
 def categorize_closure(text):
-    lower = text.lower()
-    for category, terms in closure_categories.items():
-        if any(t in lower for t in terms):
+    hits = PHRASE_MATCHER.scan(text)
+    for category in closure_categories:
+        if hits.has_group(f"category:{category}"):
             return category
     return "other"
 
 def is_permanent_closure(text):
     """Check if the text indicates a permanent closure"""
-    lower = text.lower()
+    hits = PHRASE_MATCHER.scan(text)
     
     # First check if it's a long-term temp closure (takes precedence)
     for phrase in long_term_closure_phrases:
-        if phrase in lower:
-            index = lower.find(phrase)
-            if not has_negative_context(text, index):
-                return False
-    
-    strong_indicators = [
-        "permanently closing", "closed permanently", "permanent closure",
-        "permanently closed", "closing permanently", "will be permanently closing",
-        "this location is now permanently closed"
-    ]
-    
-    for phrase in strong_indicators:
-        if phrase in lower:
-            index = 0
-            while index < len(lower):
-                index = lower.find(phrase, index)
-                if index == -1:
-                    break
-                if not has_negative_context(text, index):
-                    return True
-                index += len(phrase)
+        index = hits.first(phrase)
+        if index != -1 and not hits.is_negated(index):
+            return False
     
-    return False
+    return has_unnegated_phrase(text, "permanent_closure")
 
 def is_long_term_closure(text):
     """Check if the text indicates a long-term temporary closure"""
-    lower = text.lower()
-    
-    for phrase in long_term_closure_phrases:
-        if phrase in lower:
-            index = 0
-            while index < len(lower):
-                index = lower.find(phrase, index)
-                if index == -1:
-                    break
-                if not has_negative_context(text, index):
-                    return True
-                index += len(phrase)
-    
-    return False
+    return has_unnegated_phrase(text, "long_term_closure")
 
 def is_payment_issue(text):
     """Check if the text ACTUALLY mentions payment system issues - STRICTER"""
-    lower = text.lower()
-    
-    # Must explicitly mention these issues with quotes or "sign says"
-    explicit_payment_issues = [
-        '"cash only"', "'cash only'", "sign says cash only",
-        '"no credit"', "'no credit'", "credit cards not accepted",
-        '"registers down"', "'registers down'", "register is down",
-        '"no ebt"', "'no ebt'", "ebt down", "ebt not working",
-        '"ebt down"', "'ebt down'", "sign says no ebt"
-    ]
+    hits = PHRASE_MATCHER.scan(text)
     
     # Check for quoted or explicitly mentioned payment issues
-    for issue in explicit_payment_issues:
-        if issue in lower:
-            index = lower.find(issue)
-            if not has_negative_context(text, index):
-                return True
-    
-    # If GPT just mentions these without quotes or "sign says", be suspicious
-    vague_mentions = ["payment issue", "ebt issue", "no ebt/ebt down"]
-    if any(mention in lower for mention in vague_mentions):
-        # Check if it's actually quoted
-        has_quotes = '"' in lower or "'" in lower or "sign says" in lower or "sign indicates" in lower
-        if not has_quotes:
-            return False  # Likely GPT interpretation, not actual sign
-    
+    # (only the first mention of each phrase counts, as before)
+    for issue in explicit_payment_issue_phrases:
+        index = hits.first(issue)
+        if index != -1 and not hits.is_negated(index):
+            return True
+    
+    # Vague mentions ("payment issue", "ebt issue") without quotes are likely
+    # GPT interpretation, not an actual sign
     return False
 
 def is_address_change(text):
     """Check if the text indicates an address change/relocation"""
-    lower = text.lower()
-    
-    for phrase in address_change_phrases:
-        if phrase in lower:
-            index = 0
-            while index < len(lower):
-                index = lower.find(phrase, index)
-                if index == -1:
-                    break
-                if not has_negative_context(text, index):
-                    return True
-                index += len(phrase)
-    
-    return False
+    return has_unnegated_phrase(text, "address_change")
 
 def extract_new_address(text):
     """Extract new address from text if mentioned"""
-    lower = text.lower()
+    hits = PHRASE_MATCHER.scan(text)
     
-    for phrase in address_change_phrases:
-        if phrase in lower:
-            index = 0
-            while index < len(lower):
-                index = lower.find(phrase, index)
-                if index == -1:
-                    break
-                
-                if not has_negative_context(text, index):
-                    search_start = index
-                    search_text = text[search_start:min(len(text), search_start + 200)]
-                    
-                    address_pattern = r"(?:new address:|new location:|moved to:|find us at:)?\s*(\d+\s+[A-Za-z0-9\s,\.]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct)[A-Za-z0-9\s,\.]*)"
-                    match = re.search(address_pattern, search_text, re.IGNORECASE)
-                    if match:
-                        return match.group(1).strip()
-                
-                index += len(phrase)
+    for index, phrase in hits.group_hits("address_change"):
+        if not hits.is_negated(index):
+            search_text = text[index:min(len(text), index + 200)]
+            match = ADDRESS_RE.search(search_text)
+            if match:
+                return match.group(1).strip()
     
     return ""
 
@@ -539,17 +511,8 @@ def get_gpt_recommendation(text):
     """Extract the explicit recommendation from GPT's response - IMPROVED"""
     lower = text.lower()
     
-    patterns = [
-        r"recommendation:\s*\*\*([^*]+)\*\*",
-        r"recommendation:\s*([^\n]+)",
-        r"recommend:\s*\*\*([^*]+)\*\*",
-        r"recommend:\s*([^\n]+)",
-        r"\*\*([^*]+)\*\*"  # Sometimes just in bold
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, lower)
-        for match in matches:
+    for pattern in RECOMMENDATION_RES:
+        for match in pattern.findall(lower):
             # Check if this is actually a recommendation
             if any(rec in match for rec in ["temporarily close", "permanently close", 
                                              "change store hours", "no change", 
@@ -582,33 +545,6 @@ def should_trust_gpt_recommendation(gpt_recommendation, clarity_score):
     
     return any(key in gpt_recommendation for key in gpt_to_action)
 
-def extract_hours(text):
-    hours = {}
-    pattern = r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(\d{1,2}:\d{2}(?:\s*[ap]m)?)\s*[-–]\s*(\d{1,2}:\d{2}(?:\s*[ap]m)?)"
-    for day, start, end in re.findall(pattern, text, re.IGNORECASE):
-        try:
-            start_clean = start.strip().lower().replace(" ", "")
-            end_clean = end.strip().lower().replace(" ", "")
-            if not ("am" in start_clean or "pm" in start_clean):
-                start_clean += "am"
-            if not ("am" in end_clean or "pm" in end_clean):
-                end_clean += "pm"
-            
-            e = datetime.datetime.strptime(end_clean, "%I:%M%p").strftime("%H:%M:%S")
-            s = datetime.datetime.strptime(start_clean, "%I:%M%p").strftime("%H:%M:%S")
-            
-            day_lower = day.lower()
-            hours[day_lower] = {"start": s, "end": e}
-        except:
-            try:
-                s = datetime.datetime.strptime(start.strip(), "%H:%M").strftime("%H:%M:%S")
-                e = datetime.datetime.strptime(end.strip(), "%H:%M").strftime("%H:%M:%S")
-                day_lower = day.lower()
-                hours[day_lower] = {"start": s, "end": e}
-            except:
-                continue
-    return hours
-
 def extract_special_hours(text, clarity_score=None):
     """Extract special holiday hours from text - STRICT VERSION"""
     special_hours = []
@@ -633,11 +569,7 @@ def extract_special_hours(text, clarity_score=None):
     if not has_physical_sign:
         return special_hours
     
-    special_section_match = re.search(
-        r'SPECIAL\s+HOLIDAY\s+HOURS\s*:\s*(.*?)(?:\n\n|\Z)',
-        text,
-        re.IGNORECASE | re.DOTALL
-    )
+    special_section_match = SPECIAL_HOLIDAY_SECTION_RE.search(text)
     
     if not special_section_match:
         return special_hours
@@ -685,55 +617,19 @@ def extract_special_hours(text, clarity_score=None):
     
     return special_hours
 
-def get_holiday_date(holiday_name, year=2025):
-    """Get the date for a given holiday"""
-    lower_holiday = holiday_name.lower()
-    
-    if "thanksgiving" in lower_holiday:
-        november_thursdays = []
-        for day in range(1, 31):
-            try:
-                if datetime.date(year, 11, day).weekday() == 3:
-                    november_thursdays.append(day)
-            except ValueError:
-                break
-        if len(november_thursdays) >= 4:
-            return datetime.date(year, 11, november_thursdays[3])
-    elif "christmas" in lower_holiday:
-        return datetime.date(year, 12, 25)
-    elif "new year" in lower_holiday:
-        return datetime.date(year + 1, 1, 1)
-    
-    return None
-
-def normalize_time(t):
-    if not t or not isinstance(t, str) or not re.match(r"\d{1,2}:\d{2}:\d{2}", t):
-        return ""
-    if t == "00:00:00":
-        return "23:59:59"
-    try:
-        return datetime.datetime.strptime(t, "%H:%M:%S").strftime("%H:%M:%S")
-    except:
-        return t
-
-def time_diff_min(t1, t2):
-    try:
-        dt1 = datetime.datetime.strptime(t1, "%H:%M:%S")
-        dt2 = datetime.datetime.strptime(t2, "%H:%M:%S")
-        delta = abs((dt1 - dt2).total_seconds())
-        return min(delta, 86400 - delta) / 60
-    except:
-        return 999
+def get_holiday_date(holiday_name, year=None):
+    """Get the date for a given holiday (the next one on or after today by default)"""
+    return holiday_calendar.get_holiday_date(holiday_name, year)
 
 def confidence_from_hours(posted_hours_dict):
     valid_days = 0
     for v in posted_hours_dict.values():
-        if v.get("start") and v.get("end") and re.match(r"^\d{2}:\d{2}:\d{2}$", v["start"]) and re.match(r"^\d{2}:\d{2}:\d{2}$", v["end"]):
+        if v.get("start") and v.get("end") and CANONICAL_TIME_RE.match(v["start"]) and CANONICAL_TIME_RE.match(v["end"]):
             valid_days += 1
     return round(min(max(valid_days / 7.0, 0.0), 1.0), 2)
 
 def extract_clarity_score(text):
-    m = re.search(r"clarity\s*score\s*[:\-]\s*(1(?:\.0+)?|0\.\d+|\.\d+)", text, re.IGNORECASE)
+    m = CLARITY_SCORE_RE.search(text)
     if m:
         try:
             score = float(m.group(1))
@@ -748,51 +644,113 @@ def hour_change_confidence(parse_coverage, clarity):
     """Confidence score specifically for hour changes"""
     return round(max(0.0, min(1.0, 0.6*parse_coverage + 0.4*clarity)), 2)
 
+def get_timestamp_column(df):
+    """First column that looks like the image timestamp (used for dedup and checkpoints)"""
+    timestamp_cols = [col for col in df.columns if looks_like_timestamp_column(col)]
+    return timestamp_cols[0] if timestamp_cols else None
+
+# ============= INCREMENTAL CHECKPOINTS =============
+# Columns written by process_store_hours that make up a row's verdict
+VERDICT_COLUMNS = [
+    "RECOMMENDATION", "REASON", "SUMMARY_REASON", "deactivation_reason_id", "is_temp_deactivation",
+    "CONFIDENCE_SCORE", "NEW_ADDRESS", "TEMP_DURATION", "SPECIAL_HOURS_RAW"
+] + [f"{edge}_time_{day}" for day in [
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
+] for edge in ["start", "end"]] + ["RAW_RESPONSE"]
+
+def checkpoint_key(row, timestamp_col):
+    """
+    (STORE_ID, IMAGE_URL, timestamp, STORE_HOURS hash) identity of a DRSC row. The
+    verdict depends on the DoorDash hours too: once ops fixes them, the photo is re-judged.
+    """
+    def as_text(value):
+        return "" if value is None or pd.isna(value) else str(value)
+    timestamp = row.get(timestamp_col) if timestamp_col else None
+    store_hours = hashlib.sha256(as_text(row.get("STORE_HOURS")).encode("utf-8")).hexdigest()[:16]
+    return (as_text(row.get("STORE_ID")), as_text(row.get("IMAGE_URL")), as_text(timestamp), store_hours)
+
+def record_checkpoints(df, run_id):
+    """
+    Remember the verdicts from a successful run so the next run can skip these rows.
+    Carried-forward rows aren't re-recorded: they keep the processed_at of the run that
+    judged them, so retention still expires them.
+    """
+    timestamp_col = get_timestamp_column(df)
+    judged = df[(df["RECOMMENDATION"] != "Error") & (df["SUMMARY_REASON"] != "Processing error or skipped")
+                & ~df["CARRIED_FORWARD"].astype(bool)]
+    entries = [
+        (checkpoint_key(row, timestamp_col), {col: row[col] for col in VERDICT_COLUMNS})
+        for _, row in judged.iterrows()
+    ]
+    recorded = CHECKPOINTS.record(entries, run_id)
+    print(f"✅ Recorded {recorded} processed rows for the next incremental run")
+    
+    hashed = [
+        ((store_id, store_hours, IMAGE_HASHES[store_id, image_url], image_url), verdict)
+        for (store_id, image_url, _, store_hours), verdict in entries if (store_id, image_url) in IMAGE_HASHES
+    ]
+    if hashed:
+        recorded = CHECKPOINTS.record_image_hashes(hashed, run_id)
+        print(f"✅ Indexed {recorded} photo hashes for near-duplicate matching")
+
+# ============= NEAR-DUPLICATE PHOTOS =============
+# Dashers often photograph the same entrance from the same spot day after day.
+# Each unjudged photo is dHashed and compared with the store's earlier judged
+# photos; a close enough match reuses that verdict like a carried-forward row,
+# as long as it was judged against the same DoorDash hours.
+IMAGE_HASHES = {}  # (STORE_ID, IMAGE_URL) -> dHash for unmatched photos hashed this run, indexed by record_checkpoints
+
+def near_duplicate_verdict(row):
+    """Verdict of an earlier photo of this row's store that looks the same as its photo, or None"""
+    image_url = row.get("IMAGE_URL")
+    if not image_url or pd.isna(image_url):
+        return None
+    try:
+        image = IMAGE_PREFETCHER.prepare(image_url)
+    except Exception as e:
+        print(f"⚠️ Couldn't hash {image_url[:80]}: {str(e)[:100]}")
+        return None
+    store_id, _, _, store_hours = checkpoint_key(row, None)
+    match = CHECKPOINTS.nearest_image(store_id, store_hours, image.dhash, NEAR_DUPLICATE_MAX_DISTANCE,
+                                      NEAR_DUPLICATE_MAX_AGE_DAYS)
+    if match:
+        return match[2]
+    # Only photos the model goes on to judge are indexed. A copied verdict saved with
+    # a fresh processed_at would let matches chain past the age and distance limits.
+    IMAGE_HASHES[store_id, image_url] = image.dhash
+    return None
+
+@dataclass
+class NearDuplicate:
+    """Stands in for the response text of a row whose photo matched an earlier judged one"""
+    verdict: dict
+
+def near_duplicate_verdicts(rows, max_workers=None):
+    """{row key: verdict} for the (key, row) pairs whose photo matches an earlier judged one"""
+    with ThreadPoolExecutor(max_workers=max_workers or VISION_MAX_WORKERS) as executor:
+        matches = list(executor.map(near_duplicate_verdict, [row for _, row in rows]))
+    return {key: verdict for (key, _), verdict in zip(rows, matches) if verdict is not None}
+
 # ============= FUNCTION 1: GET DATA FROM MODE =============
 def get_mode_data():
     print("\n🔄 Fetching data from Mode...")
     
-    run_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs'
-    response = requests.post(run_url, auth=(MODE_TOKEN, MODE_SECRET))
-    run_token = response.json()['token']
-    print(f"✅ Run started: {run_token}")
-    
-    state_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}'
-    while True:
-        response = requests.get(state_url, auth=(MODE_TOKEN, MODE_SECRET))
-        state = response.json()['state']
-        if state == 'succeeded':
-            print("✅ Query completed!")
-            break
-        elif state in ['failed', 'cancelled']:
-            raise Exception(f"Mode query {state}")
-        print(f"   Waiting... ({state})")
-        time.sleep(5)
-    
-    query_runs_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs'
-    response = requests.get(query_runs_url, auth=(MODE_TOKEN, MODE_SECRET))
-    query_runs = response.json()['_embedded']['query_runs']
-    
-    query_run_token = None
-    for qr in query_runs:
-        if qr['query_token'] == QUERY_ID:
-            query_run_token = qr['token']
-            break
-    
-    if not query_run_token:
-        raise Exception("Could not find query run token")
-    
-    result_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs/{query_run_token}/results/content.csv'
-    csv_response = requests.get(result_url, auth=(MODE_TOKEN, MODE_SECRET))
-    df = pd.read_csv(StringIO(csv_response.text))
-    
-    # DEDUPLICATE
+    df = MODE_CLIENT.fetch_report_dataframe(REPORT_ID, QUERY_ID, max_wait=MODE_MAX_WAIT, dtype=DRSC_CSV_DTYPES,
+                                            parse_dates=True)
+    
+    df = dedupe_latest_per_store(df)
+    
+    print(f"✅ Retrieved {len(df)} unique stores\n")
+    return df
+
+def dedupe_latest_per_store(df):
+    """Keep only the most recent row per STORE_ID"""
     original_count = len(df)
     if 'STORE_ID' in df.columns:
-        timestamp_cols = [col for col in df.columns if 'TIME' in col.upper() or 'DATE' in col.upper() or 'CREATED' in col.upper()]
-        if timestamp_cols:
+        timestamp_col = get_timestamp_column(df)
+        if timestamp_col:
             try:
-                df = df.sort_values(timestamp_cols[0], ascending=False)
+                df = df.sort_values(timestamp_col, ascending=False)
             except:
                 pass
         
@@ -800,58 +758,48 @@ def get_mode_data():
         
         if len(df) < original_count:
             print(f"⚠️  Removed {original_count - len(df)} duplicate stores")
-    
-    print(f"✅ Retrieved {len(df)} unique stores\n")
     return df
 
-# ============= FUNCTION 2: PROCESS WITH OPENAI (UPDATED WITH TIME-BASED DURATION) =============
-def process_store_hours(df):
-    print("\n🤖 Processing with OpenAI vision API...")
-    
-    # Calculate temp duration once at the start of processing
-    # This ensures consistent duration for all stores in this batch
-    default_temp_duration = get_temp_closure_duration()
-    print(f"   📋 Using {default_temp_duration}-hour temp closure duration for this run")
-    
-    recommendations, reasons, summary_reasons = [], [], []
-    deactivation_reason_id, is_temp_deactivation = [], []
-    confidence_scores = []
-    new_addresses = []
-    temp_duration = []
-    special_hours_list = []
-    
-    bulk_hours = {day: {"start": [], "end": []} for day in [
-        "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
-    ]}
-    
-    # Helper function to append default values
-    def append_default_values():
-        recommendations.append("No change")
-        reasons.append("Processing error or skipped")
-        summary_reasons.append("Processing error or skipped")
-        deactivation_reason_id.append("")
-        is_temp_deactivation.append(False)
-        confidence_scores.append(0.0)
-        new_addresses.append("")
-        temp_duration.append("")
-        special_hours_list.append([])
-        for day in bulk_hours:
-            bulk_hours[day]["start"].append("")
-            bulk_hours[day]["end"].append("")
-    
-    for i, row in tqdm(df.iterrows(), total=len(df)):
-        # Flag to track if we've processed this row
-        row_processed = False
-        
-        try:
-            image_url = row.get("IMAGE_URL")
-            store_hours = str(row.get("STORE_HOURS", ""))
-
-            if not image_url or not store_hours:
-                append_default_values()
-                continue
-
-            prompt = f"""
+# ============= VISION API CALLS =============
+# How the prompt asks the model to answer: free text scraped by the regex chain (text),
+# or the structured_review JSON schema (json)
+TEXT_RESPONSE_INSTRUCTIONS = """At the end, provide:
+Clarity score: X.XX (0.00-1.00, two decimal places)"""
+# Everything the classifier reads, one fact per line, clarity score last
+COMPACT_RESPONSE_INSTRUCTIONS = """Answer in exactly this format, with no other text (leave out lines that don't apply):
+Sign: <what and where, e.g. "digital display on glass door"; or NO STORE HOURS VISIBLE>
+Sign shows: "<the exact words on the sign>"
+- Monday: 8:00 AM - 9:00 PM  (one line per day the sign lists, h:mm AM/PM)
+SPECIAL HOLIDAY HOURS: <Holiday>: <hours or Closed>  (only if printed on the sign)
+New address: <street address>  (only for Address Change)
+Recommendation: **<the ONE recommendation>**
+Clarity score: X.XX (0.00-1.00, two decimal places)"""
+STRUCTURED_RESPONSE_INSTRUCTIONS = """Respond with the JSON object described by the response schema:
+- recommendation: the ONE recommendation above
+- hours: the posted hours for each day as 24-hour HH:MM start/end, null for days the sign doesn't show
+- clarity: 0.00-1.00, how reliably the sign can be read
+- sign_type: the kind of sign the hours or notice are on ("none" if there is no sign)
+- evidence: the exact words on the sign that support the recommendation
+- new_address: the new address, only for Address Change (otherwise null)
+- special_hours: holiday hours printed on the sign (empty if none)"""
+
+def response_instructions(structured):
+    """The answer-format section of the prompt for a response format and VISION_RESPONSE_CONTRACT"""
+    if structured:
+        return STRUCTURED_RESPONSE_INSTRUCTIONS
+    if VISION_RESPONSE_CONTRACT == "compact":
+        return COMPACT_RESPONSE_INSTRUCTIONS
+    return TEXT_RESPONSE_INSTRUCTIONS
+
+def build_store_hours_prompt(store_hours, structured=None):
+    """
+    Render the vision prompt for a store, with its current DoorDash hours spliced in.
+    structured asks for the JSON schema response (defaults to VISION_RESPONSE_FORMAT).
+    """
+    if structured is None:
+        structured = VISION_RESPONSE_FORMAT == "json"
+    instructions = response_instructions(structured)
+    return f"""
 You are reviewing a Dasher photo of a store entrance. 
 
 SIGN TYPES TO LOOK FOR:
@@ -898,508 +846,953 @@ CRITICAL RULES:
 - If sign is less than 10% of image and not digital/prominent, state "NO STORE HOURS VISIBLE - sign too small"
 - Never use phrases like "appears to be", "seems to say", "probably says"
 
-At the end, provide:
-Clarity score: X.XX (0.00-1.00, two decimal places)
+{instructions}
 """
 
-            response = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "user", "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ]}
-                ],
-                max_tokens=1000
-            )
+def prefetched_image(image_url):
+    """
+    (response-cache key, image_url part) for a photo in prefetch mode.
+    Falls back to letting OpenAI fetch the URL if we can't download or decode it.
+    """
+    try:
+        image = IMAGE_PREFETCHER.prepare(image_url)
+    except Exception as e:
+        print(f"⚠️ Prefetch failed for {image_url[:80]}: {str(e)[:100]} - sending the URL instead")
+        return image_url, {"url": image_url}
+    return IMAGE_PREFETCHER.cache_key(image), {"url": image.data_url, "detail": IMAGE_DETAIL}
+
+def vision_request(prompt, image_part):
+    """chat.completions.create kwargs for one image_url part (also the body of a batch line)"""
+    messages = [
+        {"role": "user", "content": [
+            {"type": "text", "text": prompt},
+            {"type": "image_url", "image_url": image_part}
+        ]}
+    ]
+    request = dict(model=VISION_MODEL, messages=messages, max_tokens=VISION_MAX_TOKENS)
+    # JSON mode prompts differ from text ones, so the cache never mixes the two
+    if VISION_RESPONSE_FORMAT == "json":
+        request["response_format"] = STORE_REVIEW_RESPONSE_FORMAT
+    return request
+
+def request_vision_response(prompt, image_part):
+    """One vision call for an image_url part; returns the raw response text"""
+    request = vision_request(prompt, image_part)
+    if VISION_STREAM and VISION_RESPONSE_FORMAT != "json":
+        result, finish_reason = stream_chat_completion(stop_at=clarity_score_end, **request)
+    else:
+        response = create_chat_completion(**request)
+        result, finish_reason = completion_text(response), response.choices[0].finish_reason
+    if finish_reason == "length":
+        # Cut off before the clarity line, so the classifier falls back to its default score
+        print(f"⚠️ Vision response hit VISION_MAX_TOKENS={VISION_MAX_TOKENS} and was truncated")
+    return result
+
+def analyze_store_image(image_url, prompt):
+    """Send one Dasher photo to the vision model and return the raw response text"""
+    if not IMAGE_PREFETCH:
+        cached = RESPONSE_CACHE.get(image_url, VISION_MODEL, prompt)
+        if cached is not None:
+            return cached
+        result = request_vision_response(prompt, {"url": image_url})
+        RESPONSE_CACHE.put(image_url, VISION_MODEL, prompt, result)
+        return result
+    
+    url_key = IMAGE_PREFETCHER.url_cache_key(image_url)
+    # A miss here isn't counted: get_or_fetch below counts the row's hit or miss once
+    cached = RESPONSE_CACHE.get(url_key, VISION_MODEL, prompt, count_miss=False)
+    if cached is not None:
+        return cached
+    
+    # Byte-identical photos share one cache entry whatever URL they came from, and
+    # one request while they're in flight together
+    content_key, image_part = prefetched_image(image_url)
+    result = RESPONSE_CACHE.get_or_fetch(content_key, VISION_MODEL, prompt,
+                                         lambda: request_vision_response(prompt, image_part))
+    RESPONSE_CACHE.put(url_key, VISION_MODEL, prompt, result)
+    return result
+
+# ============= TWO-TIER SCREENING =============
+SCREENING_PROMPT = """Look at this store entrance photo. Is there any sign, notice, door decal or display with
+readable text about opening hours, closures, holiday hours or a new address?
+Answer with exactly one word: YES or NO."""
+
+# Stands in for the response text of rows the screening tier kept from the full model
+SCREENED_OUT = object()
+
+class RoutingStats:
+    """Thread-safe counts of where the screening tier sent each image"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.escalated = 0
+        self.screened_out = 0
+        self.errors = 0
+    
+    def record(self, escalated, error=False):
+        with self._lock:
+            self.screened += 1
+            self.escalated += escalated
+            self.screened_out += not escalated
+            self.errors += error
+    
+    def summary_line(self):
+        escalated_pct = (self.escalated / self.screened * 100) if self.screened > 0 else 0
+        return (f"{self.screened} images screened with {SCREENING_MODEL}, {self.escalated} escalated to "
+                f"{VISION_MODEL} ({escalated_pct:.1f}%), {self.screened_out} screened out, "
+                f"{self.errors} screening errors (escalated)")
+
+ROUTING_STATS = RoutingStats()
+
+def screen_image(image_url):
+    """The screening model's raw answer for a photo (cached like the full responses)"""
+    cache_key = f"{image_url}#detail={SCREENING_DETAIL}"
+    cached = RESPONSE_CACHE.get(cache_key, SCREENING_MODEL, SCREENING_PROMPT)
+    if cached is not None:
+        return cached
+    
+    response = create_chat_completion(
+        model=SCREENING_MODEL,
+        messages=[
+            {"role": "user", "content": [
+                {"type": "text", "text": SCREENING_PROMPT},
+                {"type": "image_url", "image_url": {"url": image_url, "detail": SCREENING_DETAIL}}
+            ]}
+        ],
+        max_tokens=5
+    )
+    result = completion_text(response)
+    RESPONSE_CACHE.put(cache_key, SCREENING_MODEL, SCREENING_PROMPT, result)
+    return result
 
-            result = response.choices[0].message.content.strip()
-            reason = result
-            lower = result.lower()
-            
-            time.sleep(0.5)
-
-            posted = extract_hours(result)
-            parse_coverage = confidence_from_hours(posted)
-            clarity = extract_clarity_score(result)
-            
-            # Get GPT's recommendation EARLY
-            gpt_rec, found_rec = get_gpt_recommendation(result)
-            
-            # Check for glass/reflection cases where hours are still readable
-            glass_case, adjusted_clarity = detect_glass_reflection_cases(result, clarity)
-            if glass_case:
-                clarity = adjusted_clarity
-                if row.get('STORE_ID'):
-                    print(f"   Store {row.get('STORE_ID')}: Adjusted clarity for glass/reflection from {extract_clarity_score(result):.2f} to {clarity:.2f}")
-
-            # Check for sign size issues FIRST (IMPROVED VERSION)
-            has_issue, issue_reason = detect_sign_size_issues(result, clarity)
-            if has_issue:
-                recommendations.append("No change")
-                reasons.append(f"Sign validation failed: {issue_reason}")
-                summary_reasons.append("Sign too small/unclear to read reliably")
-                deactivation_reason_id.append("")
-                is_temp_deactivation.append(False)
-                confidence_scores.append(0.15)
-                new_addresses.append("")
-                temp_duration.append("")
-                special_hours_list.append([])
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # Check if hours are actually identical to DoorDash
-            if "change store hour" in lower and posted:
-                if hours_are_identical(posted, store_hours):
-                    recommendations.append("No change")
-                    reasons.append("Hours match DoorDash hours - no change needed")
-                    summary_reasons.append("Hours already correct")
-                    deactivation_reason_id.append("")
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    special_hours_list.append([])
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-            
-            # Validate the extraction (FIXED VERSION)
-            final_rec, final_clarity, validation_reason = validate_gpt_extraction(result, clarity, gpt_rec if found_rec else "")
-            
-            if validation_reason:
-                recommendations.append("No change")
-                reasons.append(validation_reason)
-                summary_reasons.append(validation_reason)
-                deactivation_reason_id.append("")
-                is_temp_deactivation.append(False)
-                confidence_scores.append(final_clarity)
-                new_addresses.append("")
-                temp_duration.append("")
-                special_hours_list.append([])
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # Extract special hours (only with high clarity)
-            special_hours_extracted = extract_special_hours(result, clarity) if clarity >= 0.90 else []
-
-            # Check for uncertainty
-            if any(p in lower for p in uncertain_phrases):
-                recommendations.append("No change")
-                reasons.append("Model expressed uncertainty")
-                summary_reasons.append("Image unreadable or GPT uncertain")
-                deactivation_reason_id.append("")
-                special_hours_list.append([])
-                is_temp_deactivation.append(False)
-                confidence_scores.append(0.20)
-                new_addresses.append("")
-                temp_duration.append("")
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # FIXED: Check if GPT explicitly recommended something valid
-            if found_rec and should_trust_gpt_recommendation(gpt_rec, clarity):
-                # Map GPT recommendation to action
-                rec_mapping = {
-                    "temporarily close for day": "Temporarily Close For Day",
-                    "temporarily close for day - long term": "Temporarily Close For Day",
-                    "permanently close store": "Permanently Close Store",
-                    "change store hours": "Change Store Hours",
-                    "address change": "Address Change",
-                    "no change": "No change"
-                }
-                
-                action_taken = False
-                for key, action in rec_mapping.items():
-                    if key in gpt_rec:
-                        if action == "Temporarily Close For Day":
-                            # Handle temp closures - ALL use the same time-based duration now
-                            recommendations.append("Temporarily Close For Day")
-                            reasons.append(reason)
-                            summary_reasons.append(categorize_closure(lower))
-                            deactivation_reason_id.append("67")
-                            special_hours_list.append(special_hours_extracted)
-                            is_temp_deactivation.append(True)
-                            confidence_scores.append(max(0.80, clarity))
-                            new_addresses.append("")
-                            temp_duration.append(default_temp_duration)  # Use time-based duration
-                            for day in bulk_hours:
-                                bulk_hours[day]["start"].append("")
-                                bulk_hours[day]["end"].append("")
-                            action_taken = True
-                            break
-                        elif action == "Change Store Hours" and len(posted) >= 4:
-                            recommendations.append("Change Store Hours")
-                            reasons.append(reason)
-                            summary_reasons.append("Posted hours differ from DoorDash")
-                            deactivation_reason_id.append("")
-                            special_hours_list.append(special_hours_extracted)
-                            is_temp_deactivation.append(False)
-                            confidence_scores.append(hour_change_confidence(parse_coverage, clarity))
-                            new_addresses.append("")
-                            temp_duration.append("")
-                            for day in bulk_hours:
-                                raw_start = posted.get(day, {}).get("start", "")
-                                raw_end = posted.get(day, {}).get("end", "")
-                                bulk_hours[day]["start"].append(normalize_time(raw_start))
-                                bulk_hours[day]["end"].append(normalize_time(raw_end))
-                            action_taken = True
-                            break
-                        elif action == "Permanently Close Store":
-                            recommendations.append("Permanently Close Store")
-                            reasons.append(reason)
-                            summary_reasons.append("Permanent closure detected")
-                            deactivation_reason_id.append("23")
-                            special_hours_list.append(special_hours_extracted)
-                            is_temp_deactivation.append(False)
-                            confidence_scores.append(0.95)
-                            new_addresses.append("")
-                            temp_duration.append("")
-                            for day in bulk_hours:
-                                bulk_hours[day]["start"].append("")
-                                bulk_hours[day]["end"].append("")
-                            action_taken = True
-                            break
-                        elif action == "Address Change":
-                            new_addr = extract_new_address(result)
-                            recommendations.append("Address Change")
-                            reasons.append(reason)
-                            summary_reasons.append("Store relocation detected")
-                            deactivation_reason_id.append("")
-                            special_hours_list.append(special_hours_extracted)
-                            is_temp_deactivation.append(False)
-                            confidence_scores.append(max(0.85, clarity))
-                            new_addresses.append(new_addr)
-                            temp_duration.append("")
-                            for day in bulk_hours:
-                                bulk_hours[day]["start"].append("")
-                                bulk_hours[day]["end"].append("")
-                            action_taken = True
-                            break
-                        elif action == "No change":
-                            recommendations.append("No change")
-                            reasons.append(reason)
-                            summary_reasons.append("No change required")
-                            deactivation_reason_id.append("")
-                            special_hours_list.append(special_hours_extracted)
-                            is_temp_deactivation.append(False)
-                            confidence_scores.append(clarity)
-                            new_addresses.append("")
-                            temp_duration.append("")
-                            for day in bulk_hours:
-                                bulk_hours[day]["start"].append("")
-                                bulk_hours[day]["end"].append("")
-                            action_taken = True
-                            break
-                
-                if action_taken:
-                    row_processed = True
-                    continue
-            
-            # Process recommendations by priority (as fallback if GPT rec didn't work)
-            
-            # ADDRESS CHANGE (keeping strict 0.92 for address changes)
-            if is_address_change(result):
-                if clarity < 0.92:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low for address change ({clarity:.2f} < 0.92)")
-                    summary_reasons.append("Clarity too low")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                new_addr = extract_new_address(result)
-                recommendations.append("Address Change")
-                reasons.append(reason)
-                summary_reasons.append("Store relocation detected")
-                deactivation_reason_id.append("")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(False)
-                confidence_scores.append(max(0.85, clarity))
-                new_addresses.append(new_addr)
-                temp_duration.append("")
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # LONG-TERM CLOSURE - Now uses same duration as regular temp closure
-            if is_long_term_closure(result):
-                if clarity < 0.70:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low ({clarity:.2f} < 0.75)")
-                    summary_reasons.append("Clarity too low")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                recommendations.append("Temporarily Close For Day")
-                reasons.append(reason)
-                summary_reasons.append("Closed until further notice")
-                deactivation_reason_id.append("67")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(True)
-                confidence_scores.append(max(0.85, clarity))
-                new_addresses.append("")
-                temp_duration.append(default_temp_duration)  # Use time-based duration (was 700)
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # PERMANENT CLOSURE
-            if "permanently close" in lower and is_permanent_closure(result):
-                if clarity < 0.85:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low for permanent closure ({clarity:.2f} < 0.85)")
-                    summary_reasons.append("Clarity too low")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                recommendations.append("Permanently Close Store")
-                reasons.append(reason)
-                summary_reasons.append("Permanent closure detected")
-                deactivation_reason_id.append("23")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(False)
-                confidence_scores.append(0.95)
-                new_addresses.append("")
-                temp_duration.append("")
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # PAYMENT ISSUES (STRICTER)
-            if is_payment_issue(result):
-                if clarity < 0.70:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low ({clarity:.2f} < 0.75)")
-                    summary_reasons.append("Clarity too low")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                recommendations.append("Temporarily Close For Day")
-                reasons.append(reason)
-                summary_reasons.append("Payment issue")
-                deactivation_reason_id.append("67")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(True)
-                confidence_scores.append(max(0.80, clarity))
-                new_addresses.append("")
-                temp_duration.append(default_temp_duration)  # Use time-based duration
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # TEMPORARY CLOSURE
-            temp_closure_phrases = [
-                "closed for the day", "closed today", "closed due to",
-                "power out", "no power", "maintenance", "system down",
-                "systems are down", "all systems are down", "sorry", "inconvenience"
-            ]
-            
-            if any(phrase in lower for phrase in temp_closure_phrases):
-                if clarity < 0.70:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low ({clarity:.2f} < 0.75)")
-                    summary_reasons.append("Clarity too low")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                recommendations.append("Temporarily Close For Day")
-                reasons.append(reason)
-                summary_reasons.append(categorize_closure(lower))
-                deactivation_reason_id.append("67")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(True)
-                confidence_scores.append(max(0.80, clarity))
-                new_addresses.append("")
-                temp_duration.append(default_temp_duration)  # Use time-based duration
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-                row_processed = True
-                continue
-
-            # HOUR CHANGES (Using 0.90 clarity as requested)
-            if "change store hour" in lower or final_rec == "Change Store Hours":
-                # Using 0.90 clarity for hour changes as requested
-                if clarity < 0.90:
-                    recommendations.append("No change")
-                    reasons.append(f"Clarity too low for hour changes ({clarity:.2f} < 0.90)")
-                    summary_reasons.append("Clarity too low for hour changes")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(clarity)
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                # Need at least 4 days extracted
-                if len(posted) < 4:
-                    recommendations.append("No change")
-                    reasons.append("Too few days extracted (need >=4)")
-                    summary_reasons.append("Insufficient days extracted")
-                    deactivation_reason_id.append("")
-                    special_hours_list.append([])
-                    is_temp_deactivation.append(False)
-                    confidence_scores.append(hour_change_confidence(parse_coverage, clarity))
-                    new_addresses.append("")
-                    temp_duration.append("")
-                    for day in bulk_hours:
-                        bulk_hours[day]["start"].append("")
-                        bulk_hours[day]["end"].append("")
-                    row_processed = True
-                    continue
-                
-                recommendations.append("Change Store Hours")
-                reasons.append(reason)
-                summary_reasons.append("Posted hours differ from DoorDash")
-                deactivation_reason_id.append("")
-                special_hours_list.append(special_hours_extracted)
-                is_temp_deactivation.append(False)
-                confidence_scores.append(hour_change_confidence(parse_coverage, clarity))
-                new_addresses.append("")
-                temp_duration.append("")
-                for day in bulk_hours:
-                    raw_start = posted.get(day, {}).get("start", "")
-                    raw_end = posted.get(day, {}).get("end", "")
-                    bulk_hours[day]["start"].append(normalize_time(raw_start))
-                    bulk_hours[day]["end"].append(normalize_time(raw_end))
-                row_processed = True
-                continue
-
-            # Default: No change
-            recommendations.append("No change")
-            reasons.append(reason)
-            summary_reasons.append("No change required")
-            deactivation_reason_id.append("")
-            special_hours_list.append(special_hours_extracted)
-            is_temp_deactivation.append(False)
-            confidence_scores.append(clarity)
-            new_addresses.append("")
-            temp_duration.append("")
-            for day in bulk_hours:
-                bulk_hours[day]["start"].append("")
-                bulk_hours[day]["end"].append("")
-            row_processed = True
+def screen_positive(answer):
+    """Whether a screening answer should go to the full model; anything but a clear NO does"""
+    return not answer.strip().strip("*.").upper().startswith("NO")
 
+def screened_vision_response(image_url, prompt):
+    """
+    analyze_store_image behind the screening tier when SCREENING_MODE is on:
+    SCREENED_OUT if the cheap pass sees no hours/closure sign, the full response otherwise.
+    A failed screening call escalates rather than dropping the image.
+    """
+    if not SCREENING_MODE:
+        return analyze_store_image(image_url, prompt)
+    
+    try:
+        escalate = screen_positive(screen_image(image_url))
+        ROUTING_STATS.record(escalate)
+    except Exception as e:
+        print(f"⚠️ Screening failed for {image_url[:80]}: {str(e)[:100]} - escalating")
+        escalate = True
+        ROUTING_STATS.record(escalate, error=True)
+    
+    if not escalate:
+        return SCREENED_OUT
+    return analyze_store_image(image_url, prompt)
+
+def vision_response_for_row(image_url, prompt, row=None):
+    """screened_vision_response, or NearDuplicate if row is given and its photo matches an earlier one"""
+    if row is not None:
+        verdict = near_duplicate_verdict(row)
+        if verdict is not None:
+            return NearDuplicate(verdict)
+    return screened_vision_response(image_url, prompt)
+
+def fetch_vision_responses(jobs, max_workers=None, rows=None):
+    """
+    Run the vision calls for a batch of rows with bounded concurrency.
+    
+    Args:
+        jobs: List with one entry per DataFrame row - either (image_url, prompt)
+              or None for rows that should be skipped.
+        max_workers: Number of requests kept in flight (defaults to VISION_MAX_WORKERS).
+        rows: The DataFrame rows for jobs, to check each photo for a near duplicate
+              just before sending it (so IMAGE_PREFETCH reuses the download).
+    
+    Returns:
+        list: Same length and order as jobs. Each entry is the response text,
+              the Exception raised for that row, SCREENED_OUT, NearDuplicate
+              (only with rows), or None for skipped rows.
+    """
+    max_workers = max_workers or VISION_MAX_WORKERS
+    results = [None] * len(jobs)
+    pending = [(position, job) for position, job in enumerate(jobs) if job is not None]
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(vision_response_for_row, image_url, prompt, rows[position] if rows else None): position
+            for position, (image_url, prompt) in pending
+        }
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            position = futures[future]
+            try:
+                results[position] = future.result()
+            except Exception as e:
+                results[position] = e
+    
+    return results
+
+def fetch_batch_vision_responses(jobs, max_wait=None):
+    """
+    fetch_vision_responses through the OpenAI Batch API, for backfills.
+    
+    Same jobs in, same list out. Cached responses are reused and new ones cached;
+    each distinct (image_url, prompt) is sent once. Photos always go by URL
+    (IMAGE_PREFETCH's data URLs would blow the batch file size limit).
+    """
+    results = [None] * len(jobs)
+    pending = {}  # (image_url, prompt) -> row positions
+    for position, job in enumerate(jobs):
+        if job is None:
+            continue
+        cached = RESPONSE_CACHE.get(job[0], VISION_MODEL, job[1])
+        if cached is not None:
+            results[position] = cached
+        else:
+            pending.setdefault(job, []).append(position)
+    
+    responses = run_chat_batch(
+        {str(number): vision_request(prompt, {"url": image_url}) for number, (image_url, prompt) in enumerate(pending)},
+        metadata={"script": "drsc_backfill"},
+        max_wait=max_wait or BATCH_MAX_WAIT
+    )
+    for number, ((image_url, prompt), positions) in enumerate(pending.items()):
+        result = responses[str(number)]
+        if isinstance(result, str):
+            RESPONSE_CACHE.put(image_url, VISION_MODEL, prompt, result)
+        for position in positions:
+            results[position] = result
+    
+    return results
+
+# ============= FUNCTION 2: PROCESS WITH OPENAI (UPDATED WITH TIME-BASED DURATION) =============
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+DAY_TIME_COLUMNS = [f"{edge}_time_{day}" for day in WEEKDAYS for edge in ["start", "end"]]
+NO_DAY_TIMES = ("",) * len(DAY_TIME_COLUMNS)
+
+@dataclass(slots=True)
+class StoreVerdict:
+    """One row's classification result; values() lines up with VERDICT_COLUMNS"""
+    recommendation: str
+    reason: str
+    summary_reason: str
+    confidence: float
+    deactivation_id: str = ""
+    is_temp: bool = False
+    new_address: str = ""
+    duration: object = ""
+    special_hours: list = field(default_factory=list)
+    day_times: tuple = NO_DAY_TIMES  # start/end per weekday, as in DAY_TIME_COLUMNS
+    raw_response: str = ""  # GPT text the verdict was classified from (kept for --replay)
+
+    def values(self):
+        return (self.recommendation, self.reason, self.summary_reason, self.deactivation_id, self.is_temp,
+                self.confidence, self.new_address, self.duration, self.special_hours, *self.day_times,
+                self.raw_response)
+
+    @classmethod
+    def from_dict(cls, verdict):
+        """Rebuild a verdict stored as {column: value} (e.g. from a checkpoint)"""
+        return cls(verdict["RECOMMENDATION"], verdict["REASON"], verdict["SUMMARY_REASON"], verdict["CONFIDENCE_SCORE"],
+                   deactivation_id=verdict["deactivation_reason_id"], is_temp=verdict["is_temp_deactivation"],
+                   new_address=verdict["NEW_ADDRESS"], duration=verdict["TEMP_DURATION"],
+                   special_hours=verdict["SPECIAL_HOURS_RAW"],
+                   day_times=tuple(verdict[col] for col in DAY_TIME_COLUMNS),
+                   raw_response=verdict.get("RAW_RESPONSE", ""))
+
+def day_times_from_posted(posted):
+    """Normalized start/end per weekday from extract_hours output"""
+    return tuple(normalize_time(posted.get(day, {}).get(edge, "")) for day in WEEKDAYS for edge in ["start", "end"])
+
+def skipped_verdict():
+    return StoreVerdict("No change", "Processing error or skipped", "Processing error or skipped", 0.0)
+
+def screened_out_verdict():
+    return StoreVerdict("No change", "Screening: no hours or closure sign visible",
+                        "No sign visible (screening model)", 0.15)
+
+def error_verdict(error_msg):
+    return StoreVerdict("Error", f"Exception: {error_msg[:200]}", "Processing error", 0.0)
+
+def carried_forward_verdict(verdict, default_temp_duration):
+    """Reuse a verdict judged by a previous run"""
+    verdict = StoreVerdict.from_dict(verdict)
+    # Temp closures get this run's time-based duration, like a fresh analysis would
+    if verdict.is_temp:
+        verdict.duration = default_temp_duration
+    return verdict
+
+@dataclass(slots=True)
+class ResponseFacts:
+    """What the classifier has pulled out of one GPT response before the rules run"""
+    result: str
+    lower: str
+    posted: dict
+    parse_coverage: float
+    clarity: float
+    final_rec: str
+    special_hours: list
+    default_temp_duration: object
+
+# ---- Outcomes shared by the GPT-recommendation table and the fallback rules ----
+def temp_closure_verdict(facts, summary_reason, min_confidence=0.80):
+    return StoreVerdict("Temporarily Close For Day", facts.result, summary_reason, max(min_confidence, facts.clarity),
+                        deactivation_id="67", is_temp=True, duration=facts.default_temp_duration,
+                        special_hours=facts.special_hours)
+
+def permanent_closure_verdict(facts):
+    return StoreVerdict("Permanently Close Store", facts.result, "Permanent closure detected", 0.95,
+                        deactivation_id="23", special_hours=facts.special_hours)
+
+def address_change_verdict(facts):
+    return StoreVerdict("Address Change", facts.result, "Store relocation detected", max(0.85, facts.clarity),
+                        new_address=extract_new_address(facts.result), special_hours=facts.special_hours)
+
+def hour_change_verdict(facts):
+    return StoreVerdict("Change Store Hours", facts.result, "Posted hours differ from DoorDash",
+                        hour_change_confidence(facts.parse_coverage, facts.clarity),
+                        special_hours=facts.special_hours, day_times=day_times_from_posted(facts.posted))
+
+def no_change_verdict(facts):
+    return StoreVerdict("No change", facts.result, "No change required", facts.clarity,
+                        special_hours=facts.special_hours)
+
+def gpt_hour_change_verdict(facts):
+    # Not enough days to act on; fall through to the next recommendation key
+    return hour_change_verdict(facts) if len(facts.posted) >= 4 else None
+
+def fallback_hour_change_verdict(facts):
+    # Need at least 4 days extracted
+    if len(facts.posted) < 4:
+        return StoreVerdict("No change", "Too few days extracted (need >=4)", "Insufficient days extracted",
+                            hour_change_confidence(facts.parse_coverage, facts.clarity))
+    return hour_change_verdict(facts)
+
+# GPT's explicit recommendation -> outcome, checked in order (an outcome may return None to pass)
+GPT_RECOMMENDATION_RULES = [
+    ("temporarily close for day", lambda facts: temp_closure_verdict(facts, categorize_closure(facts.lower))),
+    ("temporarily close for day - long term", lambda facts: temp_closure_verdict(facts, categorize_closure(facts.lower))),
+    ("permanently close store", permanent_closure_verdict),
+    ("change store hours", gpt_hour_change_verdict),
+    ("address change", address_change_verdict),
+    ("no change", no_change_verdict),
+]
+
+temp_closure_phrases = [
+    "closed for the day", "closed today", "closed due to",
+    "power out", "no power", "maintenance", "system down",
+    "systems are down", "all systems are down", "sorry", "inconvenience"
+]
+
+@dataclass(frozen=True, slots=True)
+class FallbackRule:
+    """One step of the fallback priority order used when GPT's recommendation isn't trusted"""
+    name: str
+    applies: Callable
+    min_clarity: float
+    too_low_reason: str  # formatted with clarity=
+    too_low_summary: str
+    outcome: Callable
+
+# Priority order: address change, long-term closure, permanent closure, payment issue, temp closure, hour change
+FALLBACK_RULES = [
+    # Keeping strict 0.92 for address changes
+    FallbackRule("address change", lambda facts: is_address_change(facts.result), 0.92,
+                 "Clarity too low for address change ({clarity:.2f} < 0.92)", "Clarity too low",
+                 address_change_verdict),
+    # Long-term closures use the same time-based duration as regular temp closures (was 700)
+    FallbackRule("long-term closure", lambda facts: is_long_term_closure(facts.result), 0.70,
+                 "Clarity too low ({clarity:.2f} < 0.75)", "Clarity too low",
+                 lambda facts: temp_closure_verdict(facts, "Closed until further notice", 0.85)),
+    FallbackRule("permanent closure",
+                 lambda facts: "permanently close" in facts.lower and is_permanent_closure(facts.result), 0.85,
+                 "Clarity too low for permanent closure ({clarity:.2f} < 0.85)", "Clarity too low",
+                 permanent_closure_verdict),
+    FallbackRule("payment issue", lambda facts: is_payment_issue(facts.result), 0.70,
+                 "Clarity too low ({clarity:.2f} < 0.75)", "Clarity too low",
+                 lambda facts: temp_closure_verdict(facts, "Payment issue")),
+    FallbackRule("temp closure", lambda facts: any(phrase in facts.lower for phrase in temp_closure_phrases), 0.70,
+                 "Clarity too low ({clarity:.2f} < 0.75)", "Clarity too low",
+                 lambda facts: temp_closure_verdict(facts, categorize_closure(facts.lower))),
+    # Using 0.90 clarity for hour changes as requested
+    FallbackRule("hour change",
+                 lambda facts: "change store hour" in facts.lower or facts.final_rec == "Change Store Hours", 0.90,
+                 "Clarity too low for hour changes ({clarity:.2f} < 0.90)", "Clarity too low for hour changes",
+                 fallback_hour_change_verdict),
+]
+
+def apply_gpt_recommendation(facts, gpt_rec):
+    for key, outcome in GPT_RECOMMENDATION_RULES:
+        if key in gpt_rec:
+            verdict = outcome(facts)
+            if verdict is not None:
+                return verdict
+    return None
+
+def apply_fallback_rules(facts):
+    for rule in FALLBACK_RULES:
+        if rule.applies(facts):
+            if facts.clarity < rule.min_clarity:
+                return StoreVerdict("No change", rule.too_low_reason.format(clarity=facts.clarity),
+                                    rule.too_low_summary, facts.clarity)
+            return rule.outcome(facts)
+    # Default: No change
+    return no_change_verdict(facts)
+
+def classify_review(review, doordash_hours, default_temp_duration, clarity=None):
+    """
+    StoreVerdict for a structured review. The model's recommendation is taken
+    the way a trusted text-mode recommendation is, with the same thresholds.
+    """
+    clarity = review.clarity if clarity is None else clarity
+    reason = review.reason()
+    
+    if review.sign_type == "none" and review.recommendation != "No Change":
+        return StoreVerdict("No change", "Sign validation failed: no sign identified",
+                            "Sign too small/unclear to read reliably", 0.15)
+    
+    if review.recommendation == "Change Store Hours" and review.hours:
+        if hours_are_identical(review.hours, doordash_hours):
+            return StoreVerdict("No change", "Hours match DoorDash hours - no change needed",
+                                "Hours already correct", clarity)
+    
+    special_hours = review.special_hours if clarity >= 0.90 else []
+    facts = ResponseFacts(reason, reason.lower(), review.hours, confidence_from_hours(review.hours), clarity,
+                          review.recommendation, special_hours, default_temp_duration)
+    
+    gpt_rec = review.recommendation.lower()
+    if not should_trust_gpt_recommendation(gpt_rec, clarity):
+        if gpt_rec == "no change":
+            return no_change_verdict(facts)
+        return StoreVerdict("No change", f"Clarity too low ({clarity:.2f} < 0.70)", "Clarity too low", clarity)
+    
+    verdict = apply_gpt_recommendation(facts, gpt_rec) or fallback_hour_change_verdict(facts)
+    if verdict.recommendation == "Address Change" and review.new_address:
+        verdict.new_address = review.new_address
+    return verdict
+
+def classify(result, store_hours, default_temp_duration, clarity=None, store_id=None):
+    """
+    Run the rule-based classifier over one GPT response and return its StoreVerdict.
+    Depends only on its arguments, so it can run in any worker process.
+    
+    Args:
+        result: The GPT response text.
+        store_hours: DoorDash STORE_HOURS string, or its parse_store_hours(exact_day_names=True) array.
+        default_temp_duration: Temp closure duration (hours) for this run.
+        clarity: Clarity score to use instead of the one in the response text.
+        store_id: Only used for log messages.
+    """
+    doordash_hours = (store_hours if isinstance(store_hours, np.ndarray)
+                      else parse_store_hours(str(store_hours), exact_day_names=True))
+    
+    # Structured (JSON mode) responses skip the regex chain; anything else falls back to it
+    review = parse_store_review(result)
+    if review is not None:
+        return classify_review(review, doordash_hours, default_temp_duration, clarity)
+    
+    lower = result.lower()
+
+    posted = extract_hours(result)
+    parse_coverage = confidence_from_hours(posted)
+    if clarity is None:
+        clarity = extract_clarity_score(result)
+    stated_clarity = clarity
+    
+    # Get GPT's recommendation EARLY
+    gpt_rec, found_rec = get_gpt_recommendation(result)
+    
+    # Check for glass/reflection cases where hours are still readable
+    glass_case, adjusted_clarity = detect_glass_reflection_cases(result, clarity)
+    if glass_case:
+        clarity = adjusted_clarity
+        if store_id:
+            print(f"   Store {store_id}: Adjusted clarity for glass/reflection from {stated_clarity:.2f} to {clarity:.2f}")
+
+    # Check for sign size issues FIRST (IMPROVED VERSION)
+    has_issue, issue_reason = detect_sign_size_issues(result, clarity)
+    if has_issue:
+        return StoreVerdict("No change", f"Sign validation failed: {issue_reason}",
+                            "Sign too small/unclear to read reliably", 0.15)
+
+    # Check if hours are actually identical to DoorDash
+    if "change store hour" in lower and posted:
+        if hours_are_identical(posted, doordash_hours):
+            return StoreVerdict("No change", "Hours match DoorDash hours - no change needed",
+                                "Hours already correct", clarity)
+    
+    # Validate the extraction (FIXED VERSION)
+    final_rec, final_clarity, validation_reason = validate_gpt_extraction(result, clarity, gpt_rec if found_rec else "")
+    
+    if validation_reason:
+        return StoreVerdict("No change", validation_reason, validation_reason, final_clarity)
+
+    # Extract special hours (only with high clarity)
+    special_hours_extracted = extract_special_hours(result, clarity) if clarity >= 0.90 else []
+
+    # Check for uncertainty
+    if any(p in lower for p in uncertain_phrases):
+        return StoreVerdict("No change", "Model expressed uncertainty", "Image unreadable or GPT uncertain", 0.20)
+
+    facts = ResponseFacts(result, lower, posted, parse_coverage, clarity, final_rec,
+                          special_hours_extracted, default_temp_duration)
+
+    # FIXED: Check if GPT explicitly recommended something valid
+    if found_rec and should_trust_gpt_recommendation(gpt_rec, clarity):
+        verdict = apply_gpt_recommendation(facts, gpt_rec)
+        if verdict is not None:
+            return verdict
+    
+    # Process recommendations by priority (as fallback if GPT rec didn't work)
+    return apply_fallback_rules(facts)
+
+def classify_store_response(row, result, default_temp_duration, doordash_hours=None):
+    """
+    classify() for one DataFrame row. doordash_hours is the row's pre-parsed
+    STORE_HOURS array (parsed from the row if not given).
+    """
+    store_hours = doordash_hours if doordash_hours is not None else str(row.get("STORE_HOURS", ""))
+    return classify(result, store_hours, default_temp_duration, store_id=row.get('STORE_ID'))
+
+# ============= PARALLEL CLASSIFICATION =============
+# The classifier is pure Python regex/substring work (~0.25 ms per response), so
+# large batches are fanned out over worker processes in ordered chunks.
+CLASSIFY_WORKERS = int(os.environ.get('CLASSIFY_WORKERS', str(os.cpu_count() or 1)))
+CLASSIFY_CHUNK_SIZE = int(os.environ.get('CLASSIFY_CHUNK_SIZE', '250'))
+# Below this many responses, starting the pool costs more than it saves
+CLASSIFY_MIN_PARALLEL = int(os.environ.get('CLASSIFY_MIN_PARALLEL', '2000'))
+
+def classify_job(job, default_temp_duration):
+    """StoreVerdict for one (result, store_hours, store_id) job, with errors turned into Error verdicts"""
+    result, store_hours, store_id = job
+    try:
+        verdict = classify(result, store_hours, default_temp_duration, store_id=store_id)
+    except Exception as e:
+        print(f"⚠️ Store {store_id}: {str(e)[:100]}")
+        verdict = error_verdict(str(e))
+    verdict.raw_response = result
+    return verdict
+
+def classify_chunk(jobs, default_temp_duration):
+    return [classify_job(job, default_temp_duration) for job in jobs]
+
+def classify_batch(jobs, default_temp_duration, workers=None, chunk_size=None):
+    """
+    Classify (result, store_hours, store_id) jobs, in parallel for large batches.
+    Verdicts come back in job order whatever the worker count.
+    """
+    workers = workers or CLASSIFY_WORKERS
+    chunk_size = chunk_size or CLASSIFY_CHUNK_SIZE
+    if workers <= 1 or len(jobs) < CLASSIFY_MIN_PARALLEL:
+        return classify_chunk(jobs, default_temp_duration)
+    
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    print(f"   🧮 Classifying {len(jobs)} responses in {len(chunks)} chunks on {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map yields chunks in submission order
+        results = pool.map(classify_chunk, chunks, [default_temp_duration] * len(chunks))
+        return [verdict for chunk in results for verdict in chunk]
+
+def vision_job_for_row(row):
+    """(image_url, prompt) for a row, or None if it has nothing to analyze"""
+    image_url = row.get("IMAGE_URL")
+    store_hours = str(row.get("STORE_HOURS", ""))
+    if not image_url or not store_hours:
+        return None
+    return (image_url, build_store_hours_prompt(store_hours))
+
+def verdict_for_row(row, result, default_temp_duration, prior_verdict=None, doordash_hours=None):
+    """Turn one row plus its vision result (text, Exception or None if skipped) into a StoreVerdict"""
+    if prior_verdict is not None:
+        return carried_forward_verdict(prior_verdict, default_temp_duration)
+    if result is None:
+        return skipped_verdict()
+    if result is SCREENED_OUT:
+        return screened_out_verdict()
+    try:
+        if isinstance(result, Exception):
+            raise result
+        verdict = classify_store_response(row, result, default_temp_duration, doordash_hours)
+        verdict.raw_response = result
+        return verdict
+    except Exception as e:
+        error_msg = str(e)
+        print(f"⚠️ Row {row.name}: {error_msg[:100]}")
+        import traceback
+        traceback.print_exc()
+        return error_verdict(error_msg)
+
+def assign_verdicts(df, verdicts, carried_forward):
+    """Transpose the per-row verdicts into columns and write them onto the DataFrame in one go"""
+    assert len(verdicts) == len(df), f"verdicts has {len(verdicts)} items, expected {len(df)}"
+    columns = zip(*(verdict.values() for verdict in verdicts)) if verdicts else [[] for _ in VERDICT_COLUMNS]
+    verdict_frame = pd.DataFrame(dict(zip(VERDICT_COLUMNS, map(list, columns))), index=df.index)
+    verdict_frame["CARRIED_FORWARD"] = carried_forward
+    df[list(verdict_frame.columns)] = verdict_frame
+    return df
+
+def process_store_hours(df):
+    print("\n🤖 Processing with OpenAI vision API...")
+    
+    # Calculate temp duration once at the start of processing
+    # This ensures consistent duration for all stores in this batch
+    default_temp_duration = get_temp_closure_duration()
+    print(f"   📋 Using {default_temp_duration}-hour temp closure duration for this run")
+    
+    # Look up rows already judged by a previous successful run
+    timestamp_col = get_timestamp_column(df)
+    row_keys = [checkpoint_key(row, timestamp_col) for _, row in df.iterrows()]
+    prior_verdicts = CHECKPOINTS.lookup(row_keys) if INCREMENTAL_MODE else {}
+    if INCREMENTAL_MODE:
+        print(f"   ♻️  Incremental mode: {len(prior_verdicts)} rows already judged, carrying verdicts forward")
+    if NEAR_DUPLICATE_REUSE and BATCH_MODE:
+        # Batch lines send photos by URL, so they are all hashed up front
+        unjudged = [(key, row) for key, (_, row) in zip(row_keys, df.iterrows())
+                    if key not in prior_verdicts and vision_job_for_row(row) is not None]
+        near_duplicates = near_duplicate_verdicts(unjudged)
+        prior_verdicts.update(near_duplicates)
+        print(f"   🔍 Near-duplicate photos: {len(near_duplicates)} of {len(unjudged)} reuse an earlier verdict")
+    
+    # Fire off all vision calls concurrently; responses come back in row order
+    jobs = [
+        None if key in prior_verdicts else vision_job_for_row(row)
+        for key, (_, row) in zip(row_keys, df.iterrows())
+    ]
+    
+    if BATCH_MODE:
+        print(f"   📦 Batch mode: sending {sum(job is not None for job in jobs)} images through the OpenAI Batch API")
+        vision_results = fetch_batch_vision_responses(jobs)
+    else:
+        print(f"   🚀 Sending {sum(job is not None for job in jobs)} images with {VISION_MAX_WORKERS} concurrent workers")
+        vision_results = fetch_vision_responses(jobs, rows=[row for _, row in df.iterrows()] if NEAR_DUPLICATE_REUSE else None)
+        if NEAR_DUPLICATE_REUSE:
+            near_duplicates = {
+                row_keys[position]: result.verdict
+                for position, result in enumerate(vision_results) if isinstance(result, NearDuplicate)
+            }
+            prior_verdicts.update(near_duplicates)
+            print(f"   🔍 Near-duplicate photos: {len(near_duplicates)} of {sum(job is not None for job in jobs)} "
+                  f"reuse an earlier verdict")
+    
+    # DoorDash hours as an (N, 7, 2) minutes array, each distinct STORE_HOURS string parsed once
+    doordash_hours = store_hours_matrix(df["STORE_HOURS"] if "STORE_HOURS" in df.columns else [""] * len(df),
+                                        exact_day_names=True)
+    
+    # Classify every fresh response as one batch; skipped/failed/carried-forward rows go through verdict_for_row
+    to_classify = [
+        position for position, result in enumerate(vision_results)
+        if isinstance(result, str) and row_keys[position] not in prior_verdicts
+    ]
+    store_ids = df["STORE_ID"].tolist() if "STORE_ID" in df.columns else [None] * len(df)
+    classified = dict(zip(to_classify, classify_batch(
+        [(vision_results[position], doordash_hours[position], store_ids[position]) for position in to_classify],
+        default_temp_duration
+    )))
+    
+    verdicts = [
+        classified[position] if position in classified else
+        verdict_for_row(row, vision_results[position], default_temp_duration,
+                        prior_verdicts.get(row_keys[position]), doordash_hours[position])
+        for position, (_, row) in enumerate(df.iterrows())
+    ]
+    
+    return assign_verdicts(df, verdicts, [key in prior_verdicts for key in row_keys])
+
+# ============= STAGED PIPELINE: MODE -> VISION -> CLASSIFIER =============
+PIPELINE_DONE = object()
+
+def run_store_hours_pipeline(chunks, max_workers=None, queue_size=None):
+    """
+    Overlap Mode ingestion, vision calls and classification with bounded queues.
+    
+    Stages:
+        ingestion  - one thread reading DataFrame chunks as Mode streams them
+        vision     - max_workers threads calling the model as soon as rows arrive
+        classifier - the calling thread, applying the rule-based classifier
+    
+    Duplicate stores are only re-sent when a newer image turns up, and the final
+    frame gets the same keep-latest dedup as get_mode_data, so the output matches
+    get_mode_data -> process_store_hours.
+    
+    Args:
+        chunks: Iterable of DataFrame chunks (e.g. MODE_CLIENT.iter_report_chunks(...)).
+        max_workers: Vision worker threads (defaults to VISION_MAX_WORKERS).
+        queue_size: Max rows buffered between stages (defaults to PIPELINE_QUEUE_SIZE).
+    """
+    print("\n🤖 Running streaming pipeline (Mode -> OpenAI vision -> classifier)...")
+    max_workers = max_workers or VISION_MAX_WORKERS
+    queue_size = queue_size or PIPELINE_QUEUE_SIZE
+    
+    default_temp_duration = get_temp_closure_duration()
+    print(f"   📋 Using {default_temp_duration}-hour temp closure duration for this run")
+    
+    row_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    ingestion_errors = []
+    input_columns = []
+    
+    def ingest():
+        latest_seen = {}
+        sequence = 0
+        try:
+            for chunk in chunks:
+                if not input_columns:
+                    input_columns.extend(chunk.columns)
+                timestamp_col = get_timestamp_column(chunk)
+                prior_verdicts = {}
+                if INCREMENTAL_MODE:
+                    prior_verdicts = CHECKPOINTS.lookup([checkpoint_key(row, timestamp_col) for _, row in chunk.iterrows()])
+                for _, row in chunk.iterrows():
+                    store_id = row.get("STORE_ID")
+                    timestamp = row.get(timestamp_col) if timestamp_col else None
+                    if store_id in latest_seen:
+                        # Only an image newer than the one already queued can win the final dedup
+                        previous = latest_seen[store_id]
+                        if timestamp is None or previous is None or pd.isna(timestamp) or pd.isna(previous) or not timestamp > previous:
+                            continue
+                    latest_seen[store_id] = timestamp
+                    key = checkpoint_key(row, timestamp_col)
+                    doordash_hours = parse_store_hours(str(row.get("STORE_HOURS", "")), exact_day_names=True)
+                    row_queue.put((sequence, row, prior_verdicts.get(key), doordash_hours))
+                    sequence += 1
         except Exception as e:
-            error_msg = str(e)
-            print(f"⚠️ Row {i}: {error_msg[:100]}")
-            import traceback
-            traceback.print_exc()
-            
-            # If we haven't processed this row yet, add default values
-            if not row_processed:
-                recommendations.append("Error")
-                reasons.append(f"Exception: {error_msg[:200]}")
-                summary_reasons.append("Processing error")
-                deactivation_reason_id.append("")
-                is_temp_deactivation.append(False)
-                confidence_scores.append(0.0)
-                new_addresses.append("")
-                temp_duration.append("")
-                special_hours_list.append([])
-                for day in bulk_hours:
-                    bulk_hours[day]["start"].append("")
-                    bulk_hours[day]["end"].append("")
-    
-    # Verify all lists have the same length
-    expected_length = len(df)
-    assert len(recommendations) == expected_length, f"recommendations has {len(recommendations)} items, expected {expected_length}"
-    assert len(reasons) == expected_length, f"reasons has {len(reasons)} items, expected {expected_length}"
-    assert len(summary_reasons) == expected_length, f"summary_reasons has {len(summary_reasons)} items, expected {expected_length}"
-    assert len(deactivation_reason_id) == expected_length, f"deactivation_reason_id has {len(deactivation_reason_id)} items, expected {expected_length}"
-    assert len(is_temp_deactivation) == expected_length, f"is_temp_deactivation has {len(is_temp_deactivation)} items, expected {expected_length}"
-    assert len(confidence_scores) == expected_length, f"confidence_scores has {len(confidence_scores)} items, expected {expected_length}"
-    assert len(new_addresses) == expected_length, f"new_addresses has {len(new_addresses)} items, expected {expected_length}"
-    assert len(temp_duration) == expected_length, f"temp_duration has {len(temp_duration)} items, expected {expected_length}"
-    assert len(special_hours_list) == expected_length, f"special_hours_list has {len(special_hours_list)} items, expected {expected_length}"
-    
-    # Assign results
-    df["RECOMMENDATION"] = recommendations
-    df["REASON"] = reasons
-    df["SUMMARY_REASON"] = summary_reasons
-    df["deactivation_reason_id"] = deactivation_reason_id
-    df["is_temp_deactivation"] = is_temp_deactivation
-    df["CONFIDENCE_SCORE"] = confidence_scores
-    df["NEW_ADDRESS"] = new_addresses
-    df["TEMP_DURATION"] = temp_duration
-    df["SPECIAL_HOURS_RAW"] = special_hours_list
-
-    for day in bulk_hours:
-        df[f"start_time_{day}"] = bulk_hours[day]["start"]
-        df[f"end_time_{day}"] = bulk_hours[day]["end"]
+            ingestion_errors.append(e)
+        finally:
+            for _ in range(max_workers):
+                row_queue.put(PIPELINE_DONE)
     
+    def vision_worker():
+        # Always signal the classifier, or it would wait forever for a worker that died
+        try:
+            while True:
+                item = row_queue.get()
+                if item is PIPELINE_DONE:
+                    return
+                sequence, row, prior_verdict, doordash_hours = item
+                result = None
+                try:
+                    job = None if prior_verdict is not None else vision_job_for_row(row)
+                    if job is not None and NEAR_DUPLICATE_REUSE:
+                        prior_verdict = near_duplicate_verdict(row)
+                        if prior_verdict is not None:
+                            job = None
+                    if job is not None:
+                        result = screened_vision_response(*job)
+                except Exception as e:
+                    # Becomes an Error verdict for this row, as in process_store_hours
+                    result, prior_verdict = e, None
+                result_queue.put((sequence, row, result, prior_verdict, doordash_hours))
+        finally:
+            result_queue.put(PIPELINE_DONE)
+    
+    threads = [threading.Thread(target=ingest, daemon=True)]
+    threads += [threading.Thread(target=vision_worker, daemon=True) for _ in range(max_workers)]
+    for thread in threads:
+        thread.start()
+    
+    rows, verdicts, carried_forward = {}, {}, {}
+    workers_done = 0
+    progress = tqdm(desc="   Rows classified")
+    while workers_done < max_workers:
+        item = result_queue.get()
+        if item is PIPELINE_DONE:
+            workers_done += 1
+            continue
+        sequence, row, result, prior_verdict, doordash_hours = item
+        rows[sequence] = row
+        verdicts[sequence] = verdict_for_row(row, result, default_temp_duration, prior_verdict, doordash_hours)
+        carried_forward[sequence] = prior_verdict is not None
+        progress.update(1)
+    progress.close()
+    
+    for thread in threads:
+        thread.join()
+    if ingestion_errors:
+        raise ingestion_errors[0]
+    
+    order = sorted(rows)
+    if not order:
+        # Same columns as a full run, so the Slack summary and bulk sheets report 0 stores
+        print("✅ Pipeline analyzed 0 rows")
+        return assign_verdicts(pd.DataFrame(columns=input_columns), [], [])
+    df = pd.DataFrame([rows[seq] for seq in order]).reset_index(drop=True)
+    df = assign_verdicts(df, [verdicts[seq] for seq in order], [carried_forward[seq] for seq in order])
+    df = dedupe_latest_per_store(df)
+    print(f"✅ Pipeline analyzed {len(order)} rows, {len(df)} unique stores")
+    return df
+
+# ============= OFFLINE REPLAY OF SAVED RESPONSES =============
+# Re-runs only the deterministic parsing/classification chain over the GPT
+# text saved in store_hours_analysis_<ts>.csv backups, so threshold changes
+# can be checked (and the bulk sheets rebuilt) without another vision pass.
+
+# REASON values the classifier writes itself (older backups have no RAW_RESPONSE column,
+# and REASON only holds the GPT text when it isn't one of these)
+CLASSIFIER_REASON_PREFIXES = (
+    "Sign validation failed:", "Hours match DoorDash hours", "Clarity too low", "Too few days extracted",
+    "Model expressed uncertainty", "Processing error or skipped", "Exception:", "Screening:"
+)
+
+def stored_response(row):
+    """The GPT text saved for a backup row, or None if it can't be recovered"""
+    raw = row.get("RAW_RESPONSE")
+    if isinstance(raw, str) and raw:
+        return raw
+    reason = row.get("REASON")
+    if row.get("RECOMMENDATION") == "Error" or not isinstance(reason, str) or not reason:
+        return None
+    # Validation failures use the same message for REASON and SUMMARY_REASON
+    if reason == row.get("SUMMARY_REASON") or reason.startswith(CLASSIFIER_REASON_PREFIXES):
+        return None
+    return reason
+
+def backup_verdict(row):
+    """Rebuild the verdict a backup row was saved with (all values read back as text)"""
+    verdict = {col: row.get(col, "") for col in VERDICT_COLUMNS}
+    try:
+        verdict["CONFIDENCE_SCORE"] = float(verdict["CONFIDENCE_SCORE"])
+    except ValueError:
+        pass
+    verdict["is_temp_deactivation"] = verdict["is_temp_deactivation"] == "True"
+    if verdict["TEMP_DURATION"].isdigit():
+        verdict["TEMP_DURATION"] = int(verdict["TEMP_DURATION"])
+    try:
+        verdict["SPECIAL_HOURS_RAW"] = ast.literal_eval(verdict["SPECIAL_HOURS_RAW"] or "[]")
+    except (ValueError, SyntaxError):
+        verdict["SPECIAL_HOURS_RAW"] = []
+    return StoreVerdict.from_dict(verdict)
+
+def load_backups(paths):
+    """Read one or more CSV backups (paths or glob patterns) into one frame, latest row per store"""
+    files = sorted({match for path in paths for match in (glob.glob(path) or [path])})
+    frames = []
+    for path in files:
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        print(f"   📄 {path}: {len(frame)} rows")
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+    # Only the image timestamp is parsed back; the posted start/end time columns stay text
+    timestamp_col = get_timestamp_column(df.drop(columns=VERDICT_COLUMNS, errors='ignore'))
+    if timestamp_col:
+        df[[timestamp_col]] = parse_timestamp_columns(df[[timestamp_col]].copy())
+    return dedupe_latest_per_store(df).reset_index(drop=True)
+
+def replay_backups(paths, workers=None):
+    """Re-classify saved GPT responses from CSV backups across worker processes"""
+    print("\n♻️  Replaying saved GPT responses...")
+    df = load_backups(paths)
+    default_temp_duration = get_temp_closure_duration()
+    
+    responses = [stored_response(row) for _, row in df.iterrows()]
+    jobs = [
+        (response, row.get("STORE_HOURS", ""), row.get("STORE_ID"))
+        for response, (_, row) in zip(responses, df.iterrows()) if response is not None
+    ]
+    print(f"   🚀 Re-classifying {len(jobs)} responses")
+    replayed = iter(classify_batch(jobs, default_temp_duration, workers))
+    
+    # Rows without a recoverable response keep the verdict they were saved with
+    verdicts = [next(replayed) if response is not None else backup_verdict(row)
+                for response, (_, row) in zip(responses, df.iterrows())]
+    
+    df["PREVIOUS_RECOMMENDATION"] = df["RECOMMENDATION"]
+    df = assign_verdicts(df, verdicts, [response is None for response in responses])
+    
+    changed = df["PREVIOUS_RECOMMENDATION"] != df["RECOMMENDATION"]
+    print(f"✅ Replayed {len(jobs)} rows, kept {len(df) - len(jobs)} saved verdicts, {int(changed.sum())} recommendations changed")
+    if changed.any():
+        print(pd.crosstab(df.loc[changed, "PREVIOUS_RECOMMENDATION"], df.loc[changed, "RECOMMENDATION"]).to_string())
     return df
 
 # ============= FUNCTION 3: CREATE BULK UPLOAD SHEETS =============
+def leading_hour(times):
+    """
+    int(t.split(':')[0]) for every time, as floats with NaN wherever that would raise.
+    "HH:..." strings are decoded straight from the character codes; anything
+    else goes through int() one at a time.
+    """
+    times = np.asarray(times, dtype=object)
+    codes = times.astype('U3').view(np.uint32).reshape(len(times), 3)
+    tens, ones = codes[:, 0] - ord('0'), codes[:, 1] - ord('0')
+    fast = (tens <= 9) & (ones <= 9) & (codes[:, 2] == ord(':'))
+    hours = np.where(fast, tens * 10.0 + ones, np.nan)
+    for i in np.flatnonzero(~fast & times.astype(bool)):
+        try:
+            hours[i] = int(times[i].split(':')[0])
+        except:
+            pass
+    return hours
+
+def split_overnight_shifts(start_times, end_times):
+    """
+    Split overnight shifts for one day's start/end columns, vectorized over all rows.
+    A shift whose start hour is after its end hour becomes start-23:59:59 plus
+    00:00:00-end; rows missing either time get blanks, and times whose hour
+    can't be read pass through unchanged.
+    
+    Returns:
+        (start, end, start_2, end_2) object arrays
+    """
+    start = np.asarray(start_times, dtype=object)
+    end = np.asarray(end_times, dtype=object)
+    present = start.astype(bool) & end.astype(bool)
+    # NaN hours compare False, so unparseable times are never split
+    overnight = present & (leading_hour(start) > leading_hour(end))
+    blank = np.full(len(start), '', dtype=object)
+    return (
+        np.where(present, start, blank),
+        np.where(overnight, '23:59:59', np.where(present, end, blank)),
+        np.where(overnight, '00:00:00', blank),
+        np.where(overnight, end, blank)
+    )
+
+SPECIAL_HOURS_COLUMNS = ['date', 'store_id', 'store_name', 'open', 'start_time', 'end_time', 'description']
+
+def build_special_hours_sheet(df):
+    """
+    Bulk_Upload_Special_Hours rows: one per SPECIAL_HOURS_RAW entry whose holiday has a known date.
+    Only rows with special hours are expanded, and each distinct holiday name is
+    resolved to a date once.
+    """
+    if len(df) == 0 or 'SPECIAL_HOURS_RAW' not in df.columns:
+        return pd.DataFrame(columns=SPECIAL_HOURS_COLUMNS)
+    
+    has_special_hours = df['SPECIAL_HOURS_RAW'].str.len().gt(0)
+    if not has_special_hours.any():
+        return pd.DataFrame(columns=SPECIAL_HOURS_COLUMNS)
+    
+    rows = df.loc[has_special_hours]
+    exploded = pd.DataFrame({
+        'store_id': rows['STORE_ID'] if 'STORE_ID' in rows.columns else '',
+        'store_name': rows['STORE_NAME'] if 'STORE_NAME' in rows.columns else '',
+        'entry': rows['SPECIAL_HOURS_RAW']
+    }).explode('entry', ignore_index=True)
+    
+    entries = exploded['entry'].tolist()
+    holidays = pd.Series([entry.get('holiday', '') for entry in entries], dtype=object)
+    
+    # Date lookup table: one get_holiday_date call per distinct holiday name
+    holiday_dates = {}
+    for name in holidays.unique():
+        holiday_date = get_holiday_date(name)
+        holiday_dates[name] = holiday_date.strftime("%m/%d/%Y") if holiday_date else None
+    dates = holidays.map(holiday_dates)
+    
+    sheet = pd.DataFrame({
+        'date': dates,
+        'store_id': exploded['store_id'],
+        'store_name': exploded['store_name'],
+        'open': [entry.get('is_open', 'no') for entry in entries],
+        'start_time': [entry.get('start_time', '') for entry in entries],
+        'end_time': [entry.get('end_time', '') for entry in entries],
+        'description': [f"{name} picked up by DRSC AI Tool" for name in holidays]
+    })
+    sheet = sheet[dates.notna()].reset_index(drop=True)
+    if len(sheet) == 0:
+        return pd.DataFrame(columns=SPECIAL_HOURS_COLUMNS)
+    return sheet
+
 def create_bulk_upload_sheets(df):
     print("\n📋 Creating bulk upload sheets...")
     
@@ -1438,54 +1831,18 @@ def create_bulk_upload_sheets(df):
         temp_close_bulk = pd.DataFrame(columns=['store_id', 'deactivation_reason_id', 'is_temp_deactivation', 'duration', 'notes'])
     
     if len(change_hours_df) > 0:
-        change_hours_bulk = pd.DataFrame({
-            'store_id': change_hours_df['STORE_ID'].values
-        })
+        change_hours_columns = {'store_id': change_hours_df['STORE_ID'].values}
+        for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']:
+            start, end, start_2, end_2 = split_overnight_shifts(
+                change_hours_df[f'start_time_{day}'].values,
+                change_hours_df[f'end_time_{day}'].values
+            )
+            change_hours_columns[f'{day}_start_time'] = start
+            change_hours_columns[f'{day}_end_time'] = end
+            change_hours_columns[f'{day}_start_time_2'] = start_2
+            change_hours_columns[f'{day}_end_time_2'] = end_2
         
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        for day in days:
-            start_col = f'start_time_{day}'
-            end_col = f'end_time_{day}'
-            
-            start_times = change_hours_df[start_col].values
-            end_times = change_hours_df[end_col].values
-            
-            processed_start_times = []
-            processed_end_times = []
-            processed_start_times_2 = []
-            processed_end_times_2 = []
-            
-            for start, end in zip(start_times, end_times):
-                if start and end:
-                    try:
-                        start_hour = int(start.split(':')[0])
-                        end_hour = int(end.split(':')[0])
-                        
-                        if start_hour > end_hour:
-                            processed_start_times.append(start)
-                            processed_end_times.append('23:59:59')
-                            processed_start_times_2.append('00:00:00')
-                            processed_end_times_2.append(end)
-                        else:
-                            processed_start_times.append(start)
-                            processed_end_times.append(end)
-                            processed_start_times_2.append('')
-                            processed_end_times_2.append('')
-                    except:
-                        processed_start_times.append(start)
-                        processed_end_times.append(end)
-                        processed_start_times_2.append('')
-                        processed_end_times_2.append('')
-                else:
-                    processed_start_times.append('')
-                    processed_end_times.append('')
-                    processed_start_times_2.append('')
-                    processed_end_times_2.append('')
-            
-            change_hours_bulk[f'{day}_start_time'] = processed_start_times
-            change_hours_bulk[f'{day}_end_time'] = processed_end_times
-            change_hours_bulk[f'{day}_start_time_2'] = processed_start_times_2
-            change_hours_bulk[f'{day}_end_time_2'] = processed_end_times_2
+        change_hours_bulk = pd.DataFrame(change_hours_columns)
     else:
         cols = ['store_id']
         for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']:
@@ -1493,37 +1850,7 @@ def create_bulk_upload_sheets(df):
         change_hours_bulk = pd.DataFrame(columns=cols)
     
     # Special hours
-    special_hours_records = []
-    for idx, row in df.iterrows():
-        store_id = row.get('STORE_ID', '')
-        store_name = row.get('STORE_NAME', '')
-        special_hours_raw = row.get('SPECIAL_HOURS_RAW', [])
-        
-        for special_hour in special_hours_raw:
-            holiday_name = special_hour.get('holiday', '')
-            is_open = special_hour.get('is_open', 'no')
-            start_time = special_hour.get('start_time', '')
-            end_time = special_hour.get('end_time', '')
-            
-            holiday_date = get_holiday_date(holiday_name)
-            if holiday_date:
-                date_str = holiday_date.strftime("%m/%d/%Y")
-                description = f"{holiday_name} picked up by DRSC AI Tool"
-                
-                special_hours_records.append({
-                    'date': date_str,
-                    'store_id': store_id,
-                    'store_name': store_name,
-                    'open': is_open,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'description': description
-                })
-    
-    if special_hours_records:
-        bulk_upload_special_hours = pd.DataFrame(special_hours_records)
-    else:
-        bulk_upload_special_hours = pd.DataFrame(columns=['date', 'store_id', 'store_name', 'open', 'start_time', 'end_time', 'description'])
+    bulk_upload_special_hours = build_special_hours_sheet(df)
     
     print(f"✅ Created bulk upload sheets:")
     print(f"   - Address change: {len(address_change_bulk)} stores")
@@ -1535,25 +1862,31 @@ def create_bulk_upload_sheets(df):
     return address_change_bulk, perm_close_bulk, temp_close_bulk, change_hours_bulk, bulk_upload_special_hours
 
 # ============= FUNCTION 4: SEND TO SLACK =============
+def write_analysis_workbook(df, excel_filename):
+    """Write the full analysis plus the bulk upload sheets to one Excel file and return the bulk sheets"""
+    bulk_sheets = create_bulk_upload_sheets(df)
+    address_change_bulk, perm_close_bulk, temp_close_bulk, change_hours_bulk, bulk_upload_special_hours = bulk_sheets
+    
+    with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Full_Analysis', index=False)
+        address_change_bulk.to_excel(writer, sheet_name='Flag_New_Address', index=False)
+        perm_close_bulk.to_excel(writer, sheet_name='Bulk_Upload_Perm_Close', index=False)
+        temp_close_bulk.to_excel(writer, sheet_name='Bulk_Upload_Temp_Close', index=False)
+        change_hours_bulk.to_excel(writer, sheet_name='Bulk_Upload_Change_Hours', index=False)
+        bulk_upload_special_hours.to_excel(writer, sheet_name='Bulk_Upload_Special_Hours', index=False)
+    
+    print(f"✅ Created Excel file: {excel_filename}")
+    return bulk_sheets
+
 def send_to_slack(df, timestamp_str):
     print("\n📤 Sending to Slack...")
     
     client = WebClient(token=SLACK_BOT_TOKEN)
     
     try:
-        address_change_bulk, perm_close_bulk, temp_close_bulk, change_hours_bulk, bulk_upload_special_hours = create_bulk_upload_sheets(df)
-        
         excel_filename = f'store_hours_analysis_{timestamp_str}.xlsx'
-        
-        with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Full_Analysis', index=False)
-            address_change_bulk.to_excel(writer, sheet_name='Flag_New_Address', index=False)
-            perm_close_bulk.to_excel(writer, sheet_name='Bulk_Upload_Perm_Close', index=False)
-            temp_close_bulk.to_excel(writer, sheet_name='Bulk_Upload_Temp_Close', index=False)
-            change_hours_bulk.to_excel(writer, sheet_name='Bulk_Upload_Change_Hours', index=False)
-            bulk_upload_special_hours.to_excel(writer, sheet_name='Bulk_Upload_Special_Hours', index=False)
-        
-        print(f"✅ Created Excel file: {excel_filename}")
+        bulk_sheets = write_analysis_workbook(df, excel_filename)
+        address_change_bulk, perm_close_bulk, temp_close_bulk, change_hours_bulk, bulk_upload_special_hours = bulk_sheets
         
         rec_counts = df['RECOMMENDATION'].value_counts().to_dict()
         total_stores = len(df)
@@ -1594,6 +1927,10 @@ def send_to_slack(df, timestamp_str):
         special_hours_pct = (special_hours_stores / total_stores * 100) if total_stores > 0 else 0
         summary_parts.append(f"• *Special Hours*: {special_hours_stores} stores in Bulk_Upload_Special_Hours, {special_hours_pct:.1f}% of total stores")
         
+        if SCREENING_MODE and ROUTING_STATS.screened:
+            summary_parts.append("")
+            summary_parts.append(f"Routing: {ROUTING_STATS.summary_line()}")
+        
         summary = "\n".join(summary_parts)
         
         print("📤 Uploading to Slack...")
@@ -1613,13 +1950,36 @@ def send_to_slack(df, timestamp_str):
 
 # ============= MAIN EXECUTION =============
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DRSC store hours analysis")
+    parser.add_argument("--replay", nargs="+", metavar="CSV",
+                        help="re-classify the GPT responses saved in store_hours_analysis_*.csv backups instead of calling Mode/OpenAI")
+    parser.add_argument("--workers", type=int, default=None, help="classifier processes for --replay (default: CLASSIFY_WORKERS)")
+    parser.add_argument("--batch", action="store_true", help="send the vision calls through the OpenAI Batch API (backfills)")
+    args = parser.parse_args()
+    if args.batch:
+        BATCH_MODE = True
+    
+    if args.replay:
+        replayed_df = replay_backups(args.replay, workers=args.workers)
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        replayed_df.to_csv(f'store_hours_replay_{timestamp_str}.csv', index=False)
+        write_analysis_workbook(replayed_df, f'store_hours_replay_{timestamp_str}.xlsx')
+        print(f"\n✅ Saved store_hours_replay_{timestamp_str}.csv")
+        raise SystemExit(0)
+    
     print("="*60)
     print("AUTOMATED STORE HOURS ANALYSIS - UPDATED WITH TIME-BASED DURATION")
     print("="*60 + "\n")
     
     try:
-        df = get_mode_data()
-        processed_df = process_store_hours(df)
+        if USE_PIPELINE and not BATCH_MODE:
+            print("\n🔄 Streaming data from Mode...")
+            chunks = MODE_CLIENT.iter_report_chunks(REPORT_ID, QUERY_ID, max_wait=MODE_MAX_WAIT, dtype=DRSC_CSV_DTYPES,
+                                                     parse_dates=True)
+            processed_df = run_store_hours_pipeline(chunks)
+        else:
+            df = get_mode_data()
+            processed_df = process_store_hours(df)
         
         timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -1629,11 +1989,23 @@ if __name__ == "__main__":
         
         send_to_slack(processed_df, timestamp_str)
         
+        if INCREMENTAL_MODE or NEAR_DUPLICATE_REUSE:
+            record_checkpoints(processed_df, timestamp_str)
+        
         print(f"\n📊 Summary:")
         print(f"   Total stores: {len(processed_df)}")
         print(f"   Recommendations:")
         for rec, count in processed_df['RECOMMENDATION'].value_counts().items():
             print(f"      - {rec}: {count}")
+        limiter = get_shared_limiter()
+        print(f"   OpenAI retries: {limiter.retries} ({limiter.throttled} rate limited)")
+        print(f"   Response cache: {RESPONSE_CACHE.stats_line()}")
+        if IMAGE_PREFETCH:
+            print(f"   Image prefetch: {IMAGE_PREFETCHER.stats_line()}")
+        if SCREENING_MODE:
+            print(f"   Screening: {ROUTING_STATS.summary_line()}")
+        if INCREMENTAL_MODE or NEAR_DUPLICATE_REUSE:
+            print(f"   Carried forward from previous runs: {int(processed_df['CARRIED_FORWARD'].sum())}")
         
         print("\n✅ AUTOMATION COMPLETE!")
         
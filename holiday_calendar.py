@@ -0,0 +1,182 @@
+# ============= HOLIDAY CALENDAR =============
+# Dates and monitoring windows for every holiday the store-hours and
+# holiday-hours scripts know about. Each season year is computed once and
+# cached, so lookups by (name, year) and "what is active on this date" are
+# dictionary hits.
+#
+# Years are season years: New Year's Day of season 2025 is 01/01/2026, which is
+# how both scripts have always dated it.
+import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+MONDAY, THURSDAY, SUNDAY = 0, 3, 6
+
+# Monitoring starts this many days before a holiday unless its rule says otherwise
+DEFAULT_MONITOR_DAYS = 4
+
+
+class Holiday(NamedTuple):
+    name: str
+    date: datetime.date
+    monitor_start: datetime.date
+    emoji: str
+
+
+def nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=1 is the first)"""
+    first = datetime.date(year, month, 1)
+    return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def last_weekday(year, month, weekday):
+    """Last given weekday of a month"""
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def easter_sunday(year):
+    """Western Easter (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    day = (h + l - 7 * m + 33 * month + 19) % 32
+    return datetime.date(year, month, day)
+
+
+def thanksgiving(year):
+    return nth_weekday(year, 11, THURSDAY, 4)
+
+
+# name -> {'date': season year -> date, 'monitor_start': season year -> date (optional), 'emoji': str}
+# The first three keep their old precedence when a free-form name is matched by substring.
+HOLIDAY_RULES = {
+    'thanksgiving': {'date': thanksgiving, 'emoji': '🦃'},
+    'christmas': {'date': lambda year: datetime.date(year, 12, 25), 'emoji': '🎄'},
+    'new year': {'date': lambda year: datetime.date(year + 1, 1, 1), 'emoji': '🎉'},
+    'black friday': {'date': lambda year: thanksgiving(year) + datetime.timedelta(days=1), 'emoji': '🛍️'},
+    'cyber monday': {'date': lambda year: thanksgiving(year) + datetime.timedelta(days=4), 'emoji': '🛍️'},
+    'easter': {'date': easter_sunday, 'emoji': '🐣'},
+    'labor day': {'date': lambda year: nth_weekday(year, 9, MONDAY, 1), 'emoji': '🇺🇸'},
+    'memorial day': {'date': lambda year: last_weekday(year, 5, MONDAY), 'emoji': '🇺🇸'},
+    'july 4th': {'date': lambda year: datetime.date(year, 7, 4), 'emoji': '🎆'},
+    'independence day': {'date': lambda year: datetime.date(year, 7, 4), 'emoji': '🎆'},
+    'halloween': {'date': lambda year: datetime.date(year, 10, 31), 'emoji': '🎃'},
+    "mother's day": {'date': lambda year: nth_weekday(year, 5, SUNDAY, 2), 'emoji': '💐'},
+    "father's day": {'date': lambda year: nth_weekday(year, 6, SUNDAY, 3), 'emoji': '👔'},
+    "valentine's day": {'date': lambda year: datetime.date(year, 2, 14), 'emoji': '❤️'},
+    "st. patrick's day": {'date': lambda year: datetime.date(year, 3, 17), 'emoji': '☘️'},
+    # Holiday-hours season (monitoring windows as used by holiday_hours_analyzer.py)
+    'Christmas Eve': {'date': lambda year: datetime.date(year, 12, 24),
+                      'monitor_start': lambda year: datetime.date(year, 12, 20), 'emoji': '🎄'},
+    'Christmas Day': {'date': lambda year: datetime.date(year, 12, 25),
+                      'monitor_start': lambda year: datetime.date(year, 12, 20), 'emoji': '🎄'},
+    "New Year's Eve": {'date': lambda year: datetime.date(year, 12, 31),
+                       'monitor_start': lambda year: datetime.date(year, 12, 27), 'emoji': '🎉'},
+    "New Year's Day": {'date': lambda year: datetime.date(year + 1, 1, 1),
+                       'monitor_start': lambda year: datetime.date(year, 12, 27), 'emoji': '🎉'},
+}
+
+_NAMES_BY_KEY = {name.lower(): name for name in HOLIDAY_RULES}
+
+
+@lru_cache(maxsize=None)
+def canonical_name(holiday_name):
+    """
+    Map a holiday name to its HOLIDAY_RULES key, or None if it isn't supported.
+    Exact (case-insensitive) names win; otherwise the first rule name contained in it.
+    """
+    lower = str(holiday_name).strip().lower()
+    if lower in _NAMES_BY_KEY:
+        return _NAMES_BY_KEY[lower]
+    for key, name in _NAMES_BY_KEY.items():
+        if key in lower:
+            return name
+    return None
+
+
+@lru_cache(maxsize=None)
+def season(year):
+    """{name: Holiday} for every supported holiday in a season year"""
+    holidays = {}
+    for name, rule in HOLIDAY_RULES.items():
+        date = rule['date'](year)
+        monitor_start = rule['monitor_start'](year) if 'monitor_start' in rule else date - datetime.timedelta(days=DEFAULT_MONITOR_DAYS)
+        holidays[name] = Holiday(name, date, monitor_start, rule['emoji'])
+    return holidays
+
+
+@lru_cache(maxsize=None)
+def _active_index(year):
+    """{date: (Holiday, ...)} covering every day of every monitoring window in a season year"""
+    index = {}
+    for holiday in season(year).values():
+        day = holiday.monitor_start
+        while day <= holiday.date:
+            index.setdefault(day, []).append(holiday)
+            day += datetime.timedelta(days=1)
+    return {day: tuple(holidays) for day, holidays in index.items()}
+
+
+def current_season_year(today=None):
+    return (today or datetime.date.today()).year
+
+
+def get_holiday(holiday_name, year=None, today=None):
+    """
+    Holiday record for a name in a season year, or None.
+    Without a year it's the next occurrence on or after today (e.g. New Year's Day
+    run on Jan 1 is that day, run in December it's the coming Jan 1).
+    """
+    name = canonical_name(holiday_name)
+    if name is None:
+        return None
+    if year is not None:
+        return season(year)[name]
+    today = today or datetime.date.today()
+    # Last season's holiday can still be ahead in January (New Year's Day)
+    for year in (today.year - 1, today.year):
+        if season(year)[name].date >= today:
+            return season(year)[name]
+    return season(today.year + 1)[name]
+
+
+def get_holiday_date(holiday_name, year=None, today=None):
+    """Date of a holiday in a season year (the next one on or after today by default), or None"""
+    holiday = get_holiday(holiday_name, year, today)
+    return holiday.date if holiday else None
+
+
+def active_holidays(check_date=None, names=None):
+    """
+    Holidays whose monitoring window (monitor_start..date, inclusive) contains check_date.
+    This season's holidays come first, then last season's (e.g. New Year's Day in January).
+
+    Args:
+        check_date: Date to check (today by default).
+        names: Only consider these holiday names (all supported holidays by default).
+    """
+    check_date = check_date or datetime.date.today()
+    wanted = None if names is None else {canonical_name(name) for name in names}
+    active = []
+    for year in (check_date.year, check_date.year - 1):
+        for holiday in _active_index(year).get(check_date, ()):
+            if wanted is None or holiday.name in wanted:
+                active.append(holiday)
+    return active
+
+
+def warm(first_year, last_year):
+    """Precompute seasons first_year..last_year (inclusive)"""
+    for year in range(first_year, last_year + 1):
+        _active_index(year)
+
+
+# Compute the seasons the scripts will realistically ask about up front
+warm(current_season_year() - 1, current_season_year() + 2)
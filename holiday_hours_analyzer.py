@@ -1,16 +1,17 @@
 # ============= HOLIDAY HOURS TREND ANALYZER - 2025 SEASON =============
-import requests
 import pandas as pd
-import time
-from io import StringIO
 import openai
 from tqdm import tqdm
-import re
 import datetime
 from collections import defaultdict
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import os
+from rate_limiter import create_chat_completion, completion_text, get_shared_limiter, stream_chat_completion
+from batch_client import run_chat_batch
+from mode_client import ModeClient
+import holiday_calendar
+from response_patterns import CLARITY_SCORE_RE, HOLIDAY_TIME_RANGE_RE, clarity_score_end, holiday_line_pattern
 
 print("=" * 60)
 print("HOLIDAY HOURS TREND ANALYZER - 2025 SEASON")
@@ -22,12 +23,30 @@ MODE_SECRET = os.environ.get('MODE_SECRET')
 MODE_ACCOUNT = 'doordash'
 REPORT_ID = 'b04acfd4da8b'  # Your new report ID
 QUERY_ID = 'f0532f84ed46'   # Your new query ID
+MODE_MAX_WAIT = int(os.environ.get('MODE_MAX_WAIT', '1800'))  # Give up on the report run after 30 min
+# Explicit dtypes for the streamed report CSV (timestamp columns are left as text)
+HOLIDAY_CSV_DTYPES = {
+    'STORE_ID': str, 'IMAGE_URL': str, 'BUSINESS_ID': str, 'BUSINESS_NAME': str,
+    'CNG_BUSINESS_LINE': str, 'PICK_MODEL': str, 'IMAGE_CONFIDENCE': float
+}
 
 openai.api_key = os.environ.get('OPENAI_API_KEY')
+openai.max_retries = 0  # Retries and backoff are handled by rate_limiter
+# Batch mode: send every image through the OpenAI Batch API (half price, results within
+# minutes to hours) instead of one synchronous call per image
+HOLIDAY_BATCH_MODE = os.environ.get('HOLIDAY_BATCH_MODE', 'false').lower() == 'true'
+HOLIDAY_BATCH_MAX_WAIT = int(os.environ.get('HOLIDAY_BATCH_MAX_WAIT', str(24 * 3600)))
+# "compact": only the holiday lines and the clarity score, no commentary; "full": the original answer.
+# HOLIDAY_STREAM hangs up once the clarity score (the last thing parsed) has arrived
+HOLIDAY_RESPONSE_CONTRACT = os.environ.get('HOLIDAY_RESPONSE_CONTRACT', 'full').lower()
+HOLIDAY_MAX_TOKENS = int(os.environ.get('HOLIDAY_MAX_TOKENS', '150' if HOLIDAY_RESPONSE_CONTRACT == 'compact' else '500'))
+HOLIDAY_STREAM = os.environ.get('HOLIDAY_STREAM', 'false').lower() == 'true'
 
 SLACK_BOT_TOKEN = os.environ.get('SLACK_BOT_TOKEN')
 SLACK_CHANNEL_ID = 'C098G9URHEV'  # Your Slack channel
 
+MODE_CLIENT = ModeClient(MODE_ACCOUNT, MODE_TOKEN, MODE_SECRET)
+
 print(f"✅ Loaded environment variables")
 print(f"   MODE_TOKEN: {'Set' if MODE_TOKEN else 'MISSING'}")
 print(f"   MODE_SECRET: {'Set' if MODE_SECRET else 'MISSING'}")
@@ -35,6 +54,9 @@ print(f"   OPENAI_API_KEY: {'Set' if openai.api_key else 'MISSING'}")
 print(f"   SLACK_BOT_TOKEN: {'Set' if SLACK_BOT_TOKEN else 'MISSING'}")
 
 # ============= HOLIDAY CONFIGURATION FOR 2025/2026 =============
+# Holidays this analyzer monitors; dates and windows come from holiday_calendar
+MONITORED_HOLIDAYS = ['Christmas Eve', 'Christmas Day', "New Year's Eve", "New Year's Day"]
+
 def get_holiday_config(year=None):
     """
     Get holiday dates and monitoring windows.
@@ -43,27 +65,14 @@ def get_holiday_config(year=None):
     if year is None:
         year = datetime.date.today().year
     
+    holidays = holiday_calendar.season(year)
     return {
-        'Christmas Eve': {
-            'date': datetime.date(year, 12, 24),
-            'monitor_start': datetime.date(year, 12, 20),  # Start monitoring 4 days before
-            'emoji': '🎄'
-        },
-        'Christmas Day': {
-            'date': datetime.date(year, 12, 25),
-            'monitor_start': datetime.date(year, 12, 20),
-            'emoji': '🎄'
-        },
-        "New Year's Eve": {
-            'date': datetime.date(year, 12, 31),
-            'monitor_start': datetime.date(year, 12, 27),  # Start monitoring 4 days before
-            'emoji': '🎉'
-        },
-        "New Year's Day": {
-            'date': datetime.date(year + 1, 1, 1),
-            'monitor_start': datetime.date(year, 12, 27),
-            'emoji': '🎉'
-        },
+        name: {
+            'date': holidays[name].date,
+            'monitor_start': holidays[name].monitor_start,
+            'emoji': holidays[name].emoji
+        }
+        for name in MONITORED_HOLIDAYS
     }
 
 def get_active_holidays(check_date=None):
@@ -74,28 +83,15 @@ def get_active_holidays(check_date=None):
     if check_date is None:
         check_date = datetime.date.today()
     
-    # Check current year and handle year boundary
-    configs_to_check = [get_holiday_config(check_date.year)]
-    if check_date.month == 1:
-        # In January, also check previous year's config for NYE/NYD
-        configs_to_check.append(get_holiday_config(check_date.year - 1))
-    
-    active = []
-    for config in configs_to_check:
-        for holiday_name, holiday_info in config.items():
-            monitor_start = holiday_info['monitor_start']
-            holiday_date = holiday_info['date']
-            
-            # Active if we're between monitor_start and holiday_date (inclusive)
-            if monitor_start <= check_date <= holiday_date:
-                active.append({
-                    'name': holiday_name,
-                    'date': holiday_date,
-                    'emoji': holiday_info['emoji'],
-                    'days_until': (holiday_date - check_date).days
-                })
-    
-    return active
+    return [
+        {
+            'name': holiday.name,
+            'date': holiday.date,
+            'emoji': holiday.emoji,
+            'days_until': (holiday.date - check_date).days
+        }
+        for holiday in holiday_calendar.active_holidays(check_date, MONITORED_HOLIDAYS)
+    ]
 
 def is_monitoring_period(check_date=None):
     """Check if we're in any holiday monitoring period."""
@@ -108,21 +104,10 @@ def get_target_holidays_for_analysis(check_date=None):
 
 # ============= HELPER FUNCTIONS =============
 def get_holiday_date(holiday_name, year=None):
-    """Get the date for a given holiday"""
-    if year is None:
-        year = datetime.date.today().year
-    
-    config = get_holiday_config(year)
-    if holiday_name in config:
-        return config[holiday_name]['date']
-    
-    # Check next year for New Year's Day
-    if holiday_name == "New Year's Day":
-        next_config = get_holiday_config(year)
-        if holiday_name in next_config:
-            return next_config[holiday_name]['date']
-    
-    return None
+    """Get the date for a given holiday (the next one on or after today by default)"""
+    if holiday_name not in MONITORED_HOLIDAYS:
+        return None
+    return holiday_calendar.get_holiday_date(holiday_name, year)
 
 def extract_holiday_hours(text, target_holidays):
     """Extract holiday hours with strict validation - only for target holidays"""
@@ -135,8 +120,7 @@ def extract_holiday_hours(text, target_holidays):
         
         if holiday_lower in text_lower:
             # Look for patterns like "Christmas Eve: 8AM-6PM" or "Thanksgiving: CLOSED"
-            pattern = rf"{holiday}[:\s]*([^\n]+)"
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = holiday_line_pattern(holiday).search(text)
             
             if match:
                 hours_text = match.group(1).strip()
@@ -149,8 +133,7 @@ def extract_holiday_hours(text, target_holidays):
                     holiday_hours[holiday] = hours_text
                 else:
                     # Try to extract hours
-                    time_pattern = r'(\d{1,2}:?\d{0,2}\s*[ap]?m?)\s*[-–to]\s*(\d{1,2}:?\d{0,2}\s*[ap]?m?)'
-                    time_match = re.search(time_pattern, hours_text, re.IGNORECASE)
+                    time_match = HOLIDAY_TIME_RANGE_RE.search(hours_text)
                     if time_match:
                         start_time = time_match.group(1).strip()
                         end_time = time_match.group(2).strip()
@@ -161,7 +144,7 @@ def extract_holiday_hours(text, target_holidays):
 
 def extract_clarity_score(text):
     """Extract clarity score from GPT response"""
-    m = re.search(r"clarity\s*score\s*[:\-]\s*(1(?:\.0+)?|0\.\d+|\.\d+)", text, re.IGNORECASE)
+    m = CLARITY_SCORE_RE.search(text)
     if m:
         try:
             score = float(m.group(1))
@@ -175,69 +158,23 @@ def get_mode_data():
     """Fetch last 3 days of DRSC data from Mode"""
     print("\n🔄 Fetching last 3 days of data from Mode...")
     
-    run_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs'
-    response = requests.post(run_url, auth=(MODE_TOKEN, MODE_SECRET))
-    run_token = response.json()['token']
-    print(f"✅ Run started: {run_token}")
-    
-    # Wait for query to complete
-    state_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}'
-    while True:
-        response = requests.get(state_url, auth=(MODE_TOKEN, MODE_SECRET))
-        state = response.json()['state']
-        if state == 'succeeded':
-            print("✅ Query completed!")
-            break
-        elif state in ['failed', 'cancelled']:
-            raise Exception(f"Mode query {state}")
-        print(f"   Waiting... ({state})")
-        time.sleep(5)
-    
-    # Get results
-    query_runs_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs'
-    response = requests.get(query_runs_url, auth=(MODE_TOKEN, MODE_SECRET))
-    query_runs = response.json()['_embedded']['query_runs']
-    
-    query_run_token = None
-    for qr in query_runs:
-        if qr['query_token'] == QUERY_ID:
-            query_run_token = qr['token']
-            break
-    
-    if not query_run_token:
-        raise Exception("Could not find query run token")
-    
-    result_url = f'https://app.mode.com/api/{MODE_ACCOUNT}/reports/{REPORT_ID}/runs/{run_token}/query_runs/{query_run_token}/results/content.csv'
-    csv_response = requests.get(result_url, auth=(MODE_TOKEN, MODE_SECRET))
-    df = pd.read_csv(StringIO(csv_response.text))
+    df = MODE_CLIENT.fetch_report_dataframe(REPORT_ID, QUERY_ID, max_wait=MODE_MAX_WAIT, dtype=HOLIDAY_CSV_DTYPES)
     
     print(f"✅ Retrieved {len(df)} store images from {df['BUSINESS_NAME'].nunique()} businesses\n")
     return df
 
-def analyze_holiday_hours(df, target_holidays):
-    """Analyze images for holiday hours only"""
-    print("\n🤖 Analyzing images for holiday hours...")
-    print(f"   Looking for: {', '.join(target_holidays)}")
-    
-    # Group by business to show progress
-    businesses = df['BUSINESS_NAME'].unique()
-    print(f"   Processing {len(businesses)} unique businesses...")
-    
-    results = []
-    
+def build_holiday_prompt(target_holidays):
+    """Vision prompt asking only about the target holidays"""
     # Build dynamic holiday list for prompt
     holiday_list = "\n".join([f"- {h}" for h in target_holidays])
-    
-    for i, row in tqdm(df.iterrows(), total=len(df)):
-        image_url = row.get("IMAGE_URL")
-        image_confidence = row.get("IMAGE_CONFIDENCE", 0)
-        
-        # Skip low confidence images
-        if not image_url or image_confidence < 0.5:
-            continue
-        
-        # Dynamic prompt based on which holidays we're monitoring
-        prompt = f"""
+    if HOLIDAY_RESPONSE_CONTRACT == "compact":
+        response_instructions = """Reply with nothing but the holiday lines (or NO HOLIDAY HOURS VISIBLE), then last:
+Clarity score: X.XX (rating from 0.00 to 1.00)"""
+    else:
+        response_instructions = """At the end, provide:
+Clarity score: X.XX (rating from 0.00 to 1.00)"""
+    
+    return f"""
 You are analyzing a store entrance photo to identify ONLY holiday hours announcements.
 
 FOCUS: Look ONLY for signs about these specific holidays:
@@ -265,52 +202,102 @@ IMPORTANT:
 - If no holiday hours are visible, say "NO HOLIDAY HOURS VISIBLE"
 - Must have very clear visibility to report hours
 
-At the end, provide:
-Clarity score: X.XX (rating from 0.00 to 1.00)
+{response_instructions}
 """
 
+def holiday_request(prompt, image_url):
+    """chat.completions.create kwargs for one image (also the body of a batch line)"""
+    return dict(
+        model="gpt-4o",
+        messages=[
+            {"role": "user", "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_url}}
+            ]}
+        ],
+        max_tokens=HOLIDAY_MAX_TOKENS
+    )
+
+def holiday_result(row, image_url, result_text, target_holidays):
+    """Result record for one GPT response, or None unless it clearly shows target holiday hours"""
+    # Extract clarity score
+    clarity = extract_clarity_score(result_text)
+    
+    # Only process high-clarity results
+    if clarity < 0.90 or "NO HOLIDAY HOURS VISIBLE" in result_text.upper():
+        return None
+    holiday_hours = extract_holiday_hours(result_text, target_holidays)
+    if not holiday_hours:
+        return None
+    
+    return {
+        'business_id': row.get('BUSINESS_ID', ''),
+        'business_name': row.get('BUSINESS_NAME', ''),
+        'cng_business_line': row.get('CNG_BUSINESS_LINE', ''),
+        'pick_model': row.get('PICK_MODEL', ''),
+        'store_id': row.get('STORE_ID', ''),
+        'image_url': image_url,
+        'report_date': row.get('CANCELLATION_DATE_UTC', ''),
+        'clarity_score': clarity,
+        'holiday_hours': holiday_hours,
+        'raw_response': result_text
+    }
+
+def analyze_holiday_hours(df, target_holidays, batch_mode=None):
+    """Analyze images for holiday hours only (through the Batch API when batch_mode / HOLIDAY_BATCH_MODE)"""
+    batch_mode = HOLIDAY_BATCH_MODE if batch_mode is None else batch_mode
+    print("\n🤖 Analyzing images for holiday hours...")
+    print(f"   Looking for: {', '.join(target_holidays)}")
+    
+    # Group by business to show progress
+    businesses = df['BUSINESS_NAME'].unique()
+    print(f"   Processing {len(businesses)} unique businesses...")
+    
+    results = []
+    prompt = build_holiday_prompt(target_holidays)
+    
+    images = []
+    for i, row in df.iterrows():
+        image_url = row.get("IMAGE_URL")
+        image_confidence = row.get("IMAGE_CONFIDENCE", 0)
+        
+        # Skip low confidence images (and missing URLs, which read back from the CSV as NaN)
+        if not isinstance(image_url, str) or not image_url or image_confidence < 0.5:
+            continue
+        images.append((row, image_url))
+    
+    if batch_mode:
+        print(f"   📦 Batch mode: submitting {len(images)} images to the OpenAI Batch API")
+        batch_results = run_chat_batch(
+            {str(position): holiday_request(prompt, image_url) for position, (_, image_url) in enumerate(images)},
+            metadata={"script": "holiday_hours_analyzer"},
+            max_wait=HOLIDAY_BATCH_MAX_WAIT
+        )
+        responses = (batch_results[str(position)] for position in range(len(images)))
+    else:
+        def call(image_url):
+            try:
+                if HOLIDAY_STREAM:
+                    return stream_chat_completion(stop_at=clarity_score_end, **holiday_request(prompt, image_url))[0]
+                return completion_text(create_chat_completion(**holiday_request(prompt, image_url)))
+            except Exception as e:
+                return e
+        responses = (call(image_url) for _, image_url in images)
+    
+    for (row, image_url), result_text in tqdm(zip(images, responses), total=len(images)):
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "user", "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ]}
-                ],
-                max_tokens=500
-            )
-            
-            result_text = response.choices[0].message.content.strip()
-            
-            # Extract clarity score
-            clarity = extract_clarity_score(result_text)
-            
-            # Only process high-clarity results
-            if clarity >= 0.90 and "NO HOLIDAY HOURS VISIBLE" not in result_text.upper():
-                holiday_hours = extract_holiday_hours(result_text, target_holidays)
-                
-                if holiday_hours:
-                    results.append({
-                        'business_id': row.get('BUSINESS_ID', ''),
-                        'business_name': row.get('BUSINESS_NAME', ''),
-                        'cng_business_line': row.get('CNG_BUSINESS_LINE', ''),
-                        'pick_model': row.get('PICK_MODEL', ''),
-                        'store_id': row.get('STORE_ID', ''),
-                        'image_url': image_url,
-                        'report_date': row.get('CANCELLATION_DATE_UTC', ''),
-                        'clarity_score': clarity,
-                        'holiday_hours': holiday_hours,
-                        'raw_response': result_text
-                    })
-            
-            time.sleep(0.5)  # Rate limiting
-            
+            if isinstance(result_text, Exception):
+                raise result_text
+            result = holiday_result(row, image_url, result_text, target_holidays)
+            if result:
+                results.append(result)
         except Exception as e:
             print(f"Error processing store {row.get('STORE_ID', 'unknown')}: {e}")
             continue
     
     print(f"✅ Found {len(results)} stores with holiday hours posted")
+    limiter = get_shared_limiter()
+    print(f"   OpenAI retries: {limiter.retries} ({limiter.throttled} rate limited)")
     return results
 
 def aggregate_business_trends(results, target_holidays):
@@ -512,7 +499,7 @@ if __name__ == "__main__":
         today = datetime.date.today()
         
         # Target holidays: Christmas Eve, Christmas Day, New Year's Eve, New Year's Day
-        target_holidays = ['Christmas Eve', 'Christmas Day', "New Year's Eve", "New Year's Day"]
+        target_holidays = list(MONITORED_HOLIDAYS)
         
         # Build active_holidays list for display and Slack
         config = get_holiday_config(today.year)
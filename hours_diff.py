@@ -0,0 +1,154 @@
+# ============= POSTED VS DOORDASH HOURS DIFF ENGINE =============
+# Compares posted hours against DoorDash hours for a whole batch of stores in
+# one NumPy pass. Inputs are (N, 7, 2) minute arrays from hours_parser
+# (parse_store_hours / store_hours_matrix / posted_hours_array). DoorDash day
+# names are case-folded here, so "Monday: 08:00 - 22:00" is compared, unlike in
+# the classifier's identical-hours check, which only ever matched lowercase names.
+#
+# Re-score a saved run with other settings:
+#   python hours_diff.py store_hours_analysis_20250101_120000.csv --tolerance 10 --min-days 5 --wrap
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from hours_parser import (MISSING_MINUTES, WEEKDAY_NAMES, extract_hours, minutes_or_missing, posted_hours_array,
+                          store_hours_matrix)
+from structured_review import parse_store_review
+
+# Posted hours within this many minutes of DoorDash's count as the same
+HOURS_MATCH_TOLERANCE_MIN = 5
+# ...and at least this many comparable days must agree
+HOURS_MATCH_MIN_DAYS = 4
+
+MINUTES_PER_DAY = 1440
+NO_DEVIATION = -1
+
+
+class HoursDiff(NamedTuple):
+    """Per-store, per-day comparison results (arrays over the batch's leading axes)"""
+    comparable: np.ndarray         # (..., 7) both sides have a start and an end
+    matched: np.ndarray            # (..., 7) comparable and start/end within tolerance
+    mismatched: np.ndarray         # (..., 7) comparable and outside tolerance
+    deviation: np.ndarray          # (..., 7, 2) start/end deviation in minutes, NO_DEVIATION if not comparable
+    max_deviation: np.ndarray      # (...,) largest deviation over comparable days, NO_DEVIATION if none
+    matched_days: np.ndarray       # (...,)
+    mismatched_days: np.ndarray    # (...,)
+    identical: np.ndarray          # (...,) no mismatched day and at least min_days matched
+
+
+def diff_hours(posted, doordash, tolerance=HOURS_MATCH_TOLERANCE_MIN, min_days=HOURS_MATCH_MIN_DAYS, wrap=False):
+    """
+    Diff (..., 7, 2) posted and DoorDash minute arrays.
+
+    Args:
+        tolerance: Max minutes a start or end may differ for the day to match.
+        min_days: Matched days needed (with no mismatches) for the hours to count as identical.
+        wrap: Measure deviations the short way round the clock, like time_diff_min
+            (23:58 vs 00:02 is 4 minutes). Off by default, as in hours_are_identical.
+    """
+    posted = np.asarray(posted, dtype=np.int32)
+    doordash = np.asarray(doordash, dtype=np.int32)
+
+    comparable = (posted != MISSING_MINUTES).all(axis=-1) & (doordash != MISSING_MINUTES).all(axis=-1)
+    deviation = np.abs(posted - doordash)
+    if wrap:
+        # Only real clock times wrap; odd out-of-range values keep their raw distance
+        deviation = np.where(deviation <= MINUTES_PER_DAY, np.minimum(deviation, MINUTES_PER_DAY - deviation), deviation)
+    deviation = np.where(comparable[..., np.newaxis], deviation, NO_DEVIATION)
+
+    close = (deviation <= tolerance).all(axis=-1)
+    matched = comparable & close
+    mismatched = comparable & ~close
+    matched_days = matched.sum(axis=-1)
+    mismatched_days = mismatched.sum(axis=-1)
+
+    return HoursDiff(
+        comparable=comparable,
+        matched=matched,
+        mismatched=mismatched,
+        deviation=deviation,
+        max_deviation=deviation.max(axis=(-2, -1)),
+        matched_days=matched_days,
+        mismatched_days=mismatched_days,
+        identical=(mismatched_days == 0) & (matched_days >= min_days)
+    )
+
+
+def hours_identical(posted, doordash, tolerance=HOURS_MATCH_TOLERANCE_MIN, min_days=HOURS_MATCH_MIN_DAYS):
+    """True where every comparable day matches and at least min_days were compared"""
+    return diff_hours(posted, doordash, tolerance, min_days).identical
+
+
+def clock_minutes(values):
+    """Minutes since midnight for a column of times, MISSING_MINUTES where blank/unreadable"""
+    values = pd.Series(values, dtype=object)
+    lookup = {value: minutes_or_missing(value) for value in values.dropna().unique()}
+    return values.map(lookup).fillna(MISSING_MINUTES).to_numpy(dtype=np.int32)
+
+
+def response_posted_hours(text):
+    """Posted hours in one saved GPT response, read the way the classifier reads them"""
+    review = parse_store_review(text)
+    return review.hours if review is not None else extract_hours(text)
+
+
+def posted_hours_matrix(df):
+    """
+    (N, 7, 2) posted minutes for every row of a results frame, re-extracted from its
+    RAW_RESPONSE. These are the raw posted times the identical-hours check compares
+    (the start/end columns are only filled for Change Store Hours rows, and
+    normalize_time has turned 00:00 into 23:59:59 there). Rows without a saved
+    response (backups from before RAW_RESPONSE) fall back to those columns.
+    """
+    columns = [
+        clock_minutes(df[f'{edge}_time_{day}']) if f'{edge}_time_{day}' in df.columns
+        else np.full(len(df), MISSING_MINUTES, dtype=np.int32)
+        for day in WEEKDAY_NAMES for edge in ['start', 'end']
+    ]
+    posted = np.stack(columns, axis=-1).reshape(len(df), 7, 2)
+    if 'RAW_RESPONSE' in df.columns:
+        for position, text in enumerate(df['RAW_RESPONSE']):
+            if isinstance(text, str) and text:
+                posted[position] = posted_hours_array(response_posted_hours(text))
+    return posted
+
+
+def rescore_results(df, tolerance=HOURS_MATCH_TOLERANCE_MIN, min_days=HOURS_MATCH_MIN_DAYS, wrap=False):
+    """
+    Diff a saved results frame (STORE_HOURS plus RAW_RESPONSE or the posted start/end
+    columns) and return one row of summary columns per store.
+    """
+    diff = diff_hours(posted_hours_matrix(df), store_hours_matrix(df['STORE_HOURS']), tolerance, min_days, wrap)
+    return pd.DataFrame({
+        'HOURS_MATCHED_DAYS': diff.matched_days,
+        'HOURS_MISMATCHED_DAYS': diff.mismatched_days,
+        'HOURS_MAX_DEVIATION_MIN': diff.max_deviation,
+        'HOURS_IDENTICAL': diff.identical,
+        'HOURS_MISMATCHED_DAY_NAMES': [
+            ', '.join(day for day, bad in zip(WEEKDAY_NAMES, row) if bad) for row in diff.mismatched
+        ]
+    }, index=df.index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score a store hours results CSV against DoorDash hours")
+    parser.add_argument("csv", help="store_hours_analysis_*.csv written by fixed_drsc_code_v2.py")
+    parser.add_argument("--tolerance", type=int, default=HOURS_MATCH_TOLERANCE_MIN)
+    parser.add_argument("--min-days", type=int, default=HOURS_MATCH_MIN_DAYS)
+    parser.add_argument("--wrap", action="store_true", help="measure deviations the short way round midnight")
+    parser.add_argument("--output", help="where to write the re-scored CSV (default: <csv>_rescored.csv)")
+    args = parser.parse_args()
+
+    results = pd.read_csv(args.csv, dtype={'STORE_ID': str, 'STORE_HOURS': str, 'RAW_RESPONSE': str})
+    scored = pd.concat([results, rescore_results(results, args.tolerance, args.min_days, args.wrap)], axis=1)
+    output = args.output or args.csv.rsplit('.', 1)[0] + '_rescored.csv'
+    scored.to_csv(output, index=False)
+
+    print(f"✅ Re-scored {len(scored)} rows (tolerance {args.tolerance} min, {args.min_days}+ days, wrap={args.wrap})")
+    print(f"   Identical to DoorDash: {int(scored['HOURS_IDENTICAL'].sum())}")
+    if 'RECOMMENDATION' in scored.columns:
+        change_hours = scored['RECOMMENDATION'] == 'Change Store Hours'
+        print(f"   Change Store Hours rows now identical: {int((scored['HOURS_IDENTICAL'] & change_hours).sum())}")
+    print(f"   Saved to {output}")
@@ -0,0 +1,203 @@
+# ============= FAST HOURS PARSER =============
+# Time parsing for store hours without datetime.strptime. Each format is one
+# compiled regex using the same grammar strptime uses for %I/%H/%M/%S/%p, and
+# the rest is integer arithmetic, so results match the strptime-based code
+# exactly (including which inputs it rejects).
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from response_patterns import DAY_HOURS_RE
+
+# strptime's own sub-patterns (C locale, compiled case-insensitively like strptime does)
+_HOUR_12 = r"(1[0-2]|0[1-9]|[1-9])"
+_HOUR_24 = r"(2[0-3]|[0-1]\d|\d)"
+_MINUTE = r"([0-5]\d|\d)"
+_SECOND = r"(6[0-1]|[0-5]\d|\d)"
+
+TWELVE_HOUR_RE = re.compile(_HOUR_12 + ":" + _MINUTE + r"(am|pm)", re.IGNORECASE)      # %I:%M%p
+TWENTY_FOUR_HOUR_RE = re.compile(_HOUR_24 + ":" + _MINUTE, re.IGNORECASE)              # %H:%M
+CLOCK_TIME_RE = re.compile(_HOUR_24 + ":" + _MINUTE + ":" + _SECOND, re.IGNORECASE)    # %H:%M:%S
+
+CLOCK_TIME_PREFIX_RE = re.compile(r"\d{1,2}:\d{2}:\d{2}")
+
+SECONDS_PER_DAY = 86400
+
+
+def twelve_hour_seconds(text):
+    """Seconds since midnight for an 'H:MMam' / 'HH:MMpm' time, or None if strptime would reject it"""
+    match = TWELVE_HOUR_RE.fullmatch(text)
+    if not match:
+        return None
+    hour = int(match.group(1)) % 12
+    if match.group(3).lower() == "pm":
+        hour += 12
+    return hour * 3600 + int(match.group(2)) * 60
+
+
+def twenty_four_hour_seconds(text):
+    """Seconds since midnight for an 'H:MM' / 'HH:MM' time, or None"""
+    match = TWENTY_FOUR_HOUR_RE.fullmatch(text)
+    if not match:
+        return None
+    return int(match.group(1)) * 3600 + int(match.group(2)) * 60
+
+
+def clock_time_seconds(text):
+    """Seconds since midnight for an 'HH:MM:SS' time, or None"""
+    match = CLOCK_TIME_RE.fullmatch(text)
+    if not match:
+        return None
+    second = int(match.group(3))
+    # strptime's pattern allows leap seconds, but datetime() then rejects them
+    if second > 59:
+        return None
+    return int(match.group(1)) * 3600 + int(match.group(2)) * 60 + second
+
+
+def format_clock_time(seconds):
+    """Seconds since midnight -> canonical 'HH:MM:SS'"""
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return f"{hour:02d}:{minute:02d}:{second:02d}"
+
+
+def parse_day_range(start, end):
+    """
+    Seconds since midnight for one posted day's start/end, or None.
+    Times without am/pm are read as start=am / end=pm; if that fails both are
+    tried as 24-hour times.
+    """
+    start_clean = start.strip().lower().replace(" ", "")
+    end_clean = end.strip().lower().replace(" ", "")
+    if not ("am" in start_clean or "pm" in start_clean):
+        start_clean += "am"
+    if not ("am" in end_clean or "pm" in end_clean):
+        end_clean += "pm"
+
+    start_seconds = twelve_hour_seconds(start_clean)
+    end_seconds = twelve_hour_seconds(end_clean)
+    if start_seconds is None or end_seconds is None:
+        start_seconds = twenty_four_hour_seconds(start.strip())
+        end_seconds = twenty_four_hour_seconds(end.strip())
+        if start_seconds is None or end_seconds is None:
+            return None
+    return start_seconds, end_seconds
+
+
+def extract_hours(text):
+    """{day: {"start": "HH:MM:SS", "end": "HH:MM:SS"}} for every readable day range in a GPT response"""
+    hours = {}
+    for day, start, end in DAY_HOURS_RE.findall(text):
+        parsed = parse_day_range(start, end)
+        if parsed is None:
+            continue
+        hours[day.lower()] = {"start": format_clock_time(parsed[0]), "end": format_clock_time(parsed[1])}
+    return hours
+
+
+def normalize_time(t):
+    """Canonical 'HH:MM:SS' (midnight becomes 23:59:59), '' for non-times, unparseable times unchanged"""
+    if not t or not isinstance(t, str) or not CLOCK_TIME_PREFIX_RE.match(t):
+        return ""
+    if t == "00:00:00":
+        return "23:59:59"
+    seconds = clock_time_seconds(t)
+    return t if seconds is None else format_clock_time(seconds)
+
+
+def time_diff_min(t1, t2):
+    """Minutes between two 'HH:MM:SS' times going the short way round the clock (999 if unparseable)"""
+    if not isinstance(t1, str) or not isinstance(t2, str):
+        return 999
+    seconds1 = clock_time_seconds(t1)
+    seconds2 = clock_time_seconds(t2)
+    if seconds1 is None or seconds2 is None:
+        return 999
+    delta = float(abs(seconds1 - seconds2))
+    return min(delta, SECONDS_PER_DAY - delta) / 60
+
+
+def time_to_minutes(time_str):
+    """Convert HH:MM or H:MM to minutes since midnight"""
+    if not time_str or pd.isna(time_str):
+        return None
+    try:
+        time_str = str(time_str).strip()
+        if ':' in time_str:
+            parts = time_str.split(':')
+            hours = int(parts[0])
+            minutes = int(parts[1][:2])
+            return hours * 60 + minutes
+    except:
+        return None
+    return None
+
+
+# ============= DOORDASH STORE_HOURS AS ARRAYS =============
+# STORE_HOURS ("Monday: 08:00 - 22:00, Tuesday: ...") is parsed once into a
+# (7, 2) int16 array of minutes since midnight, rows Monday..Sunday and
+# columns start/end. Days that are missing or unreadable hold MISSING_MINUTES.
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEKDAY_INDEX = {day: index for index, day in enumerate(WEEKDAY_NAMES)}
+MISSING_MINUTES = np.iinfo(np.int16).min
+# Odd values ("-1:00", "999:00") are kept but clipped; they still never match a real time
+MAX_MINUTES = np.iinfo(np.int16).max
+
+
+def empty_week():
+    return np.full((7, 2), MISSING_MINUTES, dtype=np.int16)
+
+
+def minutes_or_missing(time_str):
+    """time_to_minutes as an int16-safe value, MISSING_MINUTES if unreadable"""
+    minutes = time_to_minutes(time_str)
+    if minutes is None:
+        return MISSING_MINUTES
+    return min(max(minutes, -MAX_MINUTES), MAX_MINUTES)
+
+
+@lru_cache(maxsize=65536)
+def parse_store_hours(store_hours, exact_day_names=False):
+    """
+    (7, 2) int16 minutes array for a DoorDash STORE_HOURS string (read-only, cached per string).
+    Day names match case-insensitively; with exact_day_names only lowercase ones count,
+    as in the identical-hours check, which has always compared them with extract_hours'
+    lowercase keys by exact name. A malformed "Day: start - end" entry makes the whole
+    string unusable, as it always has.
+    """
+    week = empty_week()
+    try:
+        for day_entry in store_hours.split(', '):
+            if ':' in day_entry:
+                day, hours = day_entry.split(': ', 1)
+                if ' - ' in hours:
+                    start, end = hours.split(' - ')
+                    index = WEEKDAY_INDEX.get(day if exact_day_names else day.lower())
+                    if index is not None:
+                        week[index] = (minutes_or_missing(start), minutes_or_missing(end))
+    except ValueError:
+        week = empty_week()
+    week.flags.writeable = False
+    return week
+
+
+def store_hours_matrix(values, exact_day_names=False):
+    """(N, 7, 2) int16 array for a column of STORE_HOURS values, parsing each distinct string once"""
+    weeks = [parse_store_hours(str(value), exact_day_names) for value in values]
+    if not weeks:
+        return np.empty((0, 7, 2), dtype=np.int16)
+    return np.stack(weeks)
+
+
+def posted_hours_array(posted_hours):
+    """(7, 2) int16 minutes array for extract_hours output"""
+    week = empty_week()
+    for day, times in posted_hours.items():
+        index = WEEKDAY_INDEX.get(day)
+        if index is not None:
+            week[index] = (minutes_or_missing(times.get('start', '')), minutes_or_missing(times.get('end', '')))
+    return week
+
@@ -0,0 +1,196 @@
+# ============= IMAGE PREFETCH, DOWNSCALE AND DEDUP =============
+# Fetches Dasher photos ourselves (one pooled, retrying session) instead of
+# letting OpenAI download the full-resolution originals. Each photo is:
+#   - hashed, so byte-identical photos behind different URLs share one
+#     response-cache entry (and one request when they are in flight together)
+#   - downscaled to a max dimension and re-encoded as JPEG when that saves bytes
+#   - sent as a base64 data URL with an explicit `detail` level
+#   - given a dHash, so near-identical photos of the same sign can be matched
+import base64
+import hashlib
+import io
+import math
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import requests
+from PIL import Image, ImageOps
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_MAX_DIMENSION = 1024
+DEFAULT_DETAIL = 'high'
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_FETCH_TIMEOUT = (5, 30)
+
+# gpt-4o image token accounting
+LOW_DETAIL_TOKENS = 85
+HIGH_DETAIL_TILE_TOKENS = 170
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+TILE_SIZE = 512
+
+# 8x8 difference hash: 64 bits, compared by Hamming distance
+DHASH_SIZE = 8
+
+
+def vision_tokens(width, height, detail=DEFAULT_DETAIL):
+    """Input tokens gpt-4o charges for a width x height image ('auto' is counted as 'high')"""
+    if detail == 'low':
+        return LOW_DETAIL_TOKENS
+    scale = min(1.0, HIGH_DETAIL_MAX_SIDE / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, HIGH_DETAIL_SHORT_SIDE / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+    return LOW_DETAIL_TOKENS + HIGH_DETAIL_TILE_TOKENS * tiles
+
+
+def dhash(image, hash_size=DHASH_SIZE):
+    """
+    Difference hash of a PIL image as an int: shrink to (hash_size + 1) x hash_size
+    grayscale and set one bit per pixel that is brighter than its right neighbour.
+    Survives re-encoding, resizing and small exposure changes.
+    """
+    width = hash_size + 1
+    pixels = list(image.convert('L').resize((width, hash_size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            value = value << 1 | (pixels[row * width + col] > pixels[row * width + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class PreparedImage(NamedTuple):
+    digest: str            # sha256 of the fetched bytes
+    data_url: str          # what goes into the image_url part
+    original_bytes: int
+    sent_bytes: int
+    width: int             # size of the image as sent
+    height: int
+    tokens: int            # vision_tokens for the size and detail sent
+    dhash: int             # perceptual hash of the upright photo
+
+
+def prepare_image(data, max_dimension=DEFAULT_MAX_DIMENSION, detail=DEFAULT_DETAIL, quality=DEFAULT_JPEG_QUALITY):
+    """
+    PreparedImage for raw photo bytes. Photos within max_dimension that are already
+    JPEG/PNG are sent as-is; anything bigger is EXIF-rotated, downscaled and re-encoded.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        upright = ImageOps.exif_transpose(image)
+        image_hash = dhash(upright)
+        if max(image.size) <= max_dimension and image_format in ('JPEG', 'PNG'):
+            payload, mime, size = data, f"image/{image_format.lower()}", image.size
+        else:
+            image = upright.convert('RGB')
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=quality, optimize=True)
+            payload, mime, size = buffer.getvalue(), "image/jpeg", image.size
+
+    return PreparedImage(
+        digest=digest,
+        data_url=f"data:{mime};base64,{base64.b64encode(payload).decode('ascii')}",
+        original_bytes=len(data),
+        sent_bytes=len(payload),
+        width=size[0],
+        height=size[1],
+        tokens=vision_tokens(size[0], size[1], detail),
+        dhash=image_hash
+    )
+
+
+class ImagePrefetcher:
+    """
+    Thread-safe fetch + prepare through one pooled session. Recently prepared
+    photos are kept (up to cache_size) by URL, so hashing a photo and then
+    sending it downloads it once, and by content, so byte-identical ones are
+    encoded once; only sizes are kept for the rest, for stats_line.
+    """
+
+    def __init__(self, max_dimension=DEFAULT_MAX_DIMENSION, detail=DEFAULT_DETAIL, quality=DEFAULT_JPEG_QUALITY,
+                 timeout=DEFAULT_FETCH_TIMEOUT, max_retries=3, pool_size=16, cache_size=64):
+        self.max_dimension = max_dimension
+        self.detail = detail
+        self.quality = quality
+        self.timeout = timeout
+        self.cache_size = cache_size
+
+        retry = Retry(total=max_retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET'], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update({'Connection': 'keep-alive'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()  # digest -> PreparedImage, least recently used first
+        self._by_url = OrderedDict()  # url -> PreparedImage, least recently used first
+        self._sizes = {}              # digest -> (original_bytes, sent_bytes)
+        self.fetched = 0
+        self.duplicates = 0
+        self.reused = 0
+
+    def cache_key(self, image):
+        """Response-cache key for a prepared image: its content plus how it was prepared"""
+        return f"sha256:{image.digest}:{self.max_dimension}:{self.detail}"
+
+    def url_cache_key(self, url):
+        """Response-cache key for a URL sent this way, checked before anything is downloaded"""
+        return f"{url}#max_dimension={self.max_dimension}&detail={self.detail}"
+
+    def prepare(self, url):
+        """PreparedImage for a photo URL (raises if it can't be fetched or decoded)"""
+        with self._lock:
+            image = self._by_url.get(url)
+            if image is not None:
+                self._by_url.move_to_end(url)
+                self.reused += 1
+                return image
+
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        digest = hashlib.sha256(response.content).hexdigest()
+
+        with self._lock:
+            self.fetched += 1
+            if digest in self._sizes:
+                self.duplicates += 1
+            image = self._recent.get(digest)
+            if image is not None:
+                self._recent.move_to_end(digest)
+                self._remember(self._by_url, url, image)
+                return image
+
+        image = prepare_image(response.content, self.max_dimension, self.detail, self.quality)
+        with self._lock:
+            self._remember(self._recent, digest, image)
+            self._remember(self._by_url, url, image)
+            self._sizes[digest] = (image.original_bytes, image.sent_bytes)
+        return image
+
+    def _remember(self, cache, key, image):
+        """Add to an LRU dict, dropping the oldest past cache_size (caller holds the lock)"""
+        cache[key] = image
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def stats_line(self):
+        with self._lock:
+            sizes = list(self._sizes.values())
+            fetched, duplicates, reused = self.fetched, self.duplicates, self.reused
+        original = sum(original for original, _ in sizes)
+        sent = sum(sent for _, sent in sizes)
+        return (f"{fetched} photos fetched, {len(sizes)} distinct ({duplicates} byte-identical repeats), "
+                f"{reused} reused without refetching, {original / 1e6:.1f} MB -> {sent / 1e6:.1f} MB sent")
@@ -0,0 +1,177 @@
+# ============= SHARED MODE API CLIENT =============
+# One pooled, retrying client for the Mode report API used by the store-hours,
+# holiday-hours and FD temp-deactivation scripts.
+import time
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MODE_API_BASE = 'https://app.mode.com/api'
+
+# Per-request (connect, read) timeout in seconds
+DEFAULT_REQUEST_TIMEOUT = (10, 120)
+
+# Report polling: start fast, back off exponentially, give up after max_wait
+DEFAULT_POLL_INITIAL = 1.0
+DEFAULT_POLL_MAX = 30.0
+DEFAULT_POLL_BACKOFF = 1.5
+DEFAULT_MAX_WAIT = 1800
+
+# Rows per DataFrame chunk when streaming content.csv
+DEFAULT_CSV_CHUNKSIZE = 5000
+
+
+def looks_like_timestamp_column(name):
+    """Heuristic used across the scripts to spot image/report timestamp columns"""
+    upper = name.upper()
+    return 'TIME' in upper or 'DATE' in upper or 'CREATED' in upper
+
+
+def parse_timestamp_columns(df):
+    """Convert timestamp-looking columns to datetimes in place, leaving any that don't parse as text"""
+    for col in df.columns:
+        if looks_like_timestamp_column(col) and pd.api.types.is_string_dtype(df[col]):
+            try:
+                df[col] = pd.to_datetime(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+class ModeClient:
+    """
+    Thin wrapper around the Mode report-run API with a keep-alive session.
+    GET requests are retried on connection errors and 429/5xx; starting a run
+    (POST) is only retried when the connection itself failed so a report is
+    never triggered twice.
+    """
+
+    def __init__(self, account, token, secret, timeout=DEFAULT_REQUEST_TIMEOUT, max_retries=3, pool_size=10):
+        self.account = account
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.auth = (token, secret)
+        self.session.headers.update({'Connection': 'keep-alive'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def report_url(self, report_id, *parts):
+        return '/'.join([f'{MODE_API_BASE}/{self.account}/reports/{report_id}', *parts])
+
+    def _get(self, url, **kwargs):
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def start_run(self, report_id):
+        """Trigger a report run and return the run token"""
+        response = self.session.post(self.report_url(report_id, 'runs'), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['token']
+
+    def wait_for_run(self, report_id, run_token, max_wait=DEFAULT_MAX_WAIT,
+                     initial_interval=DEFAULT_POLL_INITIAL, max_interval=DEFAULT_POLL_MAX,
+                     backoff=DEFAULT_POLL_BACKOFF):
+        """
+        Poll the run state with exponential backoff until it succeeds.
+        Raises if the run fails/cancels, or TimeoutError once max_wait seconds have passed.
+        """
+        url = self.report_url(report_id, 'runs', run_token)
+        deadline = time.monotonic() + max_wait
+        interval = initial_interval
+
+        while True:
+            state = self._get(url).json()['state']
+            if state == 'succeeded':
+                return state
+            elif state in ['failed', 'cancelled']:
+                raise Exception(f"Mode query {state}")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Mode run {run_token} still {state} after {max_wait}s")
+
+            print(f"   Waiting... ({state})")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * backoff, max_interval)
+
+    def get_query_run_token(self, report_id, run_token, query_id=None):
+        """Find the query run for query_id (or the first query run if query_id is None)"""
+        response = self._get(self.report_url(report_id, 'runs', run_token, 'query_runs'))
+        query_runs = response.json()['_embedded']['query_runs']
+
+        if not query_runs:
+            raise Exception("No query runs found in report")
+        if query_id is None:
+            return query_runs[0]['token']
+
+        for qr in query_runs:
+            if qr['query_token'] == query_id:
+                return qr['token']
+        raise Exception("Could not find query run token")
+
+    def results_url(self, report_id, run_token, query_run_token):
+        return self.report_url(report_id, 'runs', run_token, 'query_runs', query_run_token, 'results', 'content.csv')
+
+    def get_results_csv(self, report_id, run_token, query_run_token):
+        """Download a query run's results as CSV text"""
+        return self._get(self.results_url(report_id, run_token, query_run_token)).text
+
+    def iter_results_chunks(self, report_id, run_token, query_run_token, dtype=None, chunksize=DEFAULT_CSV_CHUNKSIZE,
+                            parse_dates=False):
+        """
+        Stream content.csv and yield it as DataFrame chunks while it downloads.
+        The raw body is never held in memory as one string, and callers can start
+        working on the first rows before the rest of the file has arrived.
+        
+        Args:
+            dtype: Explicit column dtypes (columns missing from the file are ignored).
+            chunksize: Rows per yielded DataFrame.
+            parse_dates: Convert timestamp-looking columns to datetimes (parse_timestamp_columns).
+                Off by default, so results passed on as CSV keep Mode's text as-is.
+        """
+        url = self.results_url(report_id, run_token, query_run_token)
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            for chunk in pd.read_csv(response.raw, dtype=dtype, chunksize=chunksize):
+                yield parse_timestamp_columns(chunk) if parse_dates else chunk
+
+    def run_report(self, report_id, query_id=None, max_wait=DEFAULT_MAX_WAIT):
+        """Start a run, wait for it, and return (run_token, query_run_token)"""
+        run_token = self.start_run(report_id)
+        print(f"✅ Run started: {run_token}")
+        self.wait_for_run(report_id, run_token, max_wait=max_wait)
+        print("✅ Query completed!")
+        return run_token, self.get_query_run_token(report_id, run_token, query_id)
+
+    def iter_report_chunks(self, report_id, query_id=None, max_wait=DEFAULT_MAX_WAIT,
+                           dtype=None, chunksize=DEFAULT_CSV_CHUNKSIZE, parse_dates=False):
+        """Run a report end to end and yield its query results as streamed DataFrame chunks"""
+        run_token, query_run_token = self.run_report(report_id, query_id, max_wait=max_wait)
+        yield from self.iter_results_chunks(report_id, run_token, query_run_token, dtype=dtype, chunksize=chunksize,
+                                            parse_dates=parse_dates)
+
+    def fetch_report_dataframe(self, report_id, query_id=None, max_wait=DEFAULT_MAX_WAIT,
+                               dtype=None, chunksize=DEFAULT_CSV_CHUNKSIZE, parse_dates=False):
+        """Run a report end to end and return the query results as a single DataFrame"""
+        chunks = list(self.iter_report_chunks(report_id, query_id, max_wait=max_wait, dtype=dtype, chunksize=chunksize,
+                                              parse_dates=parse_dates))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
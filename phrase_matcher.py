@@ -0,0 +1,119 @@
+# ============= PRECOMPILED PHRASE MATCHER =============
+# Scans a GPT response once for every phrase in a set of named phrase lists and
+# returns all hits with their positions, so the closure/payment/address
+# predicates can be answered from one hit set instead of re-lowercasing and
+# str.find-looping over the same text for each list.
+import bisect
+import re
+from functools import lru_cache
+
+
+def _trie_pattern(node):
+    """Regex for a character trie; greedy optional tails make the longest phrase win"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        return '(?:' + body + ')?'
+    return body
+
+
+class PhraseHits:
+    """All phrase occurrences found in one (lowercased) text"""
+
+    __slots__ = ('occurrences', 'groups', '_negative_starts', '_negative_ends', '_negative_window')
+
+    def __init__(self, occurrences, groups, negative_spans, negative_window):
+        self.occurrences = occurrences
+        self.groups = groups
+        self._negative_starts = [start for start, _ in negative_spans]
+        self._negative_ends = [end for _, end in negative_spans]
+        self._negative_window = negative_window
+
+    def positions(self, phrase):
+        """Start positions of every occurrence of phrase, in order"""
+        return self.occurrences.get(phrase, [])
+
+    def first(self, phrase):
+        """Position of the first occurrence of phrase, or -1"""
+        positions = self.occurrences.get(phrase)
+        return positions[0] if positions else -1
+
+    def contains(self, phrase):
+        return phrase in self.occurrences
+
+    def has_group(self, group):
+        """True if any phrase from the group occurs"""
+        return group in self.groups
+
+    def group_hits(self, group):
+        """(position, phrase) for every occurrence of a group's phrases, in list order then position"""
+        return self.groups.get(group, [])
+
+    def is_negated(self, position):
+        """True if a negative indicator ends inside the window just before position"""
+        lo = bisect.bisect_left(self._negative_starts, max(0, position - self._negative_window))
+        hi = bisect.bisect_left(self._negative_starts, position)
+        return any(self._negative_ends[i] <= position for i in range(lo, hi))
+
+
+class PhraseMatcher:
+    """
+    Compiles named phrase lists into a single regex at construction time.
+    One scan of a text reports every occurrence of every phrase, including
+    overlapping ones, which keeps substring semantics identical to `phrase in text`.
+    """
+
+    def __init__(self, groups, negative_group=None, negative_window=50, cache_size=256):
+        self.groups = {name: [phrase.lower() for phrase in phrases] for name, phrases in groups.items()}
+        self.negative_group = negative_group
+        self.negative_window = negative_window
+
+        phrases = sorted({phrase for group in self.groups.values() for phrase in group})
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self._regex = re.compile(_trie_pattern(trie))
+
+        # Every phrase that matches at a position is a prefix of the longest one matching there
+        phrase_set = set(phrases)
+        self._prefixes = {
+            phrase: [phrase[:i] for i in range(1, len(phrase) + 1) if phrase[:i] in phrase_set]
+            for phrase in phrases
+        }
+        self._negative_phrases = set(self.groups.get(negative_group, []))
+
+        # phrase -> [(group, index of phrase within the group's list)]
+        self._memberships = {}
+        for name, group_phrases in self.groups.items():
+            for index, phrase in enumerate(group_phrases):
+                self._memberships.setdefault(phrase, []).append((name, index))
+
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text):
+        lower = text.lower()
+        occurrences = {}
+        groups = {}
+        negative_spans = []
+        search = self._regex.search
+        match = search(lower)
+        while match:
+            position = match.start()
+            for phrase in self._prefixes[match.group()]:
+                occurrences.setdefault(phrase, []).append(position)
+                for name, index in self._memberships[phrase]:
+                    groups.setdefault(name, []).append((index, position, phrase))
+                if phrase in self._negative_phrases:
+                    negative_spans.append((position, position + len(phrase)))
+            # Resume one character later so overlapping phrases are still found
+            match = search(lower, position + 1)
+
+        for name, entries in groups.items():
+            entries.sort()
+            groups[name] = [(position, phrase) for _, position, phrase in entries]
+        return PhraseHits(occurrences, groups, negative_spans, self.negative_window)
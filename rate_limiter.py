@@ -0,0 +1,269 @@
+# ============= ADAPTIVE OPENAI RATE LIMITER =============
+# Token-bucket limiter shared by the store-hours and holiday-hours OpenAI loops.
+# Budgets start from OPENAI_RPM / OPENAI_TPM and are tightened from the
+# x-ratelimit-* headers OpenAI returns on every response.
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+
+# Rough per-image input token cost used when budgeting a vision request
+IMAGE_TOKEN_ESTIMATE = 765
+LOW_DETAIL_IMAGE_TOKENS = 85
+
+# Stay slightly under the limits the API reports
+HEADER_SAFETY_FACTOR = 0.9
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def parse_reset_duration(value):
+    """Convert an OpenAI reset header ('1s', '6m0s', '20ms', '1h2m3.5s') to seconds"""
+    if not value:
+        return None
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value)):
+        total += float(amount) * units[unit]
+        matched = True
+    if matched:
+        return total
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def estimate_request_tokens(messages, max_tokens=0):
+    """Estimate the tokens a chat request counts against the TPM budget"""
+    tokens = max_tokens or 0
+    for message in messages:
+        content = message.get("content", "")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content}]
+        for part in parts:
+            if part.get("type") == "text":
+                tokens += len(part.get("text", "")) // 4
+            elif part.get("type") == "image_url":
+                # detail=low images are a flat 85 tokens
+                tokens += LOW_DETAIL_IMAGE_TOKENS if part["image_url"].get("detail") == "low" else IMAGE_TOKEN_ESTIMATE
+    return max(tokens, 1)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket driven by requests-per-minute and tokens-per-minute budgets.
+
+    Callers block in acquire() until both buckets have capacity. Responses feed
+    their rate-limit headers back through update_from_headers(), and call() wraps
+    a request with exponential backoff plus jitter on 429/5xx errors.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, burst_seconds=10,
+                 max_retries=6, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.burst_seconds = burst_seconds
+
+        self._cond = threading.Condition()
+        self._set_request_rate(requests_per_minute)
+        self._set_token_rate(tokens_per_minute)
+        self._request_level = self._request_capacity
+        self._token_level = self._token_capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+        self.retries = 0
+        self.throttled = 0
+
+    def _set_request_rate(self, requests_per_minute):
+        self._request_rate = max(requests_per_minute, 1) / 60.0
+        self._request_capacity = max(1.0, self._request_rate * self.burst_seconds)
+
+    def _set_token_rate(self, tokens_per_minute):
+        self._token_rate = max(tokens_per_minute, 1) / 60.0
+        self._token_capacity = max(1.0, self._token_rate * self.burst_seconds)
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_level = min(self._request_capacity, self._request_level + elapsed * self._request_rate)
+        self._token_level = min(self._token_capacity, self._token_level + elapsed * self._token_rate)
+
+    def acquire(self, tokens=1):
+        """Block until one request and `tokens` tokens are available, then consume them"""
+        # A single oversized request must not wait forever for a bucket it can never fill
+        tokens = min(tokens, self._token_capacity)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._request_level < 1:
+                    wait = (1 - self._request_level) / self._request_rate
+                elif self._token_level < tokens:
+                    wait = (tokens - self._token_level) / self._token_rate
+                else:
+                    self._request_level -= 1
+                    self._token_level -= tokens
+                    return
+                self._cond.wait(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds` (used after a 429)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers):
+        """Adjust the buckets from OpenAI's x-ratelimit-* response headers"""
+        if not headers:
+            return
+
+        def header_number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        limit_requests = header_number("x-ratelimit-limit-requests")
+        limit_tokens = header_number("x-ratelimit-limit-tokens")
+        remaining_requests = header_number("x-ratelimit-remaining-requests")
+        remaining_tokens = header_number("x-ratelimit-remaining-tokens")
+        reset_requests = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+        reset_tokens = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if limit_requests:
+                self._set_request_rate(limit_requests * HEADER_SAFETY_FACTOR)
+            if limit_tokens:
+                self._set_token_rate(limit_tokens * HEADER_SAFETY_FACTOR)
+            if remaining_requests is not None:
+                self._request_level = min(self._request_level, remaining_requests)
+                if remaining_requests < 1 and reset_requests:
+                    self._paused_until = max(self._paused_until, now + reset_requests)
+            if remaining_tokens is not None:
+                self._token_level = min(self._token_level, remaining_tokens)
+                if remaining_tokens < 1 and reset_tokens:
+                    self._paused_until = max(self._paused_until, now + reset_tokens)
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with full jitter, never shorter than a server Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn, tokens=1):
+        """
+        Run fn() under the limiter, retrying 429/5xx/connection errors with backoff.
+        If the return value exposes .headers they are fed back into the buckets.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                status, headers = _error_status(e)
+                if status is None or attempt >= self.max_retries:
+                    raise
+
+                self.update_from_headers(headers)
+                retry_after = parse_reset_duration(headers.get("retry-after")) if headers else None
+                delay = self.backoff_delay(attempt, retry_after)
+                if status == 429:
+                    self.throttled += 1
+                    self.pause(delay)
+                self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self.update_from_headers(getattr(result, "headers", None))
+            return result
+
+
+def _error_status(error):
+    """Return (status, headers) for a retryable error, or (None, None) if it should not be retried"""
+    if isinstance(error, openai.APIConnectionError):
+        return 0, None
+    status = getattr(error, "status_code", None)
+    if status in RETRYABLE_STATUS_CODES or (status is not None and status >= 500):
+        response = getattr(error, "response", None)
+        return status, getattr(response, "headers", None)
+    return None, None
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter():
+    """Process-wide limiter configured from OPENAI_RPM / OPENAI_TPM"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                requests_per_minute=int(os.environ.get('OPENAI_RPM', '500')),
+                tokens_per_minute=int(os.environ.get('OPENAI_TPM', '300000'))
+            )
+        return _shared_limiter
+
+
+def create_chat_completion(limiter=None, **kwargs):
+    """
+    Drop-in replacement for openai.chat.completions.create that goes through the limiter.
+    Uses the raw-response API so the rate-limit headers can be read.
+    """
+    limiter = limiter or get_shared_limiter()
+    tokens = estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0))
+    raw = limiter.call(lambda: openai.chat.completions.with_raw_response.create(**kwargs), tokens)
+    return raw.parse()
+
+
+def completion_text(response):
+    """
+    The first choice's text. Under a strict json_schema a refusal has content=None and
+    the text in message.refusal; that is returned instead, so callers fall back to
+    reading it as free text rather than failing the row.
+    """
+    message = response.choices[0].message
+    return (message.content if message.content is not None else message.refusal or "").strip()
+
+
+def stream_chat_completion(stop_at=None, limiter=None, **kwargs):
+    """
+    create_chat_completion with stream=True, returning (text, finish_reason) once the
+    answer is complete, or as soon as stop_at(text so far) returns an index - the text
+    is cut there and the stream closed, so the model stops generating (and billing) the rest.
+    finish_reason is the API's ("stop", "length", ...) or None when stop_at ended it.
+    Only opening the stream is retried; an error mid-stream is raised.
+    """
+    limiter = limiter or get_shared_limiter()
+    tokens = estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0))
+    raw = limiter.call(lambda: openai.chat.completions.with_raw_response.create(stream=True, **kwargs), tokens)
+    text = ""
+    finish_reason = None
+    with raw.parse() as stream:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta and choice.delta.content:
+                text += choice.delta.content
+                end = stop_at(text) if stop_at is not None else None
+                if end is not None:
+                    text = text[:end]
+                    break
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    return text.strip(), finish_reason
@@ -0,0 +1,151 @@
+# ============= PERSISTENT VISION RESPONSE CACHE =============
+# SQLite-backed cache of raw model responses keyed on
+# (image URL, model name, hash of the rendered prompt), so an image that comes
+# back from Mode on a later run skips the API and goes straight to parsing.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'vision_responses.sqlite3')
+DEFAULT_TTL_HOURS = 7 * 24
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def prompt_hash(prompt):
+    """Stable hash of a rendered prompt"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def cache_key(image_url, model, prompt):
+    """Cache key for one vision request"""
+    raw = f"{image_url}\n{model}\n{prompt_hash(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of completion text with TTL and size-based (least recently used) eviction.
+    Safe to share between the vision worker threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_hours=DEFAULT_TTL_HOURS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Event set once the first caller has stored (or failed to get) the response
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                image_url TEXT,
+                model TEXT,
+                prompt_hash TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, image_url, model, prompt, count_miss=True):
+        """
+        Return the cached response text, or None on a miss. Pass count_miss=False for a
+        probe whose miss is counted by the lookup that follows it.
+        """
+        key = cache_key(image_url, model, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += count_miss
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, image_url, model, prompt, response):
+        """Store a response and evict the least recently used entries beyond max_entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(image_url, model, prompt), image_url, model, prompt_hash(prompt), response, now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def get_or_fetch(self, image_url, model, prompt, fetch):
+        """
+        Cached response, or fetch() it and cache it. Concurrent callers asking for the
+        same request wait for the first one instead of sending a duplicate. Each call
+        counts once: a hit if it didn't have to fetch, a miss if it did.
+        """
+        cached = self.get(image_url, model, prompt, count_miss=False)
+        if cached is not None:
+            return cached
+
+        key = cache_key(image_url, model, prompt)
+        with self._lock:
+            done = self._in_flight.get(key)
+            first = done is None
+            if first:
+                done = self._in_flight[key] = threading.Event()
+
+        if not first:
+            done.wait()
+            cached = self.get(image_url, model, prompt, count_miss=False)
+            if cached is not None:
+                return cached
+            # The first caller failed; try on our own
+            self._count_miss()
+            response = fetch()
+            self.put(image_url, model, prompt, response)
+            return response
+
+        self._count_miss()
+        try:
+            response = fetch()
+            self.put(image_url, model, prompt, response)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            done.set()
+
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def purge_expired(self):
+        """Drop entries older than the TTL"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def stats_line(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        return f"{self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,88 @@
+# ============= GPT RESPONSE PATTERNS =============
+# Every regex the scripts run over GPT responses, compiled once at import, so
+# the hot classifier functions skip re's pattern-cache lookup (and the holiday
+# analyzer stops rebuilding its per-holiday pattern on every call).
+#
+# Pattern lists are checked with any(pattern.search(...)) in order; joining them
+# into one alternation was measured slower for most lists since it loses the
+# early exit on the first (most common) pattern.
+import re
+from functools import lru_cache
+
+
+# ---- Posted hours ----
+DAY_HOURS_RE = re.compile(
+    r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(\d{1,2}:\d{2}(?:\s*[ap]m)?)\s*[-–]\s*(\d{1,2}:\d{2}(?:\s*[ap]m)?)",
+    re.IGNORECASE
+)
+CANONICAL_TIME_RE = re.compile(r"^\d{2}:\d{2}:\d{2}$")  # normalized 'HH:MM:SS'
+
+# ---- Clear-hours evidence (matched against lowercased text) ----
+# detect_glass_reflection_cases: hours readable despite glass/glare
+GLASS_HOUR_RES = [re.compile(pattern) for pattern in [
+    r'\d{1,2}\s*am\s*[-–]\s*\d{1,2}\s*pm',  # 6am - 10pm, 8 am - 9 pm
+    r'\d{1,2}am[-–]\d{1,2}pm',  # 6am-10pm, 8am-9pm
+    r'open\s+every\s+day',  # "open every day"
+    r'everyday',  # "everyday"
+    r'\d{1,2}:\d{2}\s*[-–]\s*\d{1,2}:\d{2}',  # 06:00 - 22:00
+    r'mon[.\s-]*sat[.\s:]*\d{1,2}',  # Mon.-Sat.: 8
+    r'sun[.\s:]*\d{1,2}',  # Sun.: 8
+    r'hours:\s*\d{1,2}',  # hours: 8
+    r'hours\s*mon',  # hours monday
+]]
+
+# detect_sign_size_issues: hours clearly stated, so no strict location needed
+STATED_HOUR_RES = [re.compile(pattern) for pattern in [
+    r'\d{1,2}:\d{2}\s*[ap]m\s*-\s*\d{1,2}:\d{2}\s*[ap]m',  # 8:00am - 9:00pm
+    r'\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}',  # 08:00 - 21:00
+    r'\d{1,2}\s*am\s*[-–]\s*\d{1,2}\s*pm',  # 8am - 10pm
+    r'open\s+\d{1,2}',  # open 8
+    r'everyday', r'every day'  # everyday/every day
+]]
+
+# validate_gpt_extraction: any specific time at all
+SPECIFIC_TIME_RES = [re.compile(pattern) for pattern in [
+    r'\d{1,2}:\d{2}',  # Any time format
+    r'\d{1,2}\s*am',  # 8am, 8 am
+    r'\d{1,2}\s*pm',  # 9pm, 9 pm
+]]
+
+# ---- Recommendation, clarity, address, special hours ----
+# Tried in order against lowercased text; the first match naming an action wins
+RECOMMENDATION_RES = [re.compile(pattern) for pattern in [
+    r"recommendation:\s*\*\*([^*]+)\*\*",
+    r"recommendation:\s*([^\n]+)",
+    r"recommend:\s*\*\*([^*]+)\*\*",
+    r"recommend:\s*([^\n]+)",
+    r"\*\*([^*]+)\*\*"  # Sometimes just in bold
+]]
+
+CLARITY_SCORE_RE = re.compile(r"clarity\s*score\s*[:\-]\s*(1(?:\.0+)?|0\.\d+|\.\d+)", re.IGNORECASE)
+
+
+def clarity_score_end(text):
+    """Where the clarity score of a (partial, streamed) response ends, or None until all of it has arrived"""
+    m = CLARITY_SCORE_RE.search(text)
+    if m is None:
+        return None
+    # "Clarity score: 0.8" may still be "0.85" once the next chunk arrives; the prompts ask
+    # for two decimals, and anything after the number means it can't grow any more
+    _, _, decimals = m.group(1).partition(".")
+    return m.end() if len(decimals) >= 2 or m.end() < len(text) else None
+
+
+ADDRESS_RE = re.compile(
+    r"(?:new address:|new location:|moved to:|find us at:)?\s*(\d+\s+[A-Za-z0-9\s,\.]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct)[A-Za-z0-9\s,\.]*)",
+    re.IGNORECASE
+)
+
+SPECIAL_HOLIDAY_SECTION_RE = re.compile(r'SPECIAL\s+HOLIDAY\s+HOURS\s*:\s*(.*?)(?:\n\n|\Z)', re.IGNORECASE | re.DOTALL)
+
+# ---- Holiday hours (holiday_hours_analyzer.py) ----
+HOLIDAY_TIME_RANGE_RE = re.compile(r'(\d{1,2}:?\d{0,2}\s*[ap]?m?)\s*[-–to]\s*(\d{1,2}:?\d{0,2}\s*[ap]?m?)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def holiday_line_pattern(holiday):
+    """'<holiday>: <rest of line>' for one holiday name, e.g. "Christmas Eve: 8AM-6PM" (name matched literally)"""
+    return re.compile(re.escape(holiday) + r"[:\s]*([^\n]+)", re.IGNORECASE)
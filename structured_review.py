@@ -0,0 +1,125 @@
+# ============= STRUCTURED (JSON SCHEMA) STORE REVIEWS =============
+# Response contract for VISION_RESPONSE_FORMAT=json: the vision model fills in
+# a strict JSON schema instead of writing prose, so one json.loads replaces the
+# regex scraping. Anything that isn't a valid review (a refusal, a text-mode
+# response) makes parse_store_review return None and the caller falls back to
+# the regex chain.
+import json
+from typing import NamedTuple
+
+from hours_parser import WEEKDAY_NAMES, format_clock_time, parse_day_range
+
+RECOMMENDATIONS = [
+    "Address Change", "Temporarily Close For Day", "Permanently Close Store", "Change Store Hours", "No Change"
+]
+SIGN_TYPES = ["digital display", "large sign", "sign on glass", "paper sign", "window decal", "other", "none"]
+
+_TIME = {"type": "string", "description": "24-hour HH:MM"}
+_DAY_HOURS = {
+    "anyOf": [
+        {"type": "object", "properties": {"start": _TIME, "end": _TIME},
+         "required": ["start", "end"], "additionalProperties": False},
+        {"type": "null"}
+    ]
+}
+
+STORE_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendation": {"type": "string", "enum": RECOMMENDATIONS},
+        "hours": {
+            "type": "object",
+            "description": "Posted hours per day, null for days the sign doesn't show",
+            "properties": {day: _DAY_HOURS for day in WEEKDAY_NAMES},
+            "required": WEEKDAY_NAMES,
+            "additionalProperties": False
+        },
+        "clarity": {"type": "number", "description": "0.00-1.00, how reliably the sign can be read"},
+        "sign_type": {"type": "string", "enum": SIGN_TYPES},
+        "evidence": {"type": "string", "description": "Exact text of the sign the recommendation is based on"},
+        "new_address": {"type": ["string", "null"], "description": "Only for Address Change"},
+        "special_hours": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "holiday": {"type": "string"},
+                    "is_open": {"type": "boolean"},
+                    "start": {"type": ["string", "null"], "description": "24-hour HH:MM"},
+                    "end": {"type": ["string", "null"], "description": "24-hour HH:MM"}
+                },
+                "required": ["holiday", "is_open", "start", "end"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["recommendation", "hours", "clarity", "sign_type", "evidence", "new_address", "special_hours"],
+    "additionalProperties": False
+}
+
+# Passed as response_format to chat.completions.create
+STORE_REVIEW_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "store_hours_review", "strict": True, "schema": STORE_REVIEW_SCHEMA}
+}
+
+
+class StoreReview(NamedTuple):
+    recommendation: str
+    hours: dict            # {day: {"start": "HH:MM:SS", "end": "HH:MM:SS"}}, as extract_hours returns
+    clarity: float
+    sign_type: str
+    evidence: str
+    new_address: str
+    special_hours: list    # [{'holiday', 'is_open', 'start_time', 'end_time'}], as extract_special_hours returns
+
+    def reason(self):
+        """Human-readable REASON text for the review"""
+        return f"{self.recommendation} ({self.sign_type}): {self.evidence}"
+
+
+def _clock_times(start, end):
+    parsed = parse_day_range(start, end) if isinstance(start, str) and isinstance(end, str) else None
+    if parsed is None:
+        return None
+    return format_clock_time(parsed[0]), format_clock_time(parsed[1])
+
+
+def parse_store_review(text):
+    """StoreReview for a structured response, or None if text isn't one"""
+    if not text or not text.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+        recommendation = data["recommendation"]
+        if recommendation not in RECOMMENDATIONS:
+            return None
+
+        hours = {}
+        for day in WEEKDAY_NAMES:
+            day_hours = data["hours"].get(day)
+            times = _clock_times(day_hours.get("start"), day_hours.get("end")) if day_hours else None
+            if times:
+                hours[day] = {"start": times[0], "end": times[1]}
+
+        special_hours = []
+        for entry in data.get("special_hours") or []:
+            times = _clock_times(entry.get("start"), entry.get("end")) if entry["is_open"] else None
+            special_hours.append({
+                'holiday': str(entry["holiday"]).strip().lower(),
+                'is_open': 'yes' if entry["is_open"] else 'no',
+                'start_time': times[0] if times else '',
+                'end_time': times[1] if times else ''
+            })
+
+        return StoreReview(
+            recommendation=recommendation,
+            hours=hours,
+            clarity=round(min(max(float(data["clarity"]), 0.0), 1.0), 2),
+            sign_type=data.get("sign_type") or "other",
+            evidence=str(data.get("evidence") or ""),
+            new_address=str(data.get("new_address") or "").strip(),
+            special_hours=special_hours
+        )
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
@@ -0,0 +1,324 @@
+# ============= LOCAL STUB OPENAI SERVER =============
+# Minimal stand-in for the OpenAI chat completions endpoint so the vision
+# pipeline can be exercised locally without spending API credits. Also fakes
+# the Batch API (/v1/files, /v1/batches): a submitted batch answers every line
+# with the same canned responses on a background thread, or with an error line
+# for the images StubState.batch_line_error picks.
+#
+# Answers are "generated" one word-sized token at a time: --token-delay sleeps
+# per output token (after the --delay time to first token), max_tokens cuts
+# them off with finish_reason "length", and "stream": true requests get them
+# as server-sent event chunks, so a client that hangs up early saves the rest.
+#
+# Usage:
+#   python stub_openai_server.py --port 8089 --delay 0.5 --token-delay 0.02
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python fixed_drsc_code_v2.py
+import argparse
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = """The sign on the glass door clearly shows the store hours.
+Image: {image_url}
+Recommendation: **No Change**
+Clarity score: 0.50"""
+
+# Returned instead of the text template when a request asks for a json_schema response_format
+DEFAULT_STRUCTURED_RESPONSE = {
+    "recommendation": "No Change",
+    "hours": {day: None for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]},
+    "clarity": 0.50,
+    "sign_type": "sign on glass",
+    "evidence": "Image: {image_url}",
+    "new_address": None,
+    "special_hours": []
+}
+
+# What the stub counts as one output token
+TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+
+class StubState:
+    """Shared counters so callers can inspect what the stub received."""
+
+    def __init__(self, delay=0.0, response_template=DEFAULT_RESPONSE, screening_answer=None, token_delay=0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.response_template = response_template
+        # image_url -> "YES"/"NO" for two-tier screening prompts (default: always YES)
+        self.screening_answer = screening_answer or (lambda image_url: "YES")
+        # image_url -> error message for batch lines that should fail (default: none do)
+        self.batch_line_error = lambda image_url: None
+        self.lock = threading.Lock()
+        self.requests_received = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.tokens_generated = 0
+        self.streams_closed_early = 0
+        self.files = {}    # file id -> (filename, purpose, bytes)
+        self.batches = {}  # batch id -> batch object
+
+
+def _is_screening_request(messages):
+    """Whether a payload is the two-tier YES/NO screening prompt rather than a full analysis"""
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        if any(part.get("type") == "text" and "YES or NO" in part.get("text", "") for part in parts):
+            return True
+    return False
+
+
+def _image_url_from_messages(messages):
+    """Return the first image URL found in a chat completions payload."""
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                return part.get("image_url", {}).get("url", "")
+    return ""
+
+
+def _completion(state, payload, completion_id):
+    """chat.completion object the stub answers a request body with"""
+    image_url = _image_url_from_messages(payload.get("messages", []))
+    if _is_screening_request(payload.get("messages", [])):
+        content = state.screening_answer(image_url)
+    elif (payload.get("response_format") or {}).get("type") == "json_schema":
+        structured = dict(DEFAULT_STRUCTURED_RESPONSE)
+        structured["evidence"] = structured["evidence"].format(image_url=image_url)
+        content = json.dumps(structured)
+    else:
+        content = state.response_template.format(image_url=image_url)
+    tokens = TOKEN_RE.findall(content)
+    max_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens")
+    finish_reason = "stop"
+    if max_tokens and len(tokens) > max_tokens:
+        tokens, finish_reason = tokens[:max_tokens], "length"
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(tokens)},
+            "finish_reason": finish_reason
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+    }
+
+
+def _chunk(completion, delta, finish_reason=None):
+    """One chat.completion.chunk server-sent event for a streamed completion"""
+    chunk = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+             "model": completion["model"], "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+
+def _store_file(state, filename, purpose, data):
+    with state.lock:
+        file_id = f"file-stub-{len(state.files) + 1}"
+        state.files[file_id] = (filename, purpose, data)
+    return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed"}
+
+
+def _run_batch(state, batch_id):
+    """Answer every line of a batch's input file, then mark it completed"""
+    batch = state.batches[batch_id]
+    _, _, data = state.files[batch["input_file_id"]]
+    lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+    batch.update(status="in_progress", in_progress_at=int(time.time()),
+                 request_counts={"total": len(lines), "completed": 0, "failed": 0})
+
+    output, errors = [], []
+    for number, line in enumerate(lines):
+        if state.delay:
+            time.sleep(state.delay)
+        with state.lock:
+            state.requests_received += 1
+        if line.get("url") != batch["endpoint"]:
+            errors.append({"id": f"batch_req_{number}", "custom_id": line.get("custom_id"), "response": None,
+                           "error": {"code": "invalid_url", "message": f"Unsupported url {line.get('url')}"}})
+            batch["request_counts"]["failed"] += 1
+            continue
+        error = state.batch_line_error(_image_url_from_messages(line.get("body", {}).get("messages", [])))
+        if error:
+            errors.append({"id": f"batch_req_{number}", "custom_id": line.get("custom_id"), "response": None,
+                           "error": {"code": "server_error", "message": error}})
+            batch["request_counts"]["failed"] += 1
+            continue
+        body = _completion(state, line.get("body", {}), f"chatcmpl-stub-batch-{number}")
+        with state.lock:
+            state.tokens_generated += body["usage"]["completion_tokens"]
+        output.append({"id": f"batch_req_{number}", "custom_id": line["custom_id"], "error": None,
+                       "response": {"status_code": 200, "request_id": f"req-{number}", "body": body}})
+        batch["request_counts"]["completed"] += 1
+
+    def as_jsonl(records):
+        return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+    if output:
+        batch["output_file_id"] = _store_file(state, f"{batch_id}_output.jsonl", "batch_output", as_jsonl(output))["id"]
+    if errors:
+        batch["error_file_id"] = _store_file(state, f"{batch_id}_errors.jsonl", "batch_output", as_jsonl(errors))["id"]
+    batch.update(status="completed", completed_at=int(time.time()))
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _read_json(self):
+            return json.loads(self._read_body() or b"{}")
+
+        def _stream_completion(self, completion):
+            # No Content-Length: the body ends when the connection closes
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            choice = completion["choices"][0]
+            try:
+                self.wfile.write(_chunk(completion, {"role": "assistant", "content": ""}))
+                for token in TOKEN_RE.findall(choice["message"]["content"]):
+                    time.sleep(state.token_delay)
+                    self.wfile.write(_chunk(completion, {"content": token}))
+                    self.wfile.flush()
+                    with state.lock:
+                        state.tokens_generated += 1
+                self.wfile.write(_chunk(completion, {}, choice["finish_reason"]))
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client hung up mid-answer; nothing more gets generated
+                with state.lock:
+                    state.streams_closed_early += 1
+
+        def _not_found(self):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def _upload_file(self):
+            # multipart/form-data with a `file` part and a `purpose` field
+            message = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + self._read_body()
+            )
+            fields = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+            upload = fields["file"]
+            purpose = fields["purpose"].get_payload(decode=True).decode("utf-8")
+            self._send_json(200, _store_file(state, upload.get_filename(), purpose, upload.get_payload(decode=True)))
+
+        def _create_batch(self):
+            payload = self._read_json()
+            if payload.get("input_file_id") not in state.files:
+                self._send_json(404, {"error": {"message": f"No such file: {payload.get('input_file_id')}"}})
+                return
+            with state.lock:
+                batch_id = f"batch_stub_{len(state.batches) + 1}"
+                state.batches[batch_id] = batch = {
+                    "id": batch_id, "object": "batch", "endpoint": payload.get("endpoint"),
+                    "input_file_id": payload["input_file_id"], "completion_window": payload.get("completion_window"),
+                    "status": "validating", "created_at": int(time.time()), "output_file_id": None,
+                    "error_file_id": None, "errors": None, "metadata": payload.get("metadata"),
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0}
+                }
+            threading.Thread(target=_run_batch, args=(state, batch_id), daemon=True).start()
+            self._send_json(200, batch)
+
+        def do_GET(self):
+            parts = self.path.rstrip("/").split("/")
+            if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in state.batches:
+                self._send_json(200, state.batches[parts[-1]])
+            elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in state.files:
+                data = state.files[parts[-2]][2]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._not_found()
+
+        def do_POST(self):
+            path = self.path.rstrip("/")
+            if path.endswith("/files"):
+                self._upload_file()
+                return
+            if path.endswith("/batches"):
+                self._create_batch()
+                return
+            if not path.endswith("/chat/completions"):
+                self._not_found()
+                return
+
+            payload = self._read_json()
+            with state.lock:
+                state.requests_received += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                if state.delay:
+                    time.sleep(state.delay)
+                completion = _completion(state, payload, f"chatcmpl-stub-{state.requests_received}")
+                if payload.get("stream"):
+                    self._stream_completion(completion)
+                else:
+                    tokens = completion["usage"]["completion_tokens"]
+                    time.sleep(state.token_delay * tokens)
+                    with state.lock:
+                        state.tokens_generated += tokens
+                    self._send_json(200, completion)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return StubHandler
+
+
+def start_stub_server(port=0, delay=0.0, response_template=DEFAULT_RESPONSE, screening_answer=None, token_delay=0.0):
+    """
+    Start the stub server on a background thread.
+    Returns (server, state); base URL is http://127.0.0.1:<server.server_port>/v1
+    """
+    state = StubState(delay=delay, response_template=response_template, screening_answer=screening_answer,
+                      token_delay=token_delay)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for the OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds to sleep per output token")
+    args = parser.parse_args()
+
+    server, state = start_stub_server(args.port, args.delay, token_delay=args.token_delay)
+    print(f"✅ Stub OpenAI server listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n📊 Served {state.requests_received} requests (max in flight: {state.max_in_flight}, "
+              f"{state.tokens_generated} output tokens, {state.streams_closed_early} streams closed early)")
+        server.shutdown()
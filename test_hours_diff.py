@@ -0,0 +1,30 @@
+# ============= HOURS DIFF ENGINE TESTS =============
+#   python -m pytest -q test_hours_diff.py
+import pandas as pd
+
+import hours_diff
+
+STORE_HOURS = ", ".join(f"{day}: 08:00 - 22:00" for day in
+                        ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+
+
+def saved_results(opening):
+    """A backup row whose GPT response read every day as opening at `opening` until 10:00 PM"""
+    response = "\n".join(f"- {day}: {opening} - 10:00 PM" for day in
+                         ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+    return pd.DataFrame({"STORE_HOURS": [STORE_HOURS], "RAW_RESPONSE": [response + "\nClarity score: 0.90"]})
+
+
+def test_rescore_capitalized_store_hours_within_tolerance():
+    scores = hours_diff.rescore_results(saved_results("8:03 AM"), tolerance=5)
+    assert scores["HOURS_IDENTICAL"].tolist() == [True]
+    assert scores["HOURS_MATCHED_DAYS"].tolist() == [7]
+    assert scores["HOURS_MAX_DEVIATION_MIN"].tolist() == [3]
+
+
+def test_rescore_capitalized_store_hours_outside_tolerance():
+    scores = hours_diff.rescore_results(saved_results("7:00 AM"), tolerance=5)
+    assert scores["HOURS_IDENTICAL"].tolist() == [False]
+    assert scores["HOURS_MISMATCHED_DAYS"].tolist() == [7]
+    assert scores["HOURS_MAX_DEVIATION_MIN"].tolist() == [60]
+    assert hours_diff.rescore_results(saved_results("7:00 AM"), tolerance=60)["HOURS_IDENTICAL"].tolist() == [True]
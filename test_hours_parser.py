@@ -0,0 +1,120 @@
+# ============= HOURS PARSER EQUIVALENCE TESTS =============
+# hours_parser must give exactly what the strptime-based functions it replaced
+# gave (including which inputs they rejected). Checked over exhaustive grids of
+# time strings plus random fuzz.
+#
+#   python -m pytest -q test_hours_parser.py
+import datetime
+import itertools
+import random
+import re
+
+import pytest
+
+import hours_parser
+
+
+# ---- The strptime implementations as they were in fixed_drsc_code_v2.py ----
+def strptime_extract_hours(text):
+    hours = {}
+    pattern = r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(\d{1,2}:\d{2}(?:\s*[ap]m)?)\s*[-–]\s*(\d{1,2}:\d{2}(?:\s*[ap]m)?)"
+    for day, start, end in re.findall(pattern, text, re.IGNORECASE):
+        try:
+            start_clean = start.strip().lower().replace(" ", "")
+            end_clean = end.strip().lower().replace(" ", "")
+            if not ("am" in start_clean or "pm" in start_clean):
+                start_clean += "am"
+            if not ("am" in end_clean or "pm" in end_clean):
+                end_clean += "pm"
+
+            e = datetime.datetime.strptime(end_clean, "%I:%M%p").strftime("%H:%M:%S")
+            s = datetime.datetime.strptime(start_clean, "%I:%M%p").strftime("%H:%M:%S")
+
+            day_lower = day.lower()
+            hours[day_lower] = {"start": s, "end": e}
+        except:
+            try:
+                s = datetime.datetime.strptime(start.strip(), "%H:%M").strftime("%H:%M:%S")
+                e = datetime.datetime.strptime(end.strip(), "%H:%M").strftime("%H:%M:%S")
+                day_lower = day.lower()
+                hours[day_lower] = {"start": s, "end": e}
+            except:
+                continue
+    return hours
+
+
+def strptime_normalize_time(t):
+    if not t or not isinstance(t, str) or not re.match(r"\d{1,2}:\d{2}:\d{2}", t):
+        return ""
+    if t == "00:00:00":
+        return "23:59:59"
+    try:
+        return datetime.datetime.strptime(t, "%H:%M:%S").strftime("%H:%M:%S")
+    except:
+        return t
+
+
+def strptime_time_diff_min(t1, t2):
+    try:
+        dt1 = datetime.datetime.strptime(t1, "%H:%M:%S")
+        dt2 = datetime.datetime.strptime(t2, "%H:%M:%S")
+        delta = abs((dt1 - dt2).total_seconds())
+        return min(delta, 86400 - delta) / 60
+    except:
+        return 999
+
+
+# ---- Inputs ----
+DAYS = ['Monday', 'tuesday', 'WEDNESDAY', 'Thursday', 'friday', 'Saturday', 'sunday']
+SUFFIXES = ['', 'am', 'pm', 'AM', 'PM', ' am', ' pm', ' Am', '  pM', '\tam', '\npm']
+END_SUFFIXES = ['', 'pm', ' PM', '\tpm']
+FUZZ_ALPHABET = '0123456789::: ampAMP-–\n\t٣xMonday'
+FUZZ_CASES = 20000
+
+
+def clock_times(hour):
+    """H:MM and HH:MM for one hour (0-99) and every minute 0-99"""
+    for minute in range(100):
+        for hour_text in {str(hour), f"{hour:02d}"}:
+            yield f"{hour_text}:{minute:02d}"
+
+
+def hms_grid():
+    for hour, minute, second in itertools.product(range(26), range(62), range(63)):
+        yield f"{hour:02d}:{minute:02d}:{second:02d}"
+        yield f"{hour}:{minute:02d}:{second:02d}"
+    yield from ['', None, 12, '00:00:00', '7:5:3', '07:05:03junk', '٠٧:05:03', '07:5٣:03', ' 07:05:03', '23:59:59 ']
+
+
+@pytest.mark.parametrize("hour", range(100))
+def test_extract_hours_clock_grid(hour):
+    for clock in clock_times(hour):
+        for start_suffix, end_suffix in itertools.product(SUFFIXES, END_SUFFIXES):
+            text = f"Monday: {clock}{start_suffix} - 5:30{end_suffix}\nTuesday: 9:00 - {clock}{end_suffix}"
+            assert hours_parser.extract_hours(text) == strptime_extract_hours(text), repr(text)
+
+
+def test_normalize_time_and_time_diff_grid():
+    for value in hms_grid():
+        assert hours_parser.normalize_time(value) == strptime_normalize_time(value), repr(value)
+        assert hours_parser.time_diff_min(value, "12:00:00") == strptime_time_diff_min(value, "12:00:00"), repr(value)
+
+
+def test_fuzz():
+    rng = random.Random(0)
+    for _ in range(FUZZ_CASES):
+        text = rng.choice(DAYS) + ' ' + ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(5, 60)))
+        assert hours_parser.extract_hours(text) == strptime_extract_hours(text), repr(text)
+        assert hours_parser.normalize_time(text[-8:]) == strptime_normalize_time(text[-8:]), repr(text)
+
+
+def test_parse_store_hours_capitalized_doordash_string():
+    store_hours = ("Monday: 08:00 - 22:00, Tuesday: 08:00 - 22:00, Wednesday: 08:00 - 22:00, "
+                   "Thursday: 08:00 - 22:00, Friday: 08:00 - 23:30, Saturday: 09:00 - 23:30, SUNDAY: 00:00 - 00:00")
+    expected = [[480, 1320]] * 4 + [[480, 1410], [540, 1410], [0, 0]]
+    assert hours_parser.parse_store_hours(store_hours).tolist() == expected
+    assert hours_parser.store_hours_matrix([store_hours, ""]).tolist() == [
+        expected, [[hours_parser.MISSING_MINUTES] * 2] * 7]
+    # The identical-hours check only ever compared lowercase day names
+    exact = hours_parser.parse_store_hours(store_hours.replace("Monday", "monday"), exact_day_names=True)
+    assert exact.tolist() == [[480, 1320]] + [[hours_parser.MISSING_MINUTES] * 2] * 6
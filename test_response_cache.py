@@ -0,0 +1,40 @@
+# ============= RESPONSE CACHE TESTS =============
+#   python -m pytest -q test_response_cache.py
+import threading
+import time
+
+from response_cache import ResponseCache
+
+
+def test_probe_then_get_or_fetch_counts_each_lookup_once(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    assert cache.get("url-key", "gpt-4o", "prompt", count_miss=False) is None
+    assert cache.get_or_fetch("content-key", "gpt-4o", "prompt", lambda: "fetched") == "fetched"
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    assert cache.get_or_fetch("content-key", "gpt-4o", "prompt", lambda: "not called") == "fetched"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_waiting_caller_counts_as_one_hit(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    release = threading.Event()
+    results = []
+
+    def slow_fetch():
+        release.wait(5)
+        return "fetched"
+
+    first = threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", "m", "p", slow_fetch)))
+    first.start()
+    while not cache._in_flight:
+        time.sleep(0.001)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", "m", "p", lambda: "duplicate")))
+    second.start()
+    time.sleep(0.2)  # let the second caller find the first one in flight
+    release.set()
+    first.join()
+    second.join()
+
+    assert results == ["fetched", "fetched"]
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,233 @@
+# ============= STORE HOURS PIPELINE TESTS =============
+# Vision calls go to stub_openai_server on a local port, never to OpenAI.
+#
+#   python -m pytest -q test_store_hours_pipeline.py
+import contextlib
+import functools
+import io
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import batch_client
+import rate_limiter
+from checkpoint_store import CheckpointStore
+from image_prefetch import PreparedImage
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from stub_openai_server import start_stub_server
+
+STUB_SERVER, STUB_STATE = start_stub_server()
+_cache_dir = tempfile.mkdtemp()
+os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{STUB_SERVER.server_port}/v1"
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('RESPONSE_CACHE_PATH', os.path.join(_cache_dir, 'responses.sqlite3'))
+os.environ.setdefault('CHECKPOINT_PATH', os.path.join(_cache_dir, 'checkpoints.sqlite3'))
+with contextlib.redirect_stdout(io.StringIO()):
+    import fixed_drsc_code_v2 as drsc
+
+INPUT_COLUMNS = ['STORE_ID', 'IMAGE_URL', 'STORE_HOURS', 'CREATED_AT']
+
+
+class RecordingSlackClient:
+    """Stands in for slack_sdk.WebClient and keeps the summary that would be posted"""
+    posted = []
+
+    def __init__(self, token=None):
+        pass
+
+    def files_upload_v2(self, **kwargs):
+        self.posted.append(kwargs["initial_comment"])
+
+
+def test_empty_report_keeps_verdict_columns():
+    for chunks in ([pd.DataFrame(columns=INPUT_COLUMNS)], []):
+        df = drsc.run_store_hours_pipeline(chunks)
+        assert len(df) == 0
+        for column in drsc.VERDICT_COLUMNS + ["CARRIED_FORWARD"]:
+            assert column in df.columns
+    assert set(INPUT_COLUMNS) <= set(drsc.run_store_hours_pipeline([pd.DataFrame(columns=INPUT_COLUMNS)]).columns)
+
+
+def test_empty_report_posts_zero_store_summary(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(drsc, "WebClient", RecordingSlackClient)
+    RecordingSlackClient.posted.clear()
+
+    df = drsc.run_store_hours_pipeline([pd.DataFrame(columns=INPUT_COLUMNS)])
+    drsc.send_to_slack(df, "test")
+    drsc.create_bulk_upload_sheets(df)
+
+    assert len(RecordingSlackClient.posted) == 1
+    assert "Total stores analyzed: 0*" in RecordingSlackClient.posted[0]
+
+
+class FakePrefetcher:
+    """Stands in for ImagePrefetcher.prepare with a fixed dHash per URL"""
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def prepare(self, url):
+        return PreparedImage(digest=url, data_url="", original_bytes=0, sent_bytes=0,
+                             width=1, height=1, tokens=0, dhash=self.hashes[url])
+
+
+def test_near_duplicate_copies_are_not_reindexed(monkeypatch):
+    monkeypatch.setattr(drsc, "IMAGE_PREFETCHER", FakePrefetcher({"http://img/old.jpg": 0b1011,
+                                                                    "http://img/same.jpg": 0b1010,
+                                                                    "http://img/new.jpg": 2 ** 64 - 1}))
+    monkeypatch.setattr(drsc, "IMAGE_HASHES", {})
+    judged = {"RECOMMENDATION": "No Change Needed"}
+    hours = "Monday: 08:00 - 22:00"
+    old = {"STORE_ID": "store-1", "IMAGE_URL": "http://img/old.jpg", "STORE_HOURS": hours}
+    store_hours = drsc.checkpoint_key(old, None)[3]
+    drsc.CHECKPOINTS.record_image_hashes([(("store-1", store_hours, 0b1011, "http://img/old.jpg"), judged)], "earlier")
+
+    same = {"STORE_ID": "store-1", "IMAGE_URL": "http://img/same.jpg", "STORE_HOURS": hours}
+    assert drsc.near_duplicate_verdict(same) == judged
+    assert drsc.near_duplicate_verdict({**same, "IMAGE_URL": "http://img/new.jpg"}) is None
+    assert drsc.near_duplicate_verdict({**same, "STORE_ID": "store-2"}) is None
+    assert drsc.IMAGE_HASHES == {("store-1", "http://img/new.jpg"): 2 ** 64 - 1,
+                                 ("store-2", "http://img/same.jpg"): 0b1010}
+
+
+def test_near_duplicates_need_the_same_store_hours(monkeypatch):
+    monkeypatch.setattr(drsc, "IMAGE_PREFETCHER", FakePrefetcher({"http://img/same.jpg": 0b1010}))
+    monkeypatch.setattr(drsc, "IMAGE_HASHES", {})
+    judged = {"RECOMMENDATION": "Change Store Hours"}
+    old = {"STORE_ID": "store-3", "IMAGE_URL": "http://img/old.jpg", "STORE_HOURS": "Monday: 08:00 - 22:00"}
+    drsc.CHECKPOINTS.record_image_hashes(
+        [(("store-3", drsc.checkpoint_key(old, None)[3], 0b1010, "http://img/old.jpg"), judged)], "earlier")
+
+    # Ops applied the change, so the earlier verdict no longer holds for the same photo
+    fixed = {**old, "IMAGE_URL": "http://img/same.jpg", "STORE_HOURS": "Monday: 07:00 - 22:00"}
+    assert drsc.near_duplicate_verdict(fixed) is None
+    assert drsc.near_duplicate_verdict({**fixed, "STORE_HOURS": old["STORE_HOURS"]}) == judged
+
+
+def test_checkpoints_follow_store_hours_and_keep_processed_at(monkeypatch, tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setattr(drsc, "CHECKPOINTS", store)
+    df = pd.DataFrame([{"STORE_ID": "1", "IMAGE_URL": "http://img/1.jpg", "STORE_HOURS": "Monday: 08:00 - 22:00",
+                        "CREATED_AT": pd.Timestamp("2026-10-01 10:00")}])
+    verdict = drsc.StoreVerdict("Change Store Hours", "Sign shows 7:00 AM - 10:00 PM", "Hours differ", 0.9)
+    drsc.record_checkpoints(drsc.assign_verdicts(df, [verdict], [False]), "first")
+    key = drsc.checkpoint_key(df.iloc[0], "CREATED_AT")
+    assert store.lookup([key])[key]["RECOMMENDATION"] == "Change Store Hours"
+
+    # Ops fixed the hours: the same photo must be judged again
+    fixed = df.assign(STORE_HOURS="Monday: 07:00 - 22:00").iloc[0]
+    assert store.lookup([drsc.checkpoint_key(fixed, "CREATED_AT")]) == {}
+
+    # A carried-forward row keeps the run and processed_at that judged it
+    before = store._conn.execute("SELECT run_id, processed_at FROM processed_rows").fetchall()
+    drsc.record_checkpoints(drsc.assign_verdicts(df, [verdict], [True]), "second")
+    assert store._conn.execute("SELECT run_id, processed_at FROM processed_rows").fetchall() == before
+
+
+def test_pipeline_worker_failure_becomes_error_verdict(monkeypatch):
+    def vision_job_for_row(row):
+        if row["STORE_ID"] == "2":
+            raise RuntimeError("checkpoint database is locked")
+        return None
+
+    monkeypatch.setattr(drsc, "vision_job_for_row", vision_job_for_row)
+    chunk = pd.DataFrame({"STORE_ID": ["1", "2", "3"], "IMAGE_URL": [f"http://img/{i}.jpg" for i in range(3)],
+                          "STORE_HOURS": ["Monday: 08:00 - 22:00"] * 3,
+                          "CREATED_AT": pd.to_datetime(["2026-10-01"] * 3)})
+    results = []
+    runner = threading.Thread(target=lambda: results.append(drsc.run_store_hours_pipeline([chunk], max_workers=2)),
+                              daemon=True)
+    runner.start()
+    runner.join(timeout=30)
+
+    assert not runner.is_alive(), "pipeline hung after a worker raised"
+    recommendations = dict(zip(results[0]["STORE_ID"], results[0]["RECOMMENDATION"]))
+    assert recommendations["2"] == "Error"
+    assert "checkpoint database is locked" in results[0].set_index("STORE_ID").loc["2", "REASON"]
+    assert recommendations["1"] != "Error" and recommendations["3"] != "Error"
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """The stub server with fresh counters, and an empty response cache so every job reaches it"""
+    monkeypatch.setattr(drsc, "RESPONSE_CACHE", ResponseCache(str(tmp_path / "responses.sqlite3")))
+    with STUB_STATE.lock:
+        STUB_STATE.delay = 0.0
+        STUB_STATE.batch_line_error = lambda image_url: None
+        STUB_STATE.requests_received = STUB_STATE.in_flight = STUB_STATE.max_in_flight = 0
+    return STUB_STATE
+
+
+def test_fetch_vision_responses_overlaps_requests_and_keeps_row_order(stub):
+    stub.delay = 0.2
+    jobs = [None if row % 5 == 0 else (f"http://img/{row}.jpg", f"Current DoorDash hours: row {row}")
+            for row in range(20)]
+
+    results = drsc.fetch_vision_responses(jobs, max_workers=8)
+
+    assert stub.requests_received == 16
+    assert 1 < stub.max_in_flight <= 8
+    for job, result in zip(jobs, results):
+        if job is None:
+            assert result is None
+        else:
+            assert f"Image: {job[0]}" in result
+
+
+def test_fetch_vision_responses_waits_for_the_rate_limiter(stub, monkeypatch):
+    # 10 requests per second with a burst of 3: 12 requests need at least 0.9 s
+    monkeypatch.setattr(rate_limiter, "_shared_limiter",
+                        RateLimiter(requests_per_minute=600, tokens_per_minute=10 ** 9, burst_seconds=0.3))
+    jobs = [(f"http://img/{row}.jpg", "Current DoorDash hours: none") for row in range(12)]
+
+    started = time.monotonic()
+    results = drsc.fetch_vision_responses(jobs, max_workers=12)
+    elapsed = time.monotonic() - started
+
+    assert stub.requests_received == 12
+    assert elapsed >= 0.85
+    assert [f"Image: {image_url}" in result for (image_url, _), result in zip(jobs, results)] == [True] * 12
+
+
+@pytest.fixture
+def batches(stub, monkeypatch):
+    """The stub's fake Batch API, polled every 50 ms instead of backing off from 5 s"""
+    monkeypatch.setattr(drsc, "run_chat_batch", functools.partial(batch_client.run_chat_batch, poll_interval=0.05))
+    return stub
+
+
+def test_batch_mode_turns_an_errored_line_into_an_error_verdict(batches, monkeypatch):
+    monkeypatch.setattr(drsc, "BATCH_MODE", True)
+    batches.batch_line_error = lambda image_url: "The server had an error" if image_url.endswith("/2.jpg") else None
+    df = pd.DataFrame({"STORE_ID": ["1", "2", "3"], "IMAGE_URL": [f"http://img/{i}.jpg" for i in range(1, 4)],
+                       "STORE_HOURS": ["Monday: 08:00 - 22:00"] * 3,
+                       "CREATED_AT": pd.to_datetime(["2026-10-01"] * 3)})
+
+    df = drsc.process_store_hours(df)
+
+    assert batches.requests_received == 3
+    recommendations = dict(zip(df["STORE_ID"], df["RECOMMENDATION"]))
+    assert recommendations["2"] == "Error"
+    assert "The server had an error" in df.set_index("STORE_ID").loc["2", "REASON"]
+    assert recommendations["1"] != "Error" and recommendations["3"] != "Error"
+
+
+def test_batch_wait_shares_one_deadline_across_batches(batches, monkeypatch):
+    # Batches of 2, 4 and 4 lines at 0.25 s a line finish at 0.5 s, 1 s and 1 s: each fits in
+    # 0.75 s on its own, but the last two don't fit in 0.75 s counted from submission
+    write_batch_files = batch_client.write_batch_files
+    monkeypatch.setattr(batch_client, "write_batch_files",
+                        lambda requests, directory: write_batch_files(requests, directory, max_requests=4)[::-1])
+    batches.delay = 0.25
+    jobs = [(f"http://img/{row}.jpg", "Current DoorDash hours: none") for row in range(10)]
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        drsc.fetch_batch_vision_responses(jobs, max_wait=0.75)
+
+    assert time.monotonic() - started < 0.95